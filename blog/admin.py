@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db.models import Case, Count, IntegerField, OuterRef, Subquery, When
+from django.utils.html import format_html
 from markdownx.admin import MarkdownxModelAdmin
-from .models import Post, Tag, Comment, Word, Word_Tag, News
+from .models import Post, Tag, Comment, Word, Word_Tag, News, NewsFeed, WordSchedule, ContentSignature
 
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
@@ -11,6 +13,60 @@ admin.site.register(News, MarkdownxModelAdmin)
 
 admin.site.register(Comment)
 
+
+class WordScheduleAdmin(admin.ModelAdmin):
+    list_display = ('date', 'word')
+    raw_id_fields = ('word',)
+
+admin.site.register(WordSchedule, WordScheduleAdmin)
+
+
+class NewsFeedAdmin(admin.ModelAdmin):
+    list_display = ('name', 'url', 'is_active', 'last_fetched_at', 'last_status')
+    list_filter = ('is_active',)
+    readonly_fields = ('etag', 'last_modified', 'last_fetched_at', 'last_status', 'last_error')
+
+admin.site.register(NewsFeed, NewsFeedAdmin)
+
+class ContentSignatureAdmin(admin.ModelAdmin):
+    # 근접 중복 묶음 목록: 글이 두 개 이상인 묶음만, 묶음별로 모아 보여준다. (blog/near_duplicates.py)
+    list_display = ('cluster', 'kind', 'object_id', 'title_link', 'cluster_size', 'is_duplicate')
+    list_filter = ('kind',)
+    list_per_page = 100
+    fields = ('kind', 'object_id', 'cluster')
+    readonly_fields = fields
+
+    def get_queryset(self, request):
+        size = (ContentSignature.objects.filter(kind=OuterRef('kind'), cluster=OuterRef('cluster'))
+                .values('cluster').annotate(size=Count('pk')).values('size'))
+        title = Case(*[
+            When(kind=kind, then=Subquery(model.objects.filter(pk=OuterRef('object_id')).values('title')[:1]))
+            for kind, model in (('post', Post), ('news', News))
+        ])
+        return (super().get_queryset(request)
+                .annotate(cluster_size=Subquery(size, output_field=IntegerField()), title=title)
+                .filter(cluster_size__gte=2).order_by('kind', 'cluster', 'object_id'))
+
+    @admin.display(description='제목')
+    def title_link(self, obj):
+        return format_html('<a href="/{}/{}/">{}</a>', 'blog' if obj.kind == 'post' else 'news', obj.object_id, obj.title)
+
+    @admin.display(description='묶음 크기', ordering='cluster_size')
+    def cluster_size(self, obj):
+        return obj.cluster_size
+
+    @admin.display(description='중복', boolean=True)
+    def is_duplicate(self, obj):
+        return obj.is_duplicate
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(ContentSignature, ContentSignatureAdmin)
+
 class TagAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name', )}
 
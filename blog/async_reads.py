@@ -0,0 +1,117 @@
+import asyncio
+import importlib
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.urls import clear_url_caches
+from django.views.generic import View
+
+from . import tag_stats
+from .today_news import get_today_news
+
+# 읽기 전용 페이지(landing, 목록, 상세)를 async 뷰로 연결할지 여부.
+# asgi.py가 ASYNC_READ_VIEWS=1 환경 변수를 기본으로 넣으므로 ASGI 서버에서는 async, WSGI에서는 기존 동기 뷰.
+READ_URLCONFS = ('blog.urls', 'today_word.urls', 'news.urls', 'single_pages.urls')
+
+
+def use_async_views():
+    return getattr(settings, 'ASYNC_READ_VIEWS', os.environ.get('ASYNC_READ_VIEWS') == '1')
+
+
+def read_view(sync_view, async_view):
+    """urls.py에서 설정에 맞는 쪽 뷰를 고른다."""
+    return async_view if use_async_views() else sync_view
+
+
+def reload_urlconfs():
+    # 설정을 바꾼 뒤 (테스트 / 벤치마크) URL 모듈을 다시 읽어 read_view 선택을 반영한다.
+    for name in READ_URLCONFS + (settings.ROOT_URLCONF,):
+        importlib.reload(importlib.import_module(name))
+    clear_url_caches()
+
+
+async def gather(**awaitables):
+    """서로 독립적인 조회를 동시에 기다려 {이름: 결과}로 돌려준다."""
+    results = await asyncio.gather(*awaitables.values())
+    return dict(zip(awaitables, results))
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def sidebar_queries(kind=None):
+    # 사이드바의 오늘의 뉴스 / 태그 구름은 캐시를 미리 채워 두면 렌더링 중에 조회하지 않는다.
+    queries = {'today_news': sync_to_async(get_today_news)()}
+    if kind is not None:
+        queries['tag_cloud'] = sync_to_async(tag_stats.cloud)(kind)
+    return queries
+
+
+class AsyncReadMixin:
+    """ListView / DetailView의 async 버전 공통 부분.
+
+    get()에서 페이지 데이터와 get_async_queries()의 조회를 동시에 기다린 뒤, 결과를 self.prefetched에
+    두고 기존 get_context_data / 템플릿 렌더링은 동기 스레드에서 그대로 실행한다.
+    """
+    sidebar_kind = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        # 부모(동기 뷰)의 dispatch에 걸린 페이지 캐시 데코레이터를 건너뛴다. 캐시는 async 클래스에 다시 건다.
+        return await View.dispatch(self, request, *args, **kwargs)
+
+    def get_async_queries(self):
+        return sidebar_queries(self.sidebar_kind)
+
+    async def render_prefetched(self, **queries):
+        self.prefetched = await gather(**queries, **self.get_async_queries())
+        return await sync_to_async(self.render_prefetched_response)()
+
+
+class AsyncListMixin(AsyncReadMixin):
+    # 페이지를 나누지 않는 목록에서 object_list를 미리 읽어 둘지. 템플릿이 목록을 쓰지 않으면 False로 둔다.
+    prefetch_rows = True
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.prefetched['page']
+
+    def get_total_count(self):
+        return self.prefetched['total_count']
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        page_size = self.get_paginate_by(self.object_list)
+        queries = {}
+        if page_size:
+            queries['page'] = self.apaginate_queryset(self.object_list, page_size)
+        elif self.prefetch_rows:
+            queries['rows'] = alist(self.object_list)
+        if getattr(self, 'pagination_mode', None) == 'cursor':
+            queries['total_count'] = sync_to_async(super().get_total_count)()
+        return await self.render_prefetched(**queries)
+
+    def render_prefetched_response(self):
+        if 'rows' in self.prefetched:
+            self.object_list = self.prefetched['rows']
+        return self.render_to_response(self.get_context_data())
+
+
+class AsyncDetailMixin(AsyncReadMixin):
+    def get_object(self, queryset=None):
+        return self.prefetched['object']
+
+    async def aget_object(self):
+        queryset = self.get_queryset()
+        try:
+            return await queryset.aget(pk=self.kwargs['pk'])
+        except queryset.model.DoesNotExist:
+            raise Http404
+
+    async def get(self, request, *args, **kwargs):
+        return await self.render_prefetched(object=self.aget_object())
+
+    def render_prefetched_response(self):
+        self.object = self.get_object()
+        return self.render_to_response(self.get_context_data(object=self.object))
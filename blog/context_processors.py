@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .today_news import get_today_news
+
+
+def today_news(request):
+    # 사이드바가 없는 페이지에서는 조회하지 않도록 지연 평가
+    return {'today_news': SimpleLazyObject(get_today_news)}
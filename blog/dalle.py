@@ -1,74 +1,71 @@
 from openai import OpenAI, BadRequestError
-import requests
-from io import BytesIO
 from PIL import Image
 from dotenv import load_dotenv
 import os
 import base64
-import datetime
-from django.conf import settings
 import io
 
+from . import image_cache
+from .image_cache import normalize_prompt
+from .perf import span
+
 load_dotenv()
 OPENAI_KEY = os.getenv("OPENAI_KEY")
 
-from PIL import Image
-import io
-
-
-def resize_to_half_height(image_bytes: bytes) -> bytes:
-    # BytesIO를 사용하여 bytes 데이터를 Pillow 이미지 객체로 변환
-    with io.BytesIO(image_bytes) as input_buffer:
-        with Image.open(input_buffer) as img:
-            # 이미지의 현재 너비와 높이 얻기
-            original_width, original_height = img.size
 
-            # 목표 비율 설정 (2:1) - 가로가 세로의 두 배
-            target_width = original_width
-            target_height = original_width // 2
+def crop_to_half_height(src, dst, format="PNG"):
+    """src(파일 객체)의 이미지를 가로:세로 2:1로 가운데를 잘라 dst(파일 객체)에 바로 쓴다."""
+    with Image.open(src) as img:
+        # 이미지의 현재 너비와 높이 얻기
+        original_width, original_height = img.size
 
-            # 이미지 크롭 또는 패딩이 필요할 경우 설정
-            if original_height > target_height:
-                # 세로가 더 긴 경우, 위아래를 잘라냄
-                top = (original_height - target_height) // 2
-                bottom = top + target_height
-                img_cropped = img.crop((0, top, target_width, bottom))
-            else:
-                # 세로가 부족한 경우, 빈 공간을 추가할 수도 있음 (여기서는 크롭만 구현)
-                img_cropped = img
+        # 목표 비율 설정 (2:1) - 가로가 세로의 두 배
+        target_width = original_width
+        target_height = original_width // 2
 
-            # 결과 이미지를 BytesIO로 다시 저장
-            with io.BytesIO() as output_buffer:
-                img_cropped.save(output_buffer, format="PNG")
-                resized_image_bytes = output_buffer.getvalue()
+        # 이미지 크롭 또는 패딩이 필요할 경우 설정
+        if original_height > target_height:
+            # 세로가 더 긴 경우, 위아래를 잘라냄
+            top = (original_height - target_height) // 2
+            bottom = top + target_height
+            img_cropped = img.crop((0, top, target_width, bottom))
+        else:
+            # 세로가 부족한 경우, 빈 공간을 추가할 수도 있음 (여기서는 크롭만 구현)
+            img_cropped = img.copy()
 
-    return resized_image_bytes
+    # 원본 디코딩 결과를 놓은 뒤에 인코딩해서 두 이미지를 동시에 들고 있는 시간을 줄인다.
+    img_cropped.save(dst, format=format)
+    img_cropped.close()
 
 
 def save_gen_img(client, txt_response: str):
-    img_response = client.images.generate(
+    prompt = f"{normalize_prompt(txt_response)}, in style of vector art, square aspect ratio"
+    params = dict(
         model="dall-e-3",
-        prompt=f"{txt_response}, in style of vector art, square aspect ratio",
         size="1024x1024",
         quality="standard",
-        response_format="b64_json",
-        n=1,
     )
 
-    image_data_b64 = img_response.data[0].b64_json
-    _image_bytes = base64.b64decode(image_data_b64)
-    image_bytes = resize_to_half_height(_image_bytes)
-
-    # 저장 경로와 파일명 설정
-    gentime_info = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{gentime_info}.png"
-    file_path = os.path.join(settings.MEDIA_ROOT, 'generated_images', filename)
-
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'wb') as img_file:
-        img_file.write(image_bytes)
-
-    return filename
-
-
-
+    # 같은 프롬프트/파라미터로 그린 적이 있으면 API를 호출하지 않고 그 파일을 쓴다.
+    key = image_cache.prompt_key(prompt, **params)
+    filename = image_cache.get(key)
+    if filename:
+        return filename
+
+    with span('openai'):
+        img_response = client.images.generate(
+            prompt=prompt,
+            response_format="b64_json",
+            n=1,
+            **params,
+        )
+
+    # 응답 객체(base64 문자열)는 디코딩 직후 놓아서 디코딩 결과만 남긴다.
+    image_data = base64.b64decode(img_response.data[0].b64_json)
+    del img_response
+
+    # 잘라낸 PNG를 generated_images/ 임시 파일에 바로 쓰고 내용 해시로 이름을 붙인다.
+    # 이미지 캐시는 로컬 디스크(MEDIA_ROOT)에만 쓴다. default_storage가 원격 저장소면 따로 옮겨야 한다.
+    with io.BytesIO(image_data) as input_buffer:
+        del image_data
+        return image_cache.put_stream(key, lambda f: crop_to_half_height(input_buffer, f))
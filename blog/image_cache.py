@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+
+from django.conf import settings
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from .file_lock import file_lock
+
+# generated_images 폴더가 이 크기를 넘으면 오래 안 쓴 이미지부터 지운다.
+IMAGE_CACHE_MAX_BYTES = getattr(settings, 'IMAGE_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+
+# 프롬프트 -> 파일 색인은 DB(CachedImage)에 둔다. 적중은 그 행의 last_access만 UPDATE 한다.
+# hits / misses / evictions는 프로세스별 누적값이다.
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+FILENAME_RE = re.compile(r'[0-9a-f]{64}\.png')
+
+
+def cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'generated_images')
+
+
+def _lock_path():
+    # 잠금 파일은 공개되는 MEDIA_ROOT 밖에 둔다. 같은 캐시 폴더를 쓰는 프로세스끼리만 같은 파일을 잡는다.
+    digest = hashlib.sha1(os.path.abspath(cache_dir()).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f'image_cache-{digest}.lock')
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def normalize_prompt(prompt):
+    return ' '.join(prompt.split())
+
+
+def prompt_key(prompt, **params):
+    """정규화한 프롬프트와 모델 파라미터(model, size, quality ...)의 해시."""
+    payload = json.dumps([normalize_prompt(prompt), params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get(key):
+    """캐시된 파일명을 반환한다. 없으면 None."""
+    from .models import CachedImage
+
+    filename = CachedImage.objects.filter(key=key).values_list('filename', flat=True).first()
+    if filename is not None and not os.path.exists(os.path.join(cache_dir(), filename)):
+        # 누군가 파일을 직접 지운 경우
+        CachedImage.objects.filter(filename=filename).delete()
+        filename = None
+    if filename is None:
+        _count('misses')
+        return None
+    _count('hits')
+    CachedImage.objects.filter(key=key).update(last_access=timezone.now())
+    return filename
+
+
+def put(key, image_bytes):
+    """이미지를 내용 해시 파일명으로 저장하고 파일명을 반환한다."""
+    return put_stream(key, lambda f: f.write(image_bytes))
+
+
+def put_stream(key, write):
+    """write(f)가 임시 파일에 직접 쓰게 한 뒤, 내용 해시 파일명으로 옮기고 파일명을 반환한다."""
+    from .models import CachedImage
+
+    os.makedirs(cache_dir(), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir(), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        digest = hashlib.sha256()
+        with open(tmp_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+        filename = f'{digest.hexdigest()}.png'
+        size = os.path.getsize(tmp_path)
+        # 파일 교체, 색인 기록, 용량 정리를 다른 프로세스와 겹치지 않게 한다.
+        with file_lock(_lock_path()):
+            os.replace(tmp_path, os.path.join(cache_dir(), filename))
+            CachedImage.objects.update_or_create(
+                key=key, defaults={'filename': filename, 'size': size, 'last_access': timezone.now()},
+            )
+            _evict(keep=filename)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return filename
+
+
+def path(filename):
+    """캐시 폴더 안의 이미지 경로. 캐시가 만든 이름이 아니거나 없는 파일이면 None."""
+    if not FILENAME_RE.fullmatch(filename):
+        return None
+    file_path = os.path.join(cache_dir(), filename)
+    return file_path if os.path.isfile(file_path) else None
+
+
+def _total_size():
+    # 같은 이미지를 가리키는 프롬프트가 여럿일 수 있으므로 파일마다 한 행만 더한다.
+    from .models import CachedImage
+
+    first_rows = CachedImage.objects.values('filename').annotate(first=Min('pk')).values('first')
+    return CachedImage.objects.filter(pk__in=first_rows).aggregate(total=Sum('size'))['total'] or 0
+
+
+def _evict(keep):
+    from .models import CachedImage
+
+    total = _total_size()
+    if total <= IMAGE_CACHE_MAX_BYTES:
+        return
+    # 파일별 마지막 사용 시각이 오래된 순으로 읽다가 한도 아래로 내려가면 멈춘다.
+    oldest = (CachedImage.objects.exclude(filename=keep).values('filename')
+                                 .annotate(size=Max('size'), last=Max('last_access')).order_by('last', 'filename'))
+    for row in oldest.iterator():
+        if total <= IMAGE_CACHE_MAX_BYTES:
+            break
+        CachedImage.objects.filter(filename=row['filename']).delete()
+        total -= row['size']
+        _count('evictions')
+        try:
+            os.remove(os.path.join(cache_dir(), row['filename']))
+        except FileNotFoundError:
+            pass
+
+
+def counters():
+    """이 프로세스의 hits / misses / evictions 누적값."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def stats():
+    """이 프로세스의 hits / misses / evictions 누적값과 현재 항목 수, 전체 크기."""
+    from .models import CachedImage
+
+    return dict(counters(), entries=CachedImage.objects.count(), bytes=_total_size())
@@ -0,0 +1,169 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# srcset에 넣을 가로 크기(px)와 포맷
+IMAGE_DERIVATIVE_WIDTHS = getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 960))
+IMAGE_DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# 리사이즈/인코딩은 CPU를 많이 쓰므로 동시에 이 개수까지만 처리
+IMAGE_DERIVATIVE_WORKERS = getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', min(2, os.cpu_count() or 1))
+IMAGE_DERIVATIVE_TIMEOUT = 30
+# 파생 이미지를 만들 수 있는 원본: 업로드된 head_image와 생성 이미지만
+IMAGE_DERIVATIVE_SOURCES = ('blog/images/', 'generated_images/')
+IMAGE_DERIVATIVE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+# 이미 만들어진 파생 이미지 목록을 캐시해 srcset을 그릴 때마다 저장소를 확인하지 않는다.
+IMAGE_DERIVATIVE_EXISTS_TIMEOUT = 60 * 60 * 24
+# 아직 없는 파생 이미지도 잠시 기억해 캐시되지 않은 페이지마다 저장소를 확인하지 않는다. 만들면 바로 덮어쓴다.
+IMAGE_DERIVATIVE_MISSING_TIMEOUT = 60
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_DERIVATIVE_WORKERS, thread_name_prefix='image-derivative')
+_lock = threading.Lock()
+_in_flight = {}
+
+
+def is_source(name):
+    """파생 이미지를 만들어도 되는 원본 경로인지 (업로드 폴더 안의 이미지 확장자)."""
+    return (name.startswith(IMAGE_DERIVATIVE_SOURCES) and '..' not in name.split('/')
+            and name.lower().endswith(IMAGE_DERIVATIVE_EXTENSIONS))
+
+
+def _exists_key(target):
+    return f'image_derivative:{target}'
+
+
+def _mark_existing(target):
+    cache.set(_exists_key(target), True, IMAGE_DERIVATIVE_EXISTS_TIMEOUT)
+
+
+def existing(targets):
+    """targets 중 저장소에 있는 파생 이미지 집합. 있는 것과 없는 것 모두 캐시한다."""
+    known = {key[len('image_derivative:'):]: value
+             for key, value in cache.get_many([_exists_key(t) for t in targets]).items()}
+    found = {target for target, value in known.items() if value}
+    missing = {}
+    for target in targets:
+        if target in known:
+            continue
+        if default_storage.exists(target):
+            _mark_existing(target)
+            found.add(target)
+        else:
+            missing[_exists_key(target)] = False
+    if missing:
+        cache.set_many(missing, IMAGE_DERIVATIVE_MISSING_TIMEOUT)
+    return found
+
+
+def source_width(name):
+    """원본의 (EXIF 회전을 반영한) 가로 크기. 헤더만 읽고 캐시한다. 읽을 수 없으면 None."""
+    key = f'image_derivative:width:{name}'
+    width = cache.get(key)
+    if width is None:
+        try:
+            with default_storage.open(name, 'rb') as f, Image.open(f) as img:
+                # 5~8은 90도 회전이라 가로/세로가 바뀐다.
+                width = img.height if img.getexif().get(0x0112) in (5, 6, 7, 8) else img.width
+        except (OSError, ValueError):
+            return None
+        cache.set(key, width, IMAGE_DERIVATIVE_EXISTS_TIMEOUT)
+    return width
+
+
+def widths(name):
+    """srcset에 넣을 (파생 이미지 크기, 실제 가로 크기) 목록.
+
+    확대는 하지 않으므로 원본보다 넓은 크기는 원본 크기로 그린 파생 이미지 하나로 합친다.
+    """
+    original = source_width(name)
+    if original is None:
+        return [(width, width) for width in IMAGE_DERIVATIVE_WIDTHS]
+    result = [(width, width) for width in IMAGE_DERIVATIVE_WIDTHS if width < original]
+    wider = [width for width in IMAGE_DERIVATIVE_WIDTHS if width >= original]
+    if wider:
+        result.append((min(wider), original))
+    return result
+
+
+def derivative_name(name, width, fmt):
+    base, _ = os.path.splitext(name)
+    return f'derivatives/{base}_{width}w.{IMAGE_DERIVATIVE_FORMATS[fmt][1]}'
+
+
+def _render(name, width, fmt):
+    target = derivative_name(name, width, fmt)
+    if default_storage.exists(target):
+        _mark_existing(target)
+        return target
+
+    pil_format, _, options = IMAGE_DERIVATIVE_FORMATS[fmt]
+    with default_storage.open(name, 'rb') as f:
+        with Image.open(f) as img:
+            # JPEG 원본은 디코딩 단계에서 1/2, 1/4 ... 크기로 줄여 읽는다.
+            img.draft('RGB', (width, img.height * width // max(img.width, 1)))
+            img = ImageOps.exif_transpose(img)
+            if img.width > width:
+                img = img.resize((width, max(1, img.height * width // img.width)), Image.LANCZOS)
+            if pil_format == 'JPEG' and img.mode != 'RGB':
+                img = img.convert('RGB')
+            buffer = BytesIO()
+            img.save(buffer, format=pil_format, **options)
+
+    saved = default_storage.save(target, ContentFile(buffer.getvalue()))
+    if saved != target:
+        # 다른 워커가 같은 파일을 먼저 저장해 저장소가 새 이름을 붙였다. 내용이 같으므로 사본은 지운다.
+        default_storage.delete(saved)
+    _mark_existing(target)
+    return target
+
+
+def submit(name, width, fmt):
+    """파생 이미지 생성을 워커 풀에 넣는다. 같은 파생 이미지를 만드는 중이면 그 작업을 공유한다."""
+    key = (name, width, fmt)
+    with _lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _executor.submit(_render, name, width, fmt)
+            _in_flight[key] = future
+            future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return future
+
+
+def ensure(name, width, fmt):
+    """파생 이미지의 저장소 경로를 반환한다. 없으면 만들어질 때까지 기다린다."""
+    target = derivative_name(name, width, fmt)
+    if existing([target]):
+        return target
+    return submit(name, width, fmt).result(timeout=IMAGE_DERIVATIVE_TIMEOUT)
+
+
+def warm(name):
+    """업로드/생성 직후 모든 크기와 포맷을 미리 만들어 둔다. (결과를 기다리지 않음)"""
+    for width, _ in widths(name):
+        for fmt in IMAGE_DERIVATIVE_FORMATS:
+            submit(name, width, fmt)
+
+
+def srcset(image, fmt):
+    """image(FieldFile)의 srcset 문자열. 아직 없는 크기는 첫 요청 때 만드는 URL을 가리킨다."""
+    from django.urls import reverse
+
+    targets = [(width, rendered, derivative_name(image.name, width, fmt)) for width, rendered in widths(image.name)]
+    found = existing([target for _, _, target in targets])
+    entries = []
+    for width, rendered, target in targets:
+        if target in found:
+            url = default_storage.url(target)
+        else:
+            url = reverse('image_derivative', args=[width, fmt, image.name])
+        entries.append(f'{url} {rendered}w')
+    return ', '.join(entries)
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .dalle import save_gen_img, OpenAI, BadRequestError
+from .image_cache import normalize_prompt
+
+# 이미지 생성을 처리할 백그라운드 스레드 수
+IMAGE_JOB_WORKERS = getattr(settings, 'IMAGE_JOB_WORKERS', 2)
+# 이 시간(초) 넘게 updated_at이 그대로인 RUNNING 작업은 워커가 죽은 것으로 보고 다시 대기시킨다.
+# 이미지 생성 요청 한 번(재시도 포함)보다 충분히 길어야 한다.
+IMAGE_JOB_STALE_TIMEOUT = getattr(settings, 'IMAGE_JOB_STALE_TIMEOUT', 10 * 60)
+# 프롬프트가 거부(BadRequest)됐을 때 대신 그릴 프롬프트
+IMAGE_JOB_FALLBACK_PROMPT = '시장 경제 활동'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest()
+
+
+def get_client():
+    # 테스트에서는 이 함수를 가짜 클라이언트로 바꿔 끼운다.
+    return OpenAI(api_key=os.getenv("OPENAI_KEY"))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IMAGE_JOB_WORKERS, thread_name_prefix='image-job')
+                # 이전 프로세스가 남기고 간 대기 작업, 처리 중에 멈춘 작업도 이어서 처리
+                from .models import ImageJob
+                requeue_stale()
+                for pk in ImageJob.objects.filter(status=ImageJob.PENDING).values_list('pk', flat=True):
+                    _executor.submit(run_job, pk)
+    return _executor
+
+
+def _is_stale(job):
+    return job.status == job.RUNNING and job.updated_at < timezone.now() - timedelta(seconds=IMAGE_JOB_STALE_TIMEOUT)
+
+
+def requeue_stale():
+    """RUNNING인 채로 IMAGE_JOB_STALE_TIMEOUT이 지난 작업을 대기 상태로 되돌린다. 되돌린 작업 pk 목록을 반환."""
+    from .models import ImageJob
+
+    now = timezone.now()
+    stale = ImageJob.objects.filter(status=ImageJob.RUNNING,
+                                    updated_at__lt=now - timedelta(seconds=IMAGE_JOB_STALE_TIMEOUT))
+    pks = list(stale.values_list('pk', flat=True))
+    # update()는 auto_now를 채우지 않으므로 updated_at을 직접 넣는다.
+    stale.filter(pk__in=pks).update(status=ImageJob.PENDING, updated_at=now)
+    return pks
+
+
+def submit(prompt):
+    """생성 작업을 등록하고 ImageJob을 반환한다. 같은 프롬프트가 진행 중이면 그 작업을 돌려준다.
+
+    진행 중인 작업이 멈춰 있으면(_is_stale) 그 작업을 다시 대기시킨다.
+    """
+    from .models import ImageJob
+
+    prompt = normalize_prompt(prompt)
+    key = prompt_hash(prompt)
+    with transaction.atomic():
+        job = ImageJob.objects.select_for_update().filter(
+            prompt_hash=key, status__in=[ImageJob.PENDING, ImageJob.RUNNING],
+        ).first()
+        if job is None:
+            job = ImageJob.objects.create(prompt=prompt, prompt_hash=key)
+        elif _is_stale(job):
+            job.status = ImageJob.PENDING
+            job.save(update_fields=['status', 'updated_at'])
+        else:
+            return job
+    # 커밋된 뒤에야 워커 스레드가 작업 행을 볼 수 있다.
+    transaction.on_commit(lambda: _get_executor().submit(run_job, job.pk))
+    return job
+
+
+def run_job(pk):
+    """워커 스레드에서 작업 하나를 처리한다. 다른 워커가 먼저 가져간 작업이면 건너뛴다."""
+    from .models import ImageJob
+
+    close_old_connections()
+    try:
+        # 멈춘 작업인지는 updated_at으로 판단하므로 가져간 시각을 남긴다.
+        claimed = ImageJob.objects.filter(pk=pk, status=ImageJob.PENDING).update(
+            status=ImageJob.RUNNING, updated_at=timezone.now(),
+        )
+        if not claimed:
+            return
+        job = ImageJob.objects.get(pk=pk)
+        try:
+            # 키가 없거나 잘못돼 클라이언트를 못 만들어도 작업은 실패로 남긴다.
+            client = get_client()
+            try:
+                filename = save_gen_img(client, job.prompt)
+            except BadRequestError:
+                filename = save_gen_img(client, IMAGE_JOB_FALLBACK_PROMPT)
+        except Exception as e:
+            job.status = ImageJob.FAILED
+            job.error = str(e)
+        else:
+            job.status = ImageJob.DONE
+            job.filename = filename
+        job.save(update_fields=['status', 'filename', 'error', 'updated_at'])
+    finally:
+        close_old_connections()
@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import AsyncClient, Client
+
+# 회귀로 볼 변화율(%) 기본값. 지연(p50/p99)은 늘어난 경우, 처리량(rps)은 줄어든 경우만 본다.
+LOAD_BENCH_THRESHOLD = 10.0
+LOWER_IS_BETTER = ('p50_ms', 'p90_ms', 'p99_ms', 'mean_ms')
+HIGHER_IS_BETTER = ('rps',)
+
+
+def percentile(values, q):
+    """정렬된 values의 q(0~100) 백분위 (nearest-rank)."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(len(values) * q / 100) - 1)]
+
+
+def summarize(timings, errors, elapsed):
+    timings = sorted(timings)
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p90_ms': round(percentile(timings, 90) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3) if timings else 0.0,
+        'rps': round(len(timings) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def warm_up(urls):
+    # 첫 요청에서만 하는 일(오늘의 단어 배정, 뉴스 캐시, 본문 렌더링 등)은 측정에서 뺀다.
+    client = Client(raise_request_exception=False)
+    for url in urls:
+        client.get(url)
+
+
+def run_sync(urls, total, concurrency):
+    """동기 뷰(WSGI 경로)를 스레드 concurrency개로 total번 요청한다. urls는 돌아가며 쓴다."""
+    urls = itertools.cycle(urls)
+    targets = [next(urls) for _ in range(total)]
+
+    def request(url):
+        started = time.perf_counter()
+        response = Client(raise_request_exception=False).get(url)
+        return time.perf_counter() - started, response.status_code != 200
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(request, targets))
+        # 스레드마다 DB 연결이 따로 생기므로 끝나면 닫는다.
+        list(pool.map(lambda _: connections.close_all(), range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize([t for t, _ in results], sum(error for _, error in results), elapsed)
+
+
+class ASGIClient(AsyncClient):
+    # AsyncClient는 WSGI처럼 경로를 latin-1로 바꿔 넘겨 한글 slug가 404가 된다.
+    # 실제 ASGI 서버처럼 scope['path']를 디코딩된 문자열로 넘긴다.
+    def _get_path(self, parsed):
+        return super()._get_path(parsed).encode('iso-8859-1').decode()
+
+
+def run_async(urls, total, concurrency):
+    """async 뷰(ASGI 경로)를 이벤트 루프 하나에서 동시에 concurrency개씩 total번 요청한다."""
+    urls = itertools.cycle(urls)
+    targets = [next(urls) for _ in range(total)]
+
+    async def main():
+        client = ASGIClient(raise_request_exception=False)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(url):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url)
+                return time.perf_counter() - started, response.status_code != 200
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(request(url) for url in targets))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return summarize([t for t, _ in results], sum(error for _, error in results), elapsed)
+
+
+def compare(baseline, current, threshold=LOAD_BENCH_THRESHOLD):
+    """두 실행 결과({'endpoints': {이름: 요약}})를 엔드포인트 / 지표별로 비교한다.
+
+    [(엔드포인트, 지표, 이전, 이후, 변화율 %, 회귀 여부), ...] 양쪽에 다 있는 엔드포인트만.
+    """
+    rows = []
+    for name in sorted(set(baseline['endpoints']) & set(current['endpoints'])):
+        before, after = baseline['endpoints'][name], current['endpoints'][name]
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            old, new = before[metric], after[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            rows.append((name, metric, old, new, round(change, 1), worse))
+        if after['errors'] > before['errors']:
+            rows.append((name, 'errors', before['errors'], after['errors'], None, True))
+    return rows
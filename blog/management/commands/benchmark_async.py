@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from blog import async_reads, load_bench, page_cache
+from blog.models import News, Post, Word
+
+
+class Command(BaseCommand):
+    help = ('landing / 목록 / 상세 페이지를 동시에 N개씩 요청해 기존 동기 뷰(WSGI 경로, 스레드 풀)와 '
+            'async 뷰(ASGI 경로, 이벤트 루프)의 p50/p99 지연과 초당 요청 수를 비교합니다. '
+            '페이지 캐시는 끄고 측정하며, 글 상세 요청은 실제 방문처럼 조회수에 반영됩니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='URL당 요청 수')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('urls', nargs='*', help='기본값: landing, 목록 3개, 최신 글 / 단어 / 뉴스 상세')
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or self.default_urls()
+        total, concurrency = options['requests'], options['concurrency']
+        results = {}
+        # 렌더링 비용을 재야 하므로 페이지 캐시는 끄고, 테스트 클라이언트의 Host(testserver)를 허용한다.
+        enabled, page_cache.PAGE_CACHE_ENABLED = page_cache.PAGE_CACHE_ENABLED, False
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for mode, run in (('wsgi', load_bench.run_sync), ('asgi', load_bench.run_async)):
+                    with override_settings(ASYNC_READ_VIEWS=mode == 'asgi'):
+                        async_reads.reload_urlconfs()
+                        load_bench.warm_up(urls)
+                        for url in urls:
+                            results[mode, url] = run([url], total, concurrency)
+        finally:
+            page_cache.PAGE_CACHE_ENABLED = enabled
+            async_reads.reload_urlconfs()
+
+        self.stdout.write(f'{"url":<24} {"mode":<5} {"p50 ms":>9} {"p99 ms":>9} {"req/s":>9} {"errors":>7}')
+        for url in urls:
+            for mode in ('wsgi', 'asgi'):
+                result = results[mode, url]
+                self.stdout.write(
+                    f'{url:<24} {mode:<5} {result["p50_ms"]:9.2f} {result["p99_ms"]:9.2f} '
+                    f'{result["rps"]:9.1f} {result["errors"]:7}'
+                )
+
+    def default_urls(self):
+        urls = ['/', '/blog/', '/today_word/', '/news/']
+        for model, prefix in ((Post, '/blog/'), (Word, '/today_word/'), (News, '/news/')):
+            pk = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+            if pk is not None:
+                urls.append(f'{prefix}{pk}/')
+        return urls
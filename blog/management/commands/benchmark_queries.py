@@ -0,0 +1,144 @@
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from blog.models import Comment, News, Post, Tag, Word, Word_Tag
+from blog.seed import SEED_SLUG_PREFIX, SEED_USER_PREFIX
+
+# 0010_hot_lookup_indexes에서 추가한 인덱스: (모델, 인덱스). 연결 테이블 인덱스도 포함.
+HOT_INDEXES = [
+    (Tag, models.Index(fields=['name'], name='blog_tag_name_idx')),
+    (Word_Tag, models.Index(fields=['name'], name='blog_word_tag_name_idx')),
+    (Word, models.Index(fields=['title'], name='blog_word_title_idx')),
+    (Comment, models.Index(fields=['post', 'id'], name='blog_comment_post_id_idx')),
+    (Post.tags.through, models.Index(fields=['tag', 'post'], name='blog_post_tags_tag_post_idx')),
+    (Word.tags.through, models.Index(fields=['word_tag', 'word'], name='blog_word_tags_tag_word_idx')),
+    (News.tags.through, models.Index(fields=['word_tag', 'news'], name='blog_news_tags_tag_news_idx')),
+]
+# db_index=True로 만든 필드 인덱스: (모델, 필드). 0003_news_created_at_index (오늘의 뉴스 조회)
+FIELD_INDEXES = [
+    (News, 'created_at'),
+]
+
+TAGS_PER_OBJECT = 3
+# 실제 사용자 / 태그와 겹치지 않도록 seed_data와 같은 표시를 쓴다. (blog/seed.py)
+BENCH_USERNAME = f'{SEED_USER_PREFIX}benchmark-queries'
+BENCH_SLUG_PREFIX = f'{SEED_SLUG_PREFIX}bench-'
+
+
+class Command(BaseCommand):
+    help = ('Post / Word / News / Comment / 태그를 N건씩 넣고, 자주 쓰는 조회의 EXPLAIN과 시간을 '
+            '인덱스 없이(before) / 있을 때(after) 비교합니다. 넣은 데이터는 끝나면 롤백합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20, help='조회당 반복 횟수 (평균 시간)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            fixtures = self.seed(options['rows'])
+            self.stdout.write(f"seed: {options['rows']}건씩 ({time.perf_counter() - started:.3f}초)")
+
+            queries = self.hot_queries(fixtures)
+            self.set_indexes(enabled=False)
+            before = self.run(queries, options['repeat'], 'before')
+            self.set_indexes(enabled=True)
+            after = self.run(queries, options['repeat'], 'after')
+
+            self.stdout.write('\n== summary (ms) ==')
+            for label in queries:
+                self.stdout.write(f'{label:<20} {before[label]:9.3f} -> {after[label]:9.3f}')
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        user = User.objects.create(username=BENCH_USERNAME)
+        tag_count = max(rows // 10, TAGS_PER_OBJECT)
+        tags = Tag.objects.bulk_create([
+            Tag(name=f'bench-{i}', slug=f'{BENCH_SLUG_PREFIX}{i}') for i in range(tag_count)
+        ])
+        word_tags = Word_Tag.objects.bulk_create([
+            Word_Tag(name=f'bench-{i}', slug=f'{BENCH_SLUG_PREFIX}{i}') for i in range(tag_count)
+        ])
+
+        posts = Post.objects.bulk_create(
+            [Post(title=f'bench {i}', content=f'bench post {i}', author=user) for i in range(rows)], batch_size=1000,
+        )
+        words = Word.objects.bulk_create(
+            [Word(title=f'bench {i}', content=f'bench word {i}', author=user) for i in range(rows)], batch_size=1000,
+        )
+        news = News.objects.bulk_create(
+            [News(title=f'bench {i}', content=f'bench news {i}', author=user) for i in range(rows)], batch_size=1000,
+        )
+        # 뉴스는 최근 rows시간에 걸쳐 흩어 놓는다.
+        now = datetime.now()
+        for i, item in enumerate(news):
+            item.created_at = now - timedelta(hours=i)
+        News.objects.bulk_update(news, ['created_at'], batch_size=1000)
+
+        Comment.objects.bulk_create([
+            Comment(post=posts[i % len(posts)], author=user, content=f'bench comment {i}') for i in range(rows * 3)
+        ], batch_size=1000)
+        for objects, tag_list, field in ((posts, tags, 'tag_id'), (words, word_tags, 'word_tag_id'),
+                                         (news, word_tags, 'word_tag_id')):
+            through = type(objects[0]).tags.through
+            source = f'{type(objects[0])._meta.model_name}_id'
+            through.objects.bulk_create([
+                through(**{source: obj.pk, field: tag_list[(i + j * 7) % len(tag_list)].pk})
+                for i, obj in enumerate(objects)
+                for j in range(TAGS_PER_OBJECT)
+            ], batch_size=2000, ignore_conflicts=True)
+        return {'post': posts[len(posts) // 2], 'tag': tags[1], 'word_tag': word_tags[1], 'now': now}
+
+    def hot_queries(self, fixtures):
+        now = fixtures['now']
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return {
+            'post list': lambda: Post.objects.order_by('-pk')[:6],
+            'post tag archive': lambda: Post.objects.filter(tags=fixtures['tag']).order_by('-pk')[:6],
+            'word tag archive': lambda: Word.objects.filter(tags=fixtures['word_tag']).order_by('-pk')[:6],
+            'tag resolve': lambda: Tag.objects.filter(name__in=['bench-1', 'bench-2', 'missing']),
+            'word tag resolve': lambda: Word_Tag.objects.filter(name__in=['bench-1', 'bench-2', 'missing']),
+            'word upsert': lambda: Word.objects.filter(title__in=['bench 1', 'bench 2', 'missing']),
+            'comment page': lambda: Comment.objects.filter(post=fixtures['post']).order_by('pk')[:21],
+            'today news': lambda: News.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+                                              .only('pk', 'title', 'created_at').order_by('created_at'),
+        }
+
+    def set_indexes(self, enabled):
+        # SQLite 스키마 에디터는 트랜잭션 안에서 열 수 없으므로 SQL만 만들어 직접 실행한다.
+        editor = connection.SchemaEditorClass(connection, collect_sql=True)
+        with connection.cursor() as cursor:
+            for model, index in HOT_INDEXES:
+                if enabled:
+                    sql = str(index.create_sql(model, editor))
+                else:
+                    sql = editor.sql_delete_index % {
+                        'name': editor.quote_name(index.name), 'table': editor.quote_name(model._meta.db_table),
+                    }
+                cursor.execute(sql)
+            for model, field_name in FIELD_INDEXES:
+                field = model._meta.get_field(field_name)
+                if enabled:
+                    sql = str(editor._create_index_sql(model, fields=[field]))
+                else:
+                    sql = editor.sql_delete_index % {
+                        'name': editor.quote_name(editor._create_index_name(model._meta.db_table, [field.column])),
+                        'table': editor.quote_name(model._meta.db_table),
+                    }
+                cursor.execute(sql)
+
+    def run(self, queries, repeat, phase):
+        timings = {}
+        for label, query in queries.items():
+            self.stdout.write(f'\n[{phase}] {label}')
+            self.stdout.write(query().explain())
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(query())
+            timings[label] = (time.perf_counter() - started) / repeat * 1000
+            self.stdout.write(f'{timings[label]:.3f} ms')
+        return timings
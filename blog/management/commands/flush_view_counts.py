@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog import view_counter
+
+
+class Command(BaseCommand):
+    help = '버퍼에 쌓인 게시글 조회수를 DB에 반영합니다. (cron 등으로 주기 실행)'
+
+    def handle(self, *args, **options):
+        count = view_counter.flush()
+        self.stdout.write(f'조회수 {count}건 반영')
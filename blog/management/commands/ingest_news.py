@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import news_feeds
+from blog.models import NewsFeed
+
+
+class Command(BaseCommand):
+    help = ('등록된 RSS / Atom 피드(NewsFeed)를 동시에 받아 새 뉴스를 넣습니다. 바뀌지 않은 피드는 조건부 요청(304)으로 '
+            '건너뛰고, 제목+본문이 같은 뉴스는 다시 넣지 않습니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feed', type=int, action='append', help='NewsFeed pk (기본값: 활성 피드 전체)')
+        parser.add_argument('--concurrency', type=int, default=news_feeds.NEWS_FEED_CONCURRENCY)
+        parser.add_argument('--parse-workers', type=int, default=news_feeds.NEWS_FEED_PARSE_WORKERS,
+                            help='파싱 프로세스 수 (0이면 스레드)')
+
+    def handle(self, *args, **options):
+        feeds = None
+        if options['feed']:
+            feeds = list(NewsFeed.objects.filter(pk__in=options['feed']))
+            if len(feeds) != len(set(options['feed'])):
+                raise CommandError('없는 피드가 있습니다.')
+
+        started = time.perf_counter()
+        results = news_feeds.ingest(feeds, concurrency=options['concurrency'], parse_workers=options['parse_workers'])
+        for feed, status, created, error in results:
+            self.stdout.write(f'{feed.name}: {status or "-"} 새 뉴스 {created}건{f" ({error})" if error else ""}')
+        total = sum(created for _, _, created, _ in results)
+        self.stdout.write(f'피드 {len(results)}개, 새 뉴스 {total}건 ({time.perf_counter() - started:.3f}초)')
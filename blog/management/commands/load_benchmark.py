@@ -0,0 +1,125 @@
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import override_settings
+
+from blog import async_reads, load_bench, page_cache
+from blog.models import Comment, News, Post, Tag, Word
+
+SEARCH_TERMS = ['금리', '환율', '물가', '반도체']
+DETAIL_SAMPLE = 20
+CALENDAR_MONTHS = 3
+
+
+class Command(BaseCommand):
+    help = ('landing / 목록 / 상세 / 검색 / 뉴스 달력을 프로세스 안에서 동시에 요청해 처리량과 지연 백분위를 '
+            '잽니다. 결과를 JSON으로 저장하고 --baseline과 비교해 회귀가 있으면 실패합니다. '
+            '--diff A B는 저장된 두 결과만 비교합니다. 글 상세 요청은 실제 방문처럼 조회수에 반영됩니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='엔드포인트당 요청 수')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi',
+                            help='wsgi: 동기 뷰를 스레드로, asgi: async 뷰를 이벤트 루프로')
+        parser.add_argument('--endpoint', action='append', help='측정할 엔드포인트 (기본값: 전체)')
+        parser.add_argument('--page-cache', action='store_true', help='페이지 캐시를 켠 채로 측정')
+        parser.add_argument('--output', help='결과 JSON 경로')
+        parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+        parser.add_argument('--threshold', type=float, default=load_bench.LOAD_BENCH_THRESHOLD,
+                            help='회귀로 볼 변화율(%%)')
+        parser.add_argument('--diff', nargs=2, metavar=('BASELINE', 'CURRENT'), help='실행하지 않고 두 결과만 비교')
+
+    def handle(self, *args, **options):
+        if options['diff']:
+            baseline, current = (self.load(path) for path in options['diff'])
+        else:
+            current = self.run(options)
+            if options['output']:
+                with open(options['output'], 'w', encoding='utf-8') as f:
+                    json.dump(current, f, ensure_ascii=False, indent=2)
+                self.stdout.write(f'저장: {options["output"]}')
+            if not options['baseline']:
+                return
+            baseline = self.load(options['baseline'])
+
+        rows = load_bench.compare(baseline, current, options['threshold'])
+        self.stdout.write(f'\n== diff ({baseline["meta"]["mode"]} -> {current["meta"]["mode"]}) ==')
+        for name, metric, old, new, change, worse in rows:
+            change = '' if change is None else f'{change:+.1f}%'
+            self.stdout.write(f'{name:<14} {metric:<8} {old:>10} -> {new:>10} {change:>8}{"  REGRESSION" if worse else ""}')
+        regressions = [row for row in rows if row[-1]]
+        if regressions:
+            raise CommandError(f'회귀 {len(regressions)}건 (기준 {options["threshold"]}%)')
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def endpoints(self):
+        def sample(model, prefix):
+            pks = model.objects.order_by('-pk').values_list('pk', flat=True)[:DETAIL_SAMPLE]
+            return [f'{prefix}{pk}/' for pk in pks]
+
+        today = date.today()
+        months = [(today.year * 12 + today.month - 1 - i) for i in range(CALENDAR_MONTHS)]
+        tag = Tag.objects.order_by('-pk').values_list('slug', flat=True).first()
+        # 댓글이 많은 글도 상세 표본에 넣는다.
+        busiest = (Comment.objects.values('post_id').annotate(count=Count('pk')).order_by('-count')
+                   .values_list('post_id', flat=True).first())
+        endpoints = {
+            'landing': ['/'],
+            'post_list': ['/blog/'],
+            'post_detail': sample(Post, '/blog/') + ([f'/blog/{busiest}/'] if busiest else []),
+            'post_tag': [f'/blog/tag/{tag}/'] if tag else [],
+            'post_search': [f'/blog/search/{q}/' for q in SEARCH_TERMS],
+            'word_list': ['/today_word/'],
+            'word_detail': sample(Word, '/today_word/'),
+            'news_list': ['/news/'],
+            'news_detail': sample(News, '/news/'),
+            'news_calendar': [f'/news/calendar/?month={m // 12}-{m % 12 + 1:02d}' for m in months],
+        }
+        return {name: urls for name, urls in endpoints.items() if urls}
+
+    def run(self, options):
+        endpoints = self.endpoints()
+        if options['endpoint']:
+            unknown = set(options['endpoint']) - set(endpoints)
+            if unknown:
+                raise CommandError(f'알 수 없는 엔드포인트: {", ".join(sorted(unknown))} (가능: {", ".join(endpoints)})')
+            endpoints = {name: endpoints[name] for name in options['endpoint']}
+        run = load_bench.run_async if options['mode'] == 'asgi' else load_bench.run_sync
+
+        results = {}
+        enabled = page_cache.PAGE_CACHE_ENABLED
+        page_cache.PAGE_CACHE_ENABLED = options['page_cache']
+        try:
+            # 테스트 클라이언트의 Host(testserver)를 허용하고, 모드에 맞는 뷰로 URL을 다시 읽는다.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                                   ASYNC_READ_VIEWS=options['mode'] == 'asgi'):
+                async_reads.reload_urlconfs()
+                for name, urls in endpoints.items():
+                    load_bench.warm_up(urls)
+                    results[name] = run(urls, options['requests'], options['concurrency'])
+                    self.stdout.write(self.format(name, results[name]))
+        finally:
+            page_cache.PAGE_CACHE_ENABLED = enabled
+            async_reads.reload_urlconfs()
+
+        return {
+            'meta': {
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'mode': options['mode'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'page_cache': options['page_cache'],
+                'rows': {model.__name__.lower(): model.objects.count() for model in (Post, Comment, Word, News, Tag)},
+            },
+            'endpoints': results,
+        }
+
+    def format(self, name, result):
+        return (f'{name:<14} p50 {result["p50_ms"]:8.2f}ms  p90 {result["p90_ms"]:8.2f}ms  '
+                f'p99 {result["p99_ms"]:8.2f}ms  {result["rps"]:8.1f} req/s  errors {result["errors"]}')
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog import page_cache, related_words, search, semantic, tag_stats, word_loader, word_schedule
+
+DEFAULT_PATH = settings.BASE_DIR / 'data' / '700words.csv'
+
+
+class Command(BaseCommand):
+    help = '경제 용어 CSV(title,content,related_keyword)를 Word / Word_Tag에 한꺼번에 넣습니다. 같은 제목은 갱신합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=str(DEFAULT_PATH))
+        parser.add_argument('--batch-size', type=int, default=word_loader.WORD_LOAD_BATCH_SIZE)
+        parser.add_argument('--skip-index', action='store_true',
+                            help='검색 / 의미 검색 색인과 관련 용어 계산을 건너뜁니다. '
+                                 '(나중에 rebuild_search_index, rebuild_semantic_index, rebuild_related_words)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        words, created, updated, rows = word_loader.load_words(
+            word_loader.read_csv(options['path']), batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'word: {rows}행 중 추가 {created}건, 갱신 {updated}건 ({elapsed:.3f}초, {rows / elapsed if elapsed else 0:.0f} rows/s)'
+        )
+
+        # bulk_create / bulk_update는 시그널을 보내지 않으므로 태그 집계, 색인, 페이지 캐시는 여기서 갱신한다.
+        tag_stats.rebuild('word')
+        if words and not options['skip_index']:
+            started = time.perf_counter()
+            search.index_objects(words)
+            semantic.update_objects(words)
+            self.stdout.write(f'word: {len(words)}건 색인 ({time.perf_counter() - started:.3f}초)')
+            # 관련 용어는 본문 유사도에 검색 색인을 쓰므로 색인한 경우에만, 불러온 단어와 그 이웃만 다시 계산한다.
+            started = time.perf_counter()
+            count = related_words.update_words([word.pk for word in words])
+            self.stdout.write(f'word: {count}건 관련 용어 계산 ({time.perf_counter() - started:.3f}초)')
+        page_cache.bump('word', 'word_tag')
+        word_schedule.invalidate()
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import near_duplicates
+
+
+class Command(BaseCommand):
+    help = ('Post / News 근접 중복 확인용 MinHash 서명과 LSH 버킷을 처음부터 다시 만듭니다. '
+            '(bulk_create 등으로 넣은 데이터 반영) --list로 다시 만들지 않고 묶음만 봅니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=near_duplicates.KINDS, help='대상 모델 (기본값: 전체)')
+        parser.add_argument('--batch-size', type=int, default=near_duplicates.NEAR_DUP_BATCH_SIZE)
+        parser.add_argument('--list', action='store_true', help='글이 두 개 이상인 근접 중복 묶음을 출력')
+
+    def handle(self, *args, **options):
+        for kind in options['model'] or near_duplicates.KINDS:
+            if not options['list']:
+                started = time.perf_counter()
+                count = near_duplicates.rebuild(kind, batch_size=options['batch_size'])
+                self.stdout.write(f'{kind}: {count}건 ({time.perf_counter() - started:.3f}초)')
+            clusters = near_duplicates.clusters(kind)
+            self.stdout.write(f'{kind}: 근접 중복 묶음 {len(clusters)}개')
+            if options['list']:
+                for leader, members in clusters:
+                    self.stdout.write(f'  {leader}: {", ".join(map(str, members))}')
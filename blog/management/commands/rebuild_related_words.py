@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import related_words
+
+
+class Command(BaseCommand):
+    help = '모든 단어의 관련 용어(공유 태그 / 관련 키워드 / 본문 유사도) 목록을 다시 계산합니다. 검색 색인이 먼저 있어야 합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = related_words.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'word: {count}건 관련 용어 계산 ({time.perf_counter() - started:.3f}초)')
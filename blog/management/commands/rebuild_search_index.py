@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+KINDS = ['post', 'word', 'news']
+
+
+class Command(BaseCommand):
+    help = 'Post / Word / News 검색 색인을 처음부터 다시 만듭니다. (bulk_create 등으로 넣은 데이터 반영)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=KINDS, help='대상 모델 (기본값: 전체)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for kind in options['model'] or KINDS:
+            count = search.rebuild(kind, batch_size=options['batch_size'])
+            self.stdout.write(f'{kind}: {count}건 색인')
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import semantic
+
+KINDS = ['post', 'word', 'news']
+
+
+class Command(BaseCommand):
+    help = 'Post / Word / News 본문을 다시 임베딩해서 의미 검색(FAISS) 인덱스를 새로 만듭니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=KINDS, help='대상 모델 (기본값: 전체)')
+        parser.add_argument('--batch-size', type=int, default=semantic.SEMANTIC_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        for kind in options['model'] or KINDS:
+            started = time.perf_counter()
+            count = semantic.rebuild(kind, batch_size=options['batch_size'])
+            self.stdout.write(f'{kind}: {count}건 임베딩 ({time.perf_counter() - started:.3f}초, {semantic.index_dir()})')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog import tag_stats
+
+KINDS = ['post', 'word', 'news']
+
+
+class Command(BaseCommand):
+    help = 'Tag / Word_Tag 사용 횟수 집계를 연결 테이블에서 다시 계산합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=KINDS, help='대상 모델 (기본값: 전체)')
+
+    def handle(self, *args, **options):
+        for kind in options['model'] or KINDS:
+            count = tag_stats.rebuild(kind)
+            self.stdout.write(f'{kind}: 태그 {count}개 집계')
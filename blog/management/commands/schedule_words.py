@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from blog import word_schedule
+
+
+class Command(BaseCommand):
+    help = '오늘(또는 --start)부터 날짜별 오늘의 단어를 미리 배정합니다. 이미 배정된 날짜는 그대로 둡니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=word_schedule.WORD_SCHEDULE_DAYS)
+        parser.add_argument('--start', type=date.fromisoformat, help='시작 날짜 YYYY-MM-DD (기본값: 오늘)')
+
+    def handle(self, *args, **options):
+        count = word_schedule.schedule(options['start'], days=options['days'])
+        self.stdout.write(f'word_schedule: {count}일 배정')
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import near_duplicates, page_cache, search, seed, semantic, tag_stats, today_news, word_schedule
+
+KINDS = ['post', 'word', 'news']
+
+
+class Command(BaseCommand):
+    help = ('부하 측정용 User / Post / Comment / Tag / Word / Word_Tag / News를 bulk insert로 넣습니다. '
+            '태그, 댓글, 작성자는 일부에 몰리도록(Zipf) 고릅니다. --clear로 넣은 데이터를 지웁니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--words', type=int, default=1000)
+        parser.add_argument('--word-tags', type=int, default=200)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=365, help='작성일을 최근 며칠에 걸쳐 흩어 놓을지')
+        parser.add_argument('--max-tags', type=int, default=4, help='글 하나에 붙일 최대 태그 수')
+        parser.add_argument('--seed', type=int, default=42, help='난수 시드 (같으면 같은 데이터)')
+        parser.add_argument('--batch-size', type=int, default=seed.SEED_BATCH_SIZE)
+        parser.add_argument('--clear', action='store_true', help='넣지 않고 이전에 넣은 seed 데이터를 지웁니다.')
+        parser.add_argument('--skip-index', action='store_true',
+                            help='검색 / 의미 검색 색인과 근접 중복 서명을 건너뜁니다. '
+                                 '(나중에 rebuild_search_index, rebuild_semantic_index, rebuild_near_duplicates)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['clear']:
+            counts = seed.clear()
+            self.stdout.write(f'삭제: {self.format(counts)} ({time.perf_counter() - started:.3f}초)')
+        else:
+            counts = seed.seed(
+                users=options['users'], posts=options['posts'], comments=options['comments'],
+                tags=options['tags'], words=options['words'], word_tags=options['word_tags'],
+                news=options['news'], days=options['days'], max_tags=options['max_tags'],
+                seed=options['seed'], batch_size=options['batch_size'],
+            )
+            elapsed = time.perf_counter() - started
+            rows = sum(counts.values())
+            self.stdout.write(f'추가: {self.format(counts)} ({elapsed:.3f}초, {rows / elapsed if elapsed else 0:.0f} rows/s)')
+
+        # bulk insert / 직접 삭제는 시그널을 보내지 않으므로 집계, 색인, 캐시는 여기서 갱신한다.
+        for kind in KINDS:
+            tag_stats.rebuild(kind)
+        if not options['skip_index']:
+            for kind in KINDS:
+                started = time.perf_counter()
+                count = search.rebuild(kind)
+                semantic.rebuild(kind)
+                if kind in near_duplicates.KINDS:
+                    near_duplicates.rebuild(kind)
+                self.stdout.write(f'{kind}: {count}건 색인 ({time.perf_counter() - started:.3f}초)')
+        page_cache.bump('post', 'word', 'news', 'tag', 'word_tag')
+        today_news.invalidate()
+        word_schedule.invalidate()
+
+    def format(self, counts):
+        return ', '.join(f'{key} {count}' for key, count in counts.items())
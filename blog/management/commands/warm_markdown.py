@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from blog import markdown_cache
+from blog.models import Post, Word, News
+
+MODELS = {
+    'post': Post,
+    'word': Word,
+    'news': News,
+}
+
+
+class Command(BaseCommand):
+    help = 'Post / Word / News 본문의 렌더링된 Markdown HTML을 미리 채웁니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=list(MODELS), help='대상 모델 (기본값: 전체)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for name in options['model'] or list(MODELS):
+            count = markdown_cache.warm(MODELS[name].objects.all(), batch_size=options['batch_size'])
+            self.stdout.write(f'{name}: {count}건 ({markdown_cache.MARKDOWN_CACHE_STORE})')
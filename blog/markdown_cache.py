@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.text import Truncator
+from markdownx.utils import markdown
+
+from .perf import span
+
+# 'column' : 렌더링 결과를 모델의 content_html / content_excerpt 컬럼에 저장
+# 'cache'  : 렌더링 결과를 Django 캐시 백엔드에 (pk, updated_at) 키로 저장
+MARKDOWN_CACHE_STORE = getattr(settings, 'MARKDOWN_CACHE_STORE', 'column')
+MARKDOWN_CACHE_TIMEOUT = getattr(settings, 'MARKDOWN_CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+
+# 목록 페이지 카드에 보여줄 요약 단어 수 (기존 truncatewords_html:45)
+EXCERPT_WORDS = 45
+
+
+def cache_key(obj):
+    stamp = obj.updated_at.timestamp() if obj.updated_at else 0
+    return f'markdown:{obj._meta.label_lower}:{obj.pk}:{stamp}'
+
+
+def render(content):
+    html = markdown(content)
+    excerpt = Truncator(html).words(EXCERPT_WORDS, html=True)
+    return html, excerpt
+
+
+def refresh(obj, update_fields=None):
+    """save() 직전에 호출해서 본문을 한 번만 렌더링한다. save()에 넘길 update_fields를 반환.
+
+    update_fields에 content가 없으면 본문이 바뀌지 않으므로 렌더링하지 않는다.
+    """
+    if update_fields is not None and 'content' not in update_fields:
+        obj._rendered_markdown = None
+        return update_fields
+    obj._rendered_markdown = render(obj.content)
+    if update_fields is not None:
+        # auto_now는 update_fields에 없으면 DB에 쓰이지 않는다. 캐시 키가 updated_at이므로 함께 저장한다.
+        update_fields = [*update_fields, 'updated_at']
+    if MARKDOWN_CACHE_STORE == 'column':
+        obj.content_html, obj.content_excerpt = obj._rendered_markdown
+        if update_fields is not None:
+            update_fields = [*update_fields, 'content_html', 'content_excerpt']
+    return update_fields
+
+
+def _is_rendered(obj):
+    # 본문이 비어 있으면 렌더링 결과도 비어 있는 것이 맞다. content_html만 보면 매번 다시 렌더링한다.
+    return bool(obj.content_html) or not obj.content.strip()
+
+
+def store(obj):
+    """save() 직후에 호출. 캐시 모드에서는 새 updated_at 키로 미리 넣어 둔다."""
+    rendered = getattr(obj, '_rendered_markdown', None)
+    if MARKDOWN_CACHE_STORE == 'cache' and rendered is not None:
+        cache.set(cache_key(obj), rendered, MARKDOWN_CACHE_TIMEOUT)
+
+
+def get_rendered(obj):
+    with span('markdown'):
+        return _get_rendered(obj)
+
+
+def _get_rendered(obj):
+    if MARKDOWN_CACHE_STORE == 'column':
+        if _is_rendered(obj):
+            return obj.content_html, obj.content_excerpt
+        # bulk_create 등으로 save()를 거치지 않은 행은 처음 읽을 때 채운다.
+        # update()는 auto_now 필드를 건드리지 않으므로 updated_at이 바뀌지 않는다.
+        rendered = render(obj.content)
+        obj.content_html, obj.content_excerpt = rendered
+        # 링크 정의만 있는 본문처럼 결과가 비면 저장해도 달라지지 않는다.
+        if obj.pk and rendered[0]:
+            type(obj).objects.filter(pk=obj.pk).update(content_html=rendered[0], content_excerpt=rendered[1])
+        return rendered
+
+    key = cache_key(obj)
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = render(obj.content)
+        cache.set(key, rendered, MARKDOWN_CACHE_TIMEOUT)
+    return rendered
+
+
+def warm(queryset, batch_size=500):
+    """queryset 전체를 batch_size 단위로 렌더링해서 저장소에 채운다. 처리한 행 수를 반환."""
+    model = queryset.model
+    count = 0
+    batch = []
+    for obj in queryset.only('pk', 'content', 'updated_at').iterator(chunk_size=batch_size):
+        obj.content_html, obj.content_excerpt = render(obj.content)
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            _flush(model, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        _flush(model, batch)
+        count += len(batch)
+    return count
+
+
+def _flush(model, batch):
+    if MARKDOWN_CACHE_STORE == 'column':
+        model.objects.bulk_update(batch, ['content_html', 'content_excerpt'])
+    else:
+        cache.set_many(
+            {cache_key(obj): (obj.content_html, obj.content_excerpt) for obj in batch},
+            MARKDOWN_CACHE_TIMEOUT,
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_content_html'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='news',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_image_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word',
+            name='title',
+            field=models.CharField(max_length=50),
+        ),
+    ]
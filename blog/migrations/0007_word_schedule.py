@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_word_title_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordSchedule',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='blog.word')),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
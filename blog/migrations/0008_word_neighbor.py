@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_word_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.word')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='blog.word')),
+            ],
+            options={
+                'ordering': ['word', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('word', 'rank'), name='unique_word_neighbor_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_word_neighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('tag_id', models.PositiveBigIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', '-count'], name='tag_stat_kind_count_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'tag_id'), name='unique_tag_stat')],
+            },
+        ),
+    ]
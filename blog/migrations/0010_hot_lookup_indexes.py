@@ -0,0 +1,56 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+# 자동 생성된 M2M 연결 테이블에는 Meta.indexes를 줄 수 없으므로 직접 만든다.
+# 태그 아카이브는 tag_id로 거르고 글 pk 역순으로 읽는다: (tag_id, post_id)
+THROUGH_INDEXES = [
+    ('post', 'tag', 'post', 'blog_post_tags_tag_post_idx'),
+    ('word', 'word_tag', 'word', 'blog_word_tags_tag_word_idx'),
+    ('news', 'word_tag', 'news', 'blog_news_tags_tag_news_idx'),
+]
+
+
+def _through_indexes(apps):
+    for model_name, tag_field, object_field, name in THROUGH_INDEXES:
+        through = apps.get_model('blog', model_name)._meta.get_field('tags').remote_field.through
+        yield through, models.Index(fields=[tag_field, object_field], name=name)
+
+
+def add_through_indexes(apps, schema_editor):
+    for through, index in _through_indexes(apps):
+        schema_editor.add_index(through, index)
+
+
+def remove_through_indexes(apps, schema_editor):
+    for through, index in _through_indexes(apps):
+        schema_editor.remove_index(through, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_tag_stat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'id'], name='blog_comment_post_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['name'], name='blog_tag_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['title'], name='blog_word_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word_tag',
+            index=models.Index(fields=['name'], name='blog_word_tag_name_idx'),
+        ),
+        migrations.RunPython(add_through_indexes, remove_through_indexes),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:33
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    # News.save()가 채우는 것과 같은 해시 (blog.models.news_hash). save()를 거치지 않으므로 여기서 계산한다.
+    News = apps.get_model('blog', 'News')
+    batch = []
+    for news in News.objects.only('pk', 'title', 'content').iterator(chunk_size=500):
+        text = '\n'.join(' '.join(part.split()).lower() for part in (news.title, news.content))
+        news.content_hash = hashlib.sha256(text.encode()).hexdigest()
+        batch.append(news)
+        if len(batch) >= 500:
+            News.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    News.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('etag', models.CharField(blank=True, editable=False, max_length=200)),
+                ('last_modified', models.CharField(blank=True, editable=False, max_length=100)),
+                ('last_fetched_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('last_status', models.PositiveSmallIntegerField(blank=True, editable=False, null=True)),
+                ('last_error', models.TextField(blank=True, editable=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='source_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
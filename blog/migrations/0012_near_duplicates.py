@@ -0,0 +1,40 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_news_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('signature', models.BinaryField()),
+                ('cluster', models.PositiveBigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'cluster'], name='content_signature_cluster_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_content_signature')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('bucket', models.BigIntegerField()),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='blog.contentsignature')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'bucket'], name='signature_band_bucket_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('filename', models.CharField(db_index=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('last_access', models.DateTimeField()),
+            ],
+        ),
+    ]
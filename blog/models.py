@@ -4,12 +4,19 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from markdownx.models import MarkdownxField
-from markdownx.utils import markdown
+import hashlib
 import os
 
+from . import markdown_cache, view_counter
+
 class Tag(models.Model):
     name = models.CharField(max_length=50)
     slug = models.SlugField(max_length=200, unique=True, allow_unicode=True)
+
+    class Meta:
+        # 태그 입력을 이름으로 찾는다 (tags.resolve_tags)
+        indexes = [models.Index(fields=['name'], name='blog_tag_name_idx')]
+
     def __str__(self):
         return self.name
     def get_absolute_url(self):
@@ -18,6 +25,10 @@ class Tag(models.Model):
 class Word_Tag(models.Model):
     name = models.CharField(max_length=50)
     slug = models.SlugField(max_length=200, unique=True, allow_unicode=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['name'], name='blog_word_tag_name_idx')]
+
     def __str__(self):
         return self.name
     def get_absolute_url(self):
@@ -26,6 +37,9 @@ class Word_Tag(models.Model):
 class Post(models.Model):
     title = models.CharField(max_length=30)
     content = MarkdownxField()
+    # 렌더링된 본문 HTML과 목록용 요약 (markdown_cache 참고)
+    content_html = models.TextField(blank=True, editable=False)
+    content_excerpt = models.TextField(blank=True, editable=False)
 
     head_image = models.ImageField(upload_to='blog/images/%Y/%m/%d/', blank=True)
 
@@ -51,12 +65,24 @@ class Post(models.Model):
         return self.get_file_name().split('.')[-1]
 
     def get_content_markdown(self):
-        return markdown(self.content)
+        return markdown_cache.get_rendered(self)[0]
+
+    def get_content_excerpt(self):
+        return markdown_cache.get_rendered(self)[1]
+
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = markdown_cache.refresh(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        markdown_cache.store(self)
 
     @property
     def update_count(self):
-        self.view_count += 1
-        self.save()
+        # 조회마다 save() 하지 않고 view_counter에 모았다가 한꺼번에 반영
+        view_counter.increment(self.pk)
+
+    @property
+    def total_view_count(self):
+        return self.view_count + view_counter.pending(self.pk)
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
@@ -65,6 +91,10 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # 글별 댓글을 pk 커서로 페이지 단위로 읽는다 (views.comment_page)
+        indexes = [models.Index(fields=['post', 'id'], name='blog_comment_post_id_idx')]
+
     def __str__(self):
         return f'{self.author}::{self.content}'
 
@@ -74,8 +104,11 @@ class Comment(models.Model):
 
 
 class Word(models.Model):
-    title = models.CharField(max_length=30)
+    title = models.CharField(max_length=50)
     content = MarkdownxField()
+    # 렌더링된 본문 HTML과 목록용 요약 (markdown_cache 참고)
+    content_html = models.TextField(blank=True, editable=False)
+    content_excerpt = models.TextField(blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -84,6 +117,10 @@ class Word(models.Model):
 
     tags = models.ManyToManyField(Word_Tag, blank=True)
 
+    class Meta:
+        # 같은 제목의 단어를 찾아 갱신한다 (word_loader.load_words)
+        indexes = [models.Index(fields=['title'], name='blog_word_title_idx')]
+
     def __str__(self):
         return f'[{self.pk}]{self.title} :: {self.author}'
 
@@ -97,19 +134,34 @@ class Word(models.Model):
         return self.get_file_name().split('.')[-1]
 
     def get_content_markdown(self):
-        return markdown(self.content)
+        return markdown_cache.get_rendered(self)[0]
+
+    def get_content_excerpt(self):
+        return markdown_cache.get_rendered(self)[1]
+
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = markdown_cache.refresh(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        markdown_cache.store(self)
 
 class News(models.Model):
     title = models.CharField(max_length=30)
     content = MarkdownxField()
+    # 렌더링된 본문 HTML과 목록용 요약 (markdown_cache 참고)
+    content_html = models.TextField(blank=True, editable=False)
+    content_excerpt = models.TextField(blank=True, editable=False)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     author = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
 
     tags = models.ManyToManyField(Word_Tag, blank=True)
 
+    # 피드에서 가져온 뉴스의 원문 링크, 중복 확인용 제목+본문 해시 (blog/news_feeds.py)
+    source_url = models.URLField(max_length=500, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+
     def __str__(self):
         return f'[{self.pk}]{self.title} :: {self.author}'
 
@@ -123,9 +175,198 @@ class News(models.Model):
         return self.get_file_name().split('.')[-1]
 
     def get_content_markdown(self):
-        return markdown(self.content)
+        return markdown_cache.get_rendered(self)[0]
+
+    def get_content_excerpt(self):
+        return markdown_cache.get_rendered(self)[1]
+
+    def save(self, *args, **kwargs):
+        update_fields = markdown_cache.refresh(self, kwargs.get('update_fields'))
+        self.content_hash = news_hash(self.title, self.content)
+        if update_fields is not None and {'title', 'content'} & set(update_fields):
+            update_fields = [*update_fields, 'content_hash']
+        kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        markdown_cache.store(self)
+
+
+def news_hash(title, content):
+    """공백과 대소문자 차이를 무시한 제목+본문 sha256. 같은 기사가 여러 피드에 실려도 한 번만 넣는다."""
+    text = '\n'.join(' '.join(part.split()).lower() for part in (title, content))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class NewsFeed(models.Model):
+    # 뉴스를 가져올 RSS / Atom 피드. etag / last_modified는 조건부 요청에 쓴다. (blog/news_feeds.py)
+    name = models.CharField(max_length=100)
+    url = models.URLField(max_length=500, unique=True)
+    is_active = models.BooleanField(default=True)
+
+    etag = models.CharField(max_length=200, blank=True, editable=False)
+    last_modified = models.CharField(max_length=100, blank=True, editable=False)
+    last_fetched_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_status = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True, editable=False)
+
+    def __str__(self):
+        return self.name
+
+
+class SearchDocument(models.Model):
+    # 검색 색인에 올라간 Post / Word / News 한 건 (blog/search.py 참고)
+    kind = models.CharField(max_length=10)
+    object_id = models.PositiveBigIntegerField()
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}'
+
+
+class SearchPosting(models.Model):
+    # 역색인: 토큰 -> 문서, 문서 안 등장 횟수
+    term = models.CharField(max_length=50)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'document'], name='search_posting_term_idx'),
+        ]
 
+    def __str__(self):
+        return f'{self.term} -> {self.document} ({self.frequency})'
+
+
+class ContentSignature(models.Model):
+    # Post / News 본문의 MinHash 서명과 근접 중복 묶음 (blog/near_duplicates.py 참고)
+    kind = models.CharField(max_length=10)
+    object_id = models.PositiveBigIntegerField()
+    # uint32 NEAR_DUP_NUM_PERM개 (little endian)
+    signature = models.BinaryField()
+    # 묶음의 대표(가장 먼저 들어온 글)의 object_id. 중복이 없으면 자기 자신.
+    cluster = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_content_signature'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'cluster'], name='content_signature_cluster_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id} -> {self.cluster}'
+
+    @property
+    def is_duplicate(self):
+        return self.cluster != self.object_id
+
+
+class SignatureBand(models.Model):
+    # LSH 밴드 버킷 -> 서명. 버킷이 하나라도 같은 서명만 비교 후보가 된다.
+    signature = models.ForeignKey(ContentSignature, on_delete=models.CASCADE, related_name='bands')
+    kind = models.CharField(max_length=10)
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'bucket'], name='signature_band_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.bucket} -> {self.signature_id}'
+
+
+class ImageJob(models.Model):
+    # DALL·E 이미지 생성 작업 (blog/image_jobs.py 참고)
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, '대기'),
+        (RUNNING, '생성 중'),
+        (DONE, '완료'),
+        (FAILED, '실패'),
+    ]
+
+    prompt = models.TextField()
+    prompt_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'[{self.pk}]{self.status} :: {self.prompt[:30]}'
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
 
 
+class CachedImage(models.Model):
+    # 프롬프트 해시 -> generated_images/ 파일. 크기와 마지막 사용 시각으로 LRU 정리 (blog/image_cache.py 참고)
+    key = models.CharField(max_length=64, unique=True)
+    filename = models.CharField(max_length=100, db_index=True)
+    size = models.PositiveBigIntegerField()
+    last_access = models.DateTimeField()
 
+    def __str__(self):
+        return f'{self.key[:12]} -> {self.filename}'
+
+
+class WordSchedule(models.Model):
+    # 날짜별 오늘의 단어 (blog/word_schedule.py가 미리 채운다)
+    date = models.DateField(primary_key=True)
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='schedules')
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f'{self.date} {self.word.title}'
+
+
+class WordNeighbor(models.Model):
+    # 단어별 관련 용어 상위 k개 (blog/related_words.py가 미리 계산한다)
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['word', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['word', 'rank'], name='unique_word_neighbor_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.word_id} -> {self.neighbor_id} ({self.score:.3f})'
+
+
+class TagStat(models.Model):
+    # 태그별 사용 횟수 집계 (blog/tag_stats.py가 m2m_changed로 갱신)
+    # kind는 태그가 붙은 모델: 'post' -> Tag, 'word' / 'news' -> Word_Tag
+    kind = models.CharField(max_length=10)
+    tag_id = models.PositiveBigIntegerField()
+    count = models.IntegerField(default=0)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'tag_id'], name='unique_tag_stat'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', '-count'], name='tag_stat_kind_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.tag_id} ({self.count})'
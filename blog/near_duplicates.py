@@ -0,0 +1,240 @@
+import re
+from collections import defaultdict
+
+import mmh3
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+# MinHash 서명 길이(해시 함수 수)와 LSH 밴드 수. 밴드 하나는 NUM_PERM / BANDS개 값으로 이루어진다.
+# 32밴드 x 4행이면 자카드 유사도 0.6인 두 글이 같은 버킷에 한 번이라도 들어갈 확률이 약 99%다.
+NEAR_DUP_NUM_PERM = getattr(settings, 'NEAR_DUP_NUM_PERM', 128)
+NEAR_DUP_BANDS = getattr(settings, 'NEAR_DUP_BANDS', 32)
+# 후보 중 추정 자카드 유사도가 이 값 이상이면 근접 중복으로 본다. 짧은 기사는 제목만 바뀌어도 0.6대로 떨어진다.
+NEAR_DUP_THRESHOLD = getattr(settings, 'NEAR_DUP_THRESHOLD', 0.6)
+# 글자 단위 shingle 길이. 한글은 한 글자에 정보가 많아 3글자로 충분하다.
+NEAR_DUP_SHINGLE = getattr(settings, 'NEAR_DUP_SHINGLE', 3)
+# 서명에 쓰는 본문 앞부분 길이(공백 / 문장 부호 제외 글자 수). 긴 본문도 계산량과 메모리가 일정하다.
+NEAR_DUP_MAX_CHARS = getattr(settings, 'NEAR_DUP_MAX_CHARS', 20000)
+NEAR_DUP_SEED = 20241107
+NEAR_DUP_BATCH_SIZE = 500
+# 한 번에 해시하는 shingle 수. (청크 x NEAR_DUP_NUM_PERM) uint64 배열만 잡는다. (1024 x 128 = 1MB)
+NEAR_DUP_CHUNK = 1024
+
+KINDS = ('post', 'news')
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# 해시 함수 (a * x + b) mod p. a, b가 2^32 미만이므로 a * x + b가 uint64를 넘지 않는다.
+_rng = np.random.default_rng(NEAR_DUP_SEED)
+_A = _rng.integers(1, 1 << 32, size=NEAR_DUP_NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, size=NEAR_DUP_NUM_PERM, dtype=np.uint64)
+_ROWS = NEAR_DUP_NUM_PERM // NEAR_DUP_BANDS
+
+
+def _models():
+    from .models import News, Post
+    return {'post': Post, 'news': News}
+
+
+def kind_of(obj):
+    return obj._meta.model_name
+
+
+def shingles(text):
+    """공백과 문장 부호를 뺀 소문자 본문(앞 NEAR_DUP_MAX_CHARS자)의 NEAR_DUP_SHINGLE 글자 조각 집합."""
+    text = re.sub(r'[\W_]+', '', text.lower())[:NEAR_DUP_MAX_CHARS]
+    if len(text) <= NEAR_DUP_SHINGLE:
+        return {text} if text else set()
+    return {text[i:i + NEAR_DUP_SHINGLE] for i in range(len(text) - NEAR_DUP_SHINGLE + 1)}
+
+
+def signature(text):
+    """본문의 MinHash 서명 (uint32 NEAR_DUP_NUM_PERM개)."""
+    values = np.fromiter((mmh3.hash(s, signed=False) for s in shingles(text)), dtype=np.uint64)
+    sig = np.full(NEAR_DUP_NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(values), NEAR_DUP_CHUNK):
+        hashed = (np.outer(values[start:start + NEAR_DUP_CHUNK], _A) + _B) % _MERSENNE_PRIME & _MAX_HASH
+        np.minimum(sig, hashed.min(axis=0), out=sig)
+    return sig.astype(np.uint32)
+
+
+def document_signature(obj):
+    return signature(f'{obj.title}\n{obj.content}')
+
+
+def similarity(a, b):
+    """두 서명으로 추정한 자카드 유사도 (0~1)."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def pack(sig):
+    return sig.astype('<u4').tobytes()
+
+
+def unpack(data):
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def band_keys(sig):
+    # 밴드 번호를 시드로 써서 밴드가 달라도 같은 값이면 버킷이 겹치지 않게 한다.
+    data = sig.astype('<u4').tobytes()
+    step = _ROWS * 4
+    return [mmh3.hash64(data[i * step:(i + 1) * step], seed=i, signed=True)[0] for i in range(NEAR_DUP_BANDS)]
+
+
+class _Buckets:
+    """LSH 버킷 -> 서명 목록. 같은 버킷에 든 서명끼리만 비교한다."""
+
+    def __init__(self):
+        self.buckets = defaultdict(list)
+
+    def add(self, keys, entry):
+        for key in keys:
+            self.buckets[key].append(entry)
+
+    def best(self, sig, keys, exclude=None):
+        best, best_score, seen = None, 0.0, set()
+        for key in keys:
+            for entry in self.buckets.get(key, ()):
+                if id(entry) in seen or (exclude is not None and entry['object_id'] == exclude):
+                    continue
+                seen.add(id(entry))
+                score = similarity(sig, entry['signature'])
+                if score >= NEAR_DUP_THRESHOLD and score > best_score:
+                    best, best_score = entry, score
+        return best, best_score
+
+
+def _load_buckets(kind, keys):
+    """keys 중 하나라도 겹치는 저장된 서명을 버킷에 담아 온다. (kind, bucket) 인덱스만 탄다."""
+    from .models import ContentSignature
+
+    buckets, entries = _Buckets(), {}
+    keys = list(keys)
+    for start in range(0, len(keys), NEAR_DUP_BATCH_SIZE):
+        for pk, object_id, data, cluster, bucket in ContentSignature.objects.filter(
+            kind=kind, bands__bucket__in=keys[start:start + NEAR_DUP_BATCH_SIZE],
+        ).values_list('pk', 'object_id', 'signature', 'cluster', 'bands__bucket'):
+            if pk not in entries:
+                entries[pk] = {'object_id': object_id, 'signature': unpack(data), 'cluster': cluster}
+            buckets.buckets[bucket].append(entries[pk])
+    return buckets
+
+
+def check(objects):
+    """같은 종류 objects를 차례로 저장된 글, 그리고 앞선 objects와 비교한다.
+
+    [(obj, 서명, 대표, 유사도), ...]를 반환한다. 대표는 근접 중복 묶음의 대표로, 저장된 글이면 그 pk,
+    같은 objects 중 앞선 것이면 그 객체, 중복이 아니면 None. 저장 전 객체도 넘길 수 있다.
+    """
+    objects = list(objects)
+    if not objects:
+        return []
+    kind = kind_of(objects[0])
+    signatures = [document_signature(obj) for obj in objects]
+    keys = [band_keys(sig) for sig in signatures]
+    buckets = _load_buckets(kind, {key for row in keys for key in row})
+
+    rows = []
+    for obj, sig, obj_keys in zip(objects, signatures, keys):
+        match, score = buckets.best(sig, obj_keys, exclude=obj.pk)
+        cluster = match['cluster'] if match else None
+        rows.append((obj, sig, cluster, score))
+        buckets.add(obj_keys, {'object_id': obj.pk, 'signature': sig, 'cluster': cluster if match else obj})
+    return rows
+
+
+def store(rows):
+    """check()의 결과를 objects가 저장된 뒤 서명과 LSH 버킷으로 저장한다."""
+    from .models import ContentSignature, SignatureBand
+
+    rows = list(rows)
+    if not rows:
+        return 0
+    kind = kind_of(rows[0][0])
+    with transaction.atomic():
+        ContentSignature.objects.filter(kind=kind, object_id__in=[obj.pk for obj, *_ in rows]).delete()
+        signatures = ContentSignature.objects.bulk_create([
+            ContentSignature(
+                kind=kind, object_id=obj.pk, signature=pack(sig),
+                cluster=obj.pk if cluster is None else getattr(cluster, 'pk', cluster),
+            )
+            for obj, sig, cluster, _ in rows
+        ], batch_size=NEAR_DUP_BATCH_SIZE)
+        SignatureBand.objects.bulk_create([
+            SignatureBand(signature=signature, kind=kind, bucket=key)
+            for signature, (_, sig, _, _) in zip(signatures, rows)
+            for key in band_keys(sig)
+        ], batch_size=2000)
+    return len(rows)
+
+
+def index_objects(objects):
+    """저장된 같은 종류 객체 여러 건의 서명을 만든다. (bulk_create 뒤에 사용)"""
+    return store(check(objects))
+
+
+def update(obj):
+    """저장된 Post / News 한 건의 서명을 다시 만들고 근접 중복 묶음을 정한다."""
+    from .models import ContentSignature
+
+    kind = kind_of(obj)
+    # 이미 다른 글들의 대표라면 묶음이 흩어지지 않게 계속 대표로 둔다.
+    is_leader = ContentSignature.objects.filter(kind=kind, cluster=obj.pk).exclude(object_id=obj.pk).exists()
+    ((_, sig, cluster, score),) = check([obj])
+    store([(obj, sig, None if is_leader else cluster, score)])
+
+
+def remove(kind, object_id):
+    """서명을 지운다. 묶음의 대표였다면 남은 글 중 가장 먼저 들어온 글이 대표가 된다."""
+    from .models import ContentSignature
+
+    with transaction.atomic():
+        ContentSignature.objects.filter(kind=kind, object_id=object_id).delete()
+        members = ContentSignature.objects.filter(kind=kind, cluster=object_id)
+        leader = members.order_by('object_id').values_list('object_id', flat=True).first()
+        if leader is not None:
+            members.update(cluster=leader)
+
+
+def rebuild(kind, batch_size=NEAR_DUP_BATCH_SIZE):
+    """kind('post' / 'news') 전체 서명을 오래된 글부터 다시 만든다. 먼저 들어온 글이 묶음의 대표가 된다."""
+    from .models import ContentSignature
+
+    model = _models()[kind]
+    count = 0
+    with transaction.atomic():
+        ContentSignature.objects.filter(kind=kind).delete()
+        batch = []
+        for obj in model.objects.only('pk', 'title', 'content').order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                count += index_objects(batch)
+                batch = []
+        count += index_objects(batch)
+    return count
+
+
+def duplicate_ids(kind):
+    """대표가 아닌(다른 글의 근접 중복인) 글 pk의 values 쿼리셋. 목록에서 exclude(pk__in=...)로 쓴다."""
+    from django.db.models import F
+
+    from .models import ContentSignature
+
+    return ContentSignature.objects.filter(kind=kind).exclude(cluster=F('object_id')).values('object_id')
+
+
+def clusters(kind, min_size=2):
+    """근접 중복 묶음 목록 [(대표 pk, [pk, ...]), ...]. 큰 묶음부터."""
+    from django.db.models import Count
+
+    from .models import ContentSignature
+
+    leaders = list(ContentSignature.objects.filter(kind=kind).values('cluster').annotate(size=Count('pk'))
+                   .filter(size__gte=min_size).order_by('-size', 'cluster').values_list('cluster', flat=True))
+    members = defaultdict(list)
+    for cluster, object_id in ContentSignature.objects.filter(kind=kind, cluster__in=leaders) \
+                                                      .order_by('object_id').values_list('cluster', 'object_id'):
+        members[cluster].append(object_id)
+    return [(cluster, members[cluster]) for cluster in leaders]
@@ -0,0 +1,214 @@
+import asyncio
+import calendar
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.text import Truncator
+
+from . import markdown_cache, near_duplicates, page_cache, search, semantic, today_news
+
+# 동시에 받을 피드 수, 피드 하나의 제한 시간(초)
+NEWS_FEED_CONCURRENCY = getattr(settings, 'NEWS_FEED_CONCURRENCY', 8)
+NEWS_FEED_TIMEOUT = getattr(settings, 'NEWS_FEED_TIMEOUT', 15)
+# 피드 XML 파싱은 CPU를 쓰므로 프로세스 풀에서 한다. 0이면 이벤트 루프의 기본 스레드 풀.
+NEWS_FEED_PARSE_WORKERS = getattr(settings, 'NEWS_FEED_PARSE_WORKERS', 2)
+# 제목을 조금 바꿔 다시 실린 기사(근접 중복) 처리. 'reject'는 넣지 않고, 'cluster'는 넣되 대표 기사로 묶는다.
+NEWS_FEED_NEAR_DUPLICATES = getattr(settings, 'NEWS_FEED_NEAR_DUPLICATES', 'reject')
+NEWS_FEED_USER_AGENT = 'final_proj_blog news ingest'
+NEWS_FEED_BATCH_SIZE = 500
+
+TITLE_LENGTH = 30  # News.title max_length
+
+
+# 마크다운 문법으로 해석될 수 있는 글자 (링크 / 이미지 / 강조 / 코드)
+_MARKDOWN_SPECIAL = re.compile(r'([\\`*_\[\]])')
+
+
+def _escape_markdown(text):
+    """일반 텍스트를 마크다운 / HTML로 해석되지 않게 바꾼다.
+
+    News 본문은 마크다운으로 렌더링해 |safe로 보여 주는데 markdownx는 HTML을 그대로 통과시킨다.
+    get_text()는 &lt;script&gt; 같은 엔티티를 풀어 주므로 피드 본문은 반드시 이스케이프해서 저장한다.
+    """
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return _MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def _html_to_text(html):
+    from bs4 import BeautifulSoup
+
+    lines = (line.strip() for line in BeautifulSoup(html, 'html.parser').get_text('\n').splitlines())
+    return '\n\n'.join(_escape_markdown(line) for line in lines if line)
+
+
+def _safe_link(url, link):
+    # 원문 링크는 href로 그대로 나가므로 javascript: 같은 스킴은 버린다.
+    link = urljoin(url, link)
+    return link if urlsplit(link).scheme in ('http', 'https') else ''
+
+
+def parse_feed(body, url):
+    """RSS / Atom 본문을 [{'title', 'content', 'link', 'published'}, ...]로. 워커 프로세스에서 실행된다."""
+    import feedparser
+
+    parsed = feedparser.parse(body)
+    if parsed.bozo and not parsed.entries:
+        raise ValueError(f'피드를 읽을 수 없음: {parsed.bozo_exception}')
+    entries = []
+    for entry in parsed.entries:
+        title = ' '.join(entry.get('title', '').split())
+        if not title:
+            continue
+        html = entry.content[0].value if entry.get('content') else entry.get('summary', '')
+        published = entry.get('published_parsed') or entry.get('updated_parsed')
+        entries.append({
+            'title': title,
+            'content': _html_to_text(html) or _escape_markdown(title),
+            'link': _safe_link(url, entry.get('link', '')),
+            # feedparser는 UTC struct_time을 준다. USE_TZ=False이므로 로컬 시각으로 바꿔 저장한다.
+            'published': datetime.fromtimestamp(calendar.timegm(published)) if published else None,
+        })
+    return entries
+
+
+async def _fetch(session, semaphore, feed):
+    """조건부 GET. 304면 본문 없이, 200이면 본문과 새 ETag / Last-Modified를 돌려준다."""
+    import aiohttp
+
+    headers = {}
+    if feed['etag']:
+        headers['If-None-Match'] = feed['etag']
+    if feed['last_modified']:
+        headers['If-Modified-Since'] = feed['last_modified']
+    result = {'status': None, 'etag': feed['etag'], 'last_modified': feed['last_modified'], 'error': ''}
+    async with semaphore:
+        try:
+            async with session.get(feed['url'], headers=headers) as response:
+                result['status'] = response.status
+                if response.status == 200:
+                    result['body'] = await response.read()
+                    result['etag'] = response.headers.get('ETag', '')
+                    result['last_modified'] = response.headers.get('Last-Modified', '')
+                elif response.status != 304:
+                    result['error'] = f'HTTP {response.status}'
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result['error'] = str(e) or type(e).__name__
+    return result
+
+
+async def fetch_all(feeds, concurrency=NEWS_FEED_CONCURRENCY, pool=None):
+    """feeds([{'url', 'etag', 'last_modified'}])를 동시에 concurrency개까지 받고, 받은 본문은 pool에서 파싱한다.
+
+    파싱은 다운로드 슬롯을 놓은 뒤에 하므로 다른 피드 다운로드와 겹친다. 피드 순서대로 결과를 돌려준다.
+    """
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    timeout = aiohttp.ClientTimeout(total=NEWS_FEED_TIMEOUT)
+
+    async with aiohttp.ClientSession(timeout=timeout, headers={'User-Agent': NEWS_FEED_USER_AGENT}) as session:
+        async def one(feed):
+            result = await _fetch(session, semaphore, feed)
+            body = result.pop('body', None)
+            result['entries'] = []
+            if body is not None:
+                try:
+                    result['entries'] = await loop.run_in_executor(pool, parse_feed, body, feed['url'])
+                except ValueError as e:
+                    result['error'] = str(e)
+                    # 새 검증값을 저장하면 다음 실행이 304를 받아 이 버전의 항목을 영영 건너뛴다.
+                    result['etag'], result['last_modified'] = feed['etag'], feed['last_modified']
+            return result
+
+        return await asyncio.gather(*(one(feed) for feed in feeds))
+
+
+def _existing_hashes(hashes):
+    from .models import News
+
+    existing = set()
+    hashes = list(hashes)
+    for start in range(0, len(hashes), NEWS_FEED_BATCH_SIZE):
+        existing.update(News.objects.filter(content_hash__in=hashes[start:start + NEWS_FEED_BATCH_SIZE])
+                                    .values_list('content_hash', flat=True))
+    return existing
+
+
+def save_entries(entries, now=None, on_near_duplicate=NEWS_FEED_NEAR_DUPLICATES):
+    """[(feed, entry), ...] 중 같은 내용(제목+본문 해시)이 없는 것만 News로 넣는다. 넣은 News 목록을 반환.
+
+    근접 중복(near_duplicates)은 on_near_duplicate가 'reject'면 버리고, 'cluster'면 넣고 묶음에 넣는다.
+    """
+    from .models import News, news_hash
+
+    now = now or datetime.now()
+    candidates = {}
+    for feed, entry in entries:
+        news = News(title=Truncator(entry['title']).chars(TITLE_LENGTH), content=entry['content'],
+                    source_url=entry['link'][:500])
+        news.content_hash = news_hash(news.title, news.content)
+        news.feed = feed
+        # 미래 시각이 적힌 항목은 가져온 시각으로
+        news.published = min(entry['published'] or now, now)
+        candidates.setdefault(news.content_hash, news)
+
+    existing = _existing_hashes(candidates)
+    # 먼저 발행된 기사가 근접 중복 묶음의 대표가 되도록 발행 순으로 비교하고 넣는다.
+    objects = sorted((news for key, news in candidates.items() if key not in existing), key=lambda news: news.published)
+    rows = near_duplicates.check(objects)
+    if on_near_duplicate == 'reject':
+        rows = [row for row in rows if row[2] is None]
+        objects = [news for news, *_ in rows]
+    for news in objects:
+        # bulk_create는 save()를 거치지 않으므로 본문 HTML을 미리 만든다.
+        markdown_cache.refresh(news)
+    with transaction.atomic():
+        News.objects.bulk_create(objects, batch_size=NEWS_FEED_BATCH_SIZE)
+        # auto_now_add는 bulk_create에서 값을 덮어쓰므로 넣은 뒤에 발행 시각으로 바꾼다.
+        for news in objects:
+            news.created_at = news.published
+        News.objects.bulk_update(objects, ['created_at'], batch_size=NEWS_FEED_BATCH_SIZE)
+        near_duplicates.store(rows)
+    return objects
+
+
+def ingest(feeds=None, concurrency=NEWS_FEED_CONCURRENCY, parse_workers=NEWS_FEED_PARSE_WORKERS):
+    """피드를 받아 새 뉴스를 넣는다. [(feed, HTTP 상태, 새 뉴스 수, 오류), ...]를 반환."""
+    from .models import NewsFeed
+
+    feeds = list(NewsFeed.objects.filter(is_active=True) if feeds is None else feeds)
+    if not feeds:
+        return []
+    states = [{'url': feed.url, 'etag': feed.etag, 'last_modified': feed.last_modified} for feed in feeds]
+    if parse_workers:
+        with ProcessPoolExecutor(parse_workers) as pool:
+            results = asyncio.run(fetch_all(states, concurrency, pool))
+    else:
+        results = asyncio.run(fetch_all(states, concurrency))
+
+    now = datetime.now()
+    objects = save_entries([(feed, entry) for feed, result in zip(feeds, results) for entry in result['entries']], now)
+
+    for feed, result in zip(feeds, results):
+        feed.last_fetched_at = now
+        feed.last_status = result['status']
+        feed.last_error = result['error']
+        feed.etag, feed.last_modified = result['etag'][:200], result['last_modified'][:100]
+    NewsFeed.objects.bulk_update(feeds, ['last_fetched_at', 'last_status', 'last_error', 'etag', 'last_modified'])
+
+    # bulk_create는 시그널을 보내지 않으므로 색인과 캐시는 여기서 갱신한다.
+    if objects:
+        search.index_objects(objects)
+        semantic.update_objects(objects)
+        page_cache.bump('news')
+        today_news.invalidate()
+
+    created = {}
+    for news in objects:
+        created[news.feed.pk] = created.get(news.feed.pk, 0) + 1
+    return [(feed, result['status'], created.get(feed.pk, 0), result['error']) for feed, result in zip(feeds, results)]
@@ -0,0 +1,133 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .today_news import today_range
+
+# 익명 사용자의 GET 응답을 통째로 캐시한다. 무효화는 모델 시그널이 그룹 버전을 바꾸는 방식 (signals.py)
+PAGE_CACHE_ENABLED = getattr(settings, 'PAGE_CACHE_ENABLED', True)
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+# 만료/무효화된 뒤에도 이 시간(초) 동안은 한 요청이 다시 그리는 사이 다른 요청에 이전 응답을 준다.
+PAGE_CACHE_STALE_TIMEOUT = getattr(settings, 'PAGE_CACHE_STALE_TIMEOUT', 30)
+PAGE_CACHE_LOCK_TIMEOUT = 10
+
+# 모든 페이지 사이드바에 오늘의 뉴스가 있으므로 뉴스 그룹은 항상 포함
+COMMON_GROUPS = ('news',)
+
+
+def _version_key(group):
+    return f'page_cache:version:{group}'
+
+
+def bump(*groups):
+    """그룹에 속한 캐시 페이지를 모두 무효화한다."""
+    now = time.time_ns()
+    cache.set_many({_version_key(group): now for group in groups}, None)
+
+
+def _versions(groups):
+    keys = [_version_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # 버전이 캐시에서 밀려났으면 새 버전을 시작해 예전 페이지를 쓰지 않는다.
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def _page_key(request):
+    start, _ = today_range()
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'page_cache:page:{start:%Y%m%d}:{url}'
+
+
+def _cacheable(request):
+    return (
+        PAGE_CACHE_ENABLED
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and request.headers.get('X-Requested-With') != 'XMLHttpRequest'
+    )
+
+
+def _response_from(entry):
+    response = HttpResponse(entry['content'])
+    for header, value in entry['headers']:
+        response[header] = value
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _lookup(request, groups, kwargs, on_hit):
+    """(캐시 키, 그룹 버전, 캐시된 응답 또는 None)"""
+    key = _page_key(request)
+    versions = _versions([g.format(**kwargs) for g in COMMON_GROUPS + groups])
+    entry = cache.get(key)
+    if entry is not None:
+        fresh = entry['versions'] == versions and time.time() - entry['time'] < PAGE_CACHE_TIMEOUT
+        # 낡은 응답은 다시 그리는 요청 하나만 통과시키고 나머지는 그대로 받는다.
+        if fresh or not cache.add(f'{key}:lock', 1, PAGE_CACHE_LOCK_TIMEOUT):
+            if on_hit is not None:
+                on_hit(request, **kwargs)
+            return key, versions, _response_from(entry)
+    return key, versions, None
+
+
+def _store_when_rendered(request, response, key, versions):
+    def store(response):
+        # csrf_token을 쓴 응답은 요청마다 토큰이 달라야 하므로 저장하지 않는다.
+        if response.status_code == 200 and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+            cache.set(key, {
+                'versions': versions,
+                'time': time.time(),
+                'content': response.content,
+                # 뷰가 붙인 헤더(Content-Type, Vary, Cache-Control ...)도 그대로 돌려준다. 쿠키는 요청마다 다르므로 뺀다.
+                'headers': [(header, value) for header, value in response.items() if header.lower() != 'set-cookie'],
+            }, PAGE_CACHE_TIMEOUT + PAGE_CACHE_STALE_TIMEOUT)
+        else:
+            cache.delete(key)
+        cache.delete(f'{key}:lock')
+        return response
+
+    if getattr(response, 'is_rendered', True):
+        return store(response)
+    response.add_post_render_callback(store)
+    return response
+
+
+def cached_page(*groups, on_hit=None):
+    """익명 GET 응답을 URL별로 캐시하는 뷰 데코레이터. async 뷰에도 쓸 수 있다.
+
+    groups에는 '{pk}'처럼 URL 인자를 넣을 수 있다. on_hit(request, **kwargs)는 캐시로
+    응답할 때도 실행해야 하는 일(조회수 등)을 위한 콜백.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # request.user는 처음 읽을 때 세션/DB를 조회하므로 동기 스레드에서 판단한다.
+                if not await sync_to_async(_cacheable)(request):
+                    return await view_func(request, *args, **kwargs)
+                key, versions, cached = await sync_to_async(_lookup)(request, groups, kwargs, on_hit)
+                if cached is not None:
+                    return cached
+                response = await view_func(request, *args, **kwargs)
+                return await sync_to_async(_store_when_rendered)(request, response, key, versions)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view_func(request, *args, **kwargs)
+            key, versions, cached = _lookup(request, groups, kwargs, on_hit)
+            if cached is not None:
+                return cached
+            return _store_when_rendered(request, view_func(request, *args, **kwargs), key, versions)
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+# 'cursor' : pk 기준 키셋 페이지네이션 (?after=<pk> / ?before=<pk>), 깊은 페이지도 일정한 속도
+# 'offset' : Django 기본 Paginator (?page=<n>), COUNT(*) + OFFSET
+LIST_PAGINATION_MODE = getattr(settings, 'LIST_PAGINATION_MODE', 'cursor')
+# 목록 하단에 보여줄 전체 개수는 이 시간(초) 동안 캐시한 대략적인 값
+LIST_COUNT_CACHE_TIMEOUT = 60
+
+
+class CursorPage:
+    def __init__(self, object_list, has_previous, has_next):
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def previous_cursor(self):
+        return self.object_list[0].pk if self.object_list else None
+
+    @property
+    def next_cursor(self):
+        return self.object_list[-1].pk if self.object_list else None
+
+
+def approximate_count(queryset):
+    key = f'list_count:{queryset.model._meta.label_lower}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, LIST_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+# pk 커서는 DB 정수 범위(부호 있는 64비트) 안이어야 한다. 벗어나면 SQLite가 OverflowError를 낸다.
+CURSOR_MIN = -(1 << 63)
+CURSOR_MAX = (1 << 63) - 1
+
+
+def cursor_param(request, name):
+    """GET 파라미터 name을 pk 커서로 읽는다. 없으면 None, 정수가 아니거나 범위를 벗어나면 404."""
+    value = request.GET.get(name)
+    if value is None:
+        return None
+    try:
+        cursor = int(value)
+    except ValueError:
+        raise Http404('잘못된 페이지 커서입니다.')
+    if not CURSOR_MIN <= cursor <= CURSOR_MAX:
+        raise Http404('잘못된 페이지 커서입니다.')
+    return cursor
+
+
+class CursorPaginationMixin:
+    """ListView에서 -pk 순 키셋 페이지네이션을 쓴다. 검색처럼 pk 순이 아닌 목록은 'offset'으로 둔다."""
+    pagination_mode = LIST_PAGINATION_MODE
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination_mode != 'cursor':
+            return super().paginate_queryset(queryset, page_size)
+
+        after = cursor_param(self.request, 'after')
+        before = cursor_param(self.request, 'before')
+        if before is not None:
+            # 더 최신 쪽 페이지: pk 오름차순으로 page_size + 1개를 읽어 뒤집는다.
+            rows = list(queryset.filter(pk__gt=before).order_by('pk')[:page_size + 1])
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            has_next = bool(rows) and queryset.filter(pk__lt=rows[-1].pk).exists()
+        else:
+            if after is not None:
+                queryset_page = queryset.filter(pk__lt=after)
+            else:
+                queryset_page = queryset
+            rows = list(queryset_page.order_by('-pk')[:page_size + 1])
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+            has_previous = after is not None and bool(rows) and queryset.filter(pk__gt=rows[0].pk).exists()
+
+        page = CursorPage(rows, has_previous, has_next)
+        return None, page, page.object_list, page.has_other_pages()
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """paginate_queryset의 async 버전 (async ORM 사용)."""
+        if self.pagination_mode != 'cursor':
+            return await sync_to_async(super().paginate_queryset)(queryset, page_size)
+
+        after = cursor_param(self.request, 'after')
+        before = cursor_param(self.request, 'before')
+        if before is not None:
+            rows = [row async for row in queryset.filter(pk__gt=before).order_by('pk')[:page_size + 1]]
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            has_next = bool(rows) and await queryset.filter(pk__lt=rows[-1].pk).aexists()
+        else:
+            queryset_page = queryset.filter(pk__lt=after) if after is not None else queryset
+            rows = [row async for row in queryset_page.order_by('-pk')[:page_size + 1]]
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+            has_previous = after is not None and bool(rows) and await queryset.filter(pk__gt=rows[0].pk).aexists()
+
+        page = CursorPage(rows, has_previous, has_next)
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.pagination_mode == 'cursor':
+            context['cursor_pagination'] = True
+            context['total_count'] = self.get_total_count()
+        return context
+
+    def get_total_count(self):
+        return approximate_count(self.model.objects.all())
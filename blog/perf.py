@@ -0,0 +1,257 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# 요청 하나가 이 쿼리 수 / 시간(ms)을 넘으면 X-Perf-Budget 헤더와 경고 로그를 남긴다.
+PERF_QUERY_BUDGET = getattr(settings, 'PERF_QUERY_BUDGET', 20)
+PERF_LATENCY_BUDGET_MS = getattr(settings, 'PERF_LATENCY_BUDGET_MS', 500)
+# 경로별 히스토그램은 최근 PERF_WINDOW초만 유지한다. (PERF_SLOT초 단위로 굴린다)
+PERF_WINDOW = getattr(settings, 'PERF_WINDOW', 60 * 5)
+PERF_SLOT = 10
+# 히스토그램 구간 상한(ms), 마지막은 +Inf
+PERF_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar('perf_recorder', default=None)
+
+
+class Recorder:
+    """요청 하나의 구간별 누적 시간(ms)과 호출 수. DB 쿼리는 'db' 구간으로 센다."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name, ms):
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + ms, count + 1)
+
+    @property
+    def queries(self):
+        return self.spans.get('db', (0.0, 0))[1]
+
+    def elapsed(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+@contextmanager
+def span(name):
+    """with span('markdown'): ... 구간 시간을 현재 요청과 전역 구간 히스토그램에 더한다.
+
+    요청 밖(이미지 작업 스레드 등)에서 실행돼도 전역 히스토그램에는 남는다.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        recorder = _current.get()
+        if recorder is not None:
+            recorder.add(name, ms)
+        if name != 'db':
+            metrics.observe('span', name, ms)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    recorder = _current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add('db', (time.perf_counter() - started) * 1000)
+
+
+def install_db_wrapper(connection, **kwargs):
+    """connection_created 수신기. 연결마다 한 번 쿼리 시간 측정 래퍼를 건다."""
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+class Histogram:
+    """PERF_SLOT초 단위 칸을 굴려 최근 PERF_WINDOW초의 분포만 남기는 히스토그램."""
+
+    def __init__(self):
+        self.slots = {}  # slot 번호 -> [구간별 개수..., 합계 ms, 개수, 쿼리 합계, 예산 초과 수]
+
+    def observe(self, ms, queries=0, over_budget=False, now=None):
+        slot = int((now or time.time()) // PERF_SLOT)
+        row = self.slots.get(slot)
+        if row is None:
+            row = self.slots[slot] = [0] * (len(PERF_BUCKETS_MS) + 5)
+            oldest = slot - PERF_WINDOW // PERF_SLOT
+            for old in [s for s in self.slots if s <= oldest]:
+                del self.slots[old]
+        row[bisect.bisect_left(PERF_BUCKETS_MS, ms)] += 1
+        row[-4] += ms
+        row[-3] += 1
+        row[-2] += queries
+        row[-1] += over_budget
+
+    def snapshot(self, now=None):
+        oldest = int((now or time.time()) // PERF_SLOT) - PERF_WINDOW // PERF_SLOT
+        total = [0] * (len(PERF_BUCKETS_MS) + 5)
+        for slot, row in self.slots.items():
+            if slot > oldest:
+                total = [a + b for a, b in zip(total, row)]
+        counts = total[:len(PERF_BUCKETS_MS) + 1]
+        return {
+            'buckets': counts,
+            'sum': total[-4],
+            'count': total[-3],
+            'queries': total[-2],
+            'over_budget': total[-1],
+        }
+
+
+class Metrics:
+    """(종류, 이름)별 히스토그램 모음. 종류는 'route'(요청 경로) 또는 'span'(구간)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, kind, name, ms, queries=0, over_budget=False):
+        with self._lock:
+            histogram = self.histograms.get((kind, name))
+            if histogram is None:
+                histogram = self.histograms[kind, name] = Histogram()
+            histogram.observe(ms, queries, over_budget)
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def render(self):
+        """Prometheus 텍스트 형식. 누적 구간 개수와 합계 / 개수, 경로별 쿼리 수와 예산 초과 수, 이미지 캐시 카운터."""
+        with self._lock:
+            snapshots = sorted((key, h.snapshot()) for key, h in self.histograms.items())
+        lines = []
+        for prefix in ('route', 'span'):
+            metric = f'blog_{prefix}_duration_ms'
+            lines.append(f'# TYPE {metric} histogram')
+            for (kind, name), snap in snapshots:
+                if kind != prefix:
+                    continue
+                label = f'{prefix}="{_escape(name)}"'
+                cumulative = 0
+                for bound, count in zip(PERF_BUCKETS_MS + ('+Inf',), snap['buckets']):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label}}} {snap["sum"]:.3f}')
+                lines.append(f'{metric}_count{{{label}}} {snap["count"]}')
+                if kind == 'route':
+                    lines.append(f'blog_route_queries_total{{{label}}} {snap["queries"]}')
+                    lines.append(f'blog_route_over_budget_total{{{label}}} {snap["over_budget"]}')
+        # 이미지 캐시 적중 / 실패 / 정리 수 (프로세스별 누적값)
+        from . import image_cache
+        for name, value in sorted(image_cache.counters().items()):
+            metric = f'blog_image_cache_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+metrics = Metrics()
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with span('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """뷰가 직접 렌더링하는 최상위 템플릿 시간을 'template' 구간으로 잰다. (include는 그 안에 포함)"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return 'unmatched' if match is None else '/' + match.route
+
+
+def _server_timing(recorder, total):
+    parts = [
+        f'{name};dur={ms:.1f};desc="{count}"'
+        for name, (ms, count) in sorted(recorder.spans.items())
+    ]
+    parts.append(f'total;dur={total:.1f}')
+    return ', '.join(parts)
+
+
+def _finish(request, response, recorder):
+    total = recorder.elapsed()
+    over = []
+    if recorder.queries > PERF_QUERY_BUDGET:
+        over.append('queries')
+    if total > PERF_LATENCY_BUDGET_MS:
+        over.append('latency')
+    route = _route(request)
+    metrics.observe('route', route, total, recorder.queries, bool(over))
+
+    response['Server-Timing'] = _server_timing(recorder, total)
+    if over:
+        response['X-Perf-Budget'] = ','.join(over)
+        logger.warning(
+            '성능 예산 초과 %s %s: %d queries, %.1f ms (%s)',
+            request.method, request.path, recorder.queries, total, ', '.join(over),
+        )
+    return response
+
+
+class PerfMiddleware:
+    """요청마다 DB / markdown / template / openai 구간을 모아 Server-Timing 헤더로 내보낸다.
+
+    sync / async 요청을 모두 받는다. (async 뷰가 동기로 감싸이지 않도록)
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # 미들웨어가 만들어지기 전에 열린 연결에도 래퍼를 건다.
+        for connection in connections.all(initialized_only=True):
+            install_db_wrapper(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = Recorder()
+        token = _current.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = Recorder()
+        token = _current.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, recorder)
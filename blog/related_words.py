@@ -0,0 +1,244 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower, Replace
+
+from . import page_cache, search
+
+# 단어마다 저장할 관련 용어 수
+RELATED_WORDS_K = getattr(settings, 'RELATED_WORDS_K', 8)
+
+# 점수 = 공유 태그 + 명시적 관련 키워드 + 본문 유사도 (각각 가중치를 곱해 더함)
+TAG_WEIGHT = 1.0
+KEYWORD_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+_PARENTHESIS = re.compile(r'\(.*?\)')
+
+
+def normalize_title(title):
+    """'통화정책 운영체제(monetary policy regime)'처럼 괄호 설명과 공백을 빼고 비교한다."""
+    return _PARENTHESIS.sub('', title).replace(' ', '').lower()
+
+
+class TagGraph:
+    """Word - Word_Tag 연결을 읽어 둔 메모리 그래프.
+
+    word_ids를 주면 그 단어들의 제목과 태그, 그 태그가 붙은(또는 태그 이름으로 가리키는) 단어의
+    연결만 읽는다. 다른 단어의 점수가 필요하면 load()로 더 읽는다. word_ids가 None이면 전체를 한 번에 읽는다.
+    """
+
+    def __init__(self, word_ids=None):
+        from .models import Word, Word_Tag
+
+        self.word_tags = defaultdict(set)
+        self.tag_words = defaultdict(set)
+        self.tag_targets = {}
+        self.target_tags = defaultdict(set)
+        self.loaded = set()  # 태그 목록이 빠짐없이 읽힌 단어
+
+        # 태그 이름이 다른 단어의 제목과 같으면 related_keyword로 직접 연결된 단어로 본다.
+        self.titles = defaultdict(set)
+        self.word_ids = set()  # 제목을 읽은 (존재하는) 단어
+        self.tag_names = {}
+
+        if word_ids is None:
+            self._add_titles(Word.objects.values_list('pk', 'title'))
+            self.tag_names = dict(Word_Tag.objects.values_list('pk', 'name'))
+            for tag_id, name in self.tag_names.items():
+                for target in self.titles.get(normalize_title(name), ()):
+                    self.target_tags[target].add(tag_id)
+            self._add_links(Word.tags.through.objects.all())
+            self.loaded = set(self.word_ids)
+        else:
+            self.load(word_ids)
+
+    def _add_titles(self, rows):
+        for pk, title in rows:
+            self.titles[normalize_title(title)].add(pk)
+            self.word_ids.add(pk)
+
+    def _add_links(self, links):
+        for word_id, tag_id in links.values_list('word_id', 'word_tag_id'):
+            self.word_tags[word_id].add(tag_id)
+            self.tag_words[tag_id].add(word_id)
+            if tag_id not in self.tag_targets:
+                self.tag_targets[tag_id] = self.titles.get(normalize_title(self.tag_names[tag_id]), set())
+
+    def load(self, word_ids):
+        """word_ids의 점수를 계산할 수 있도록 그 단어들의 제목과 태그, 그 태그가 붙은 단어와 태그가 가리키는 단어를 읽는다."""
+        from .models import Word, Word_Tag
+
+        through = Word.tags.through
+        word_ids = set(word_ids) - self.loaded
+        if not word_ids:
+            return
+        self._add_titles(Word.objects.filter(pk__in=word_ids).values_list('pk', 'title'))
+
+        # 이 단어들을 제목으로 가리키는 태그
+        keys = {normalize_title(title): pk for title, pks in self.titles.items() for pk in pks if pk in word_ids}
+        for tag_id, name in _startswith_candidates(Word_Tag.objects, 'name', keys):
+            target = keys.get(normalize_title(name))
+            if target is not None:
+                self.tag_names[tag_id] = name
+                self.target_tags[target].add(tag_id)
+
+        tag_ids = set()
+        for tag_id, name in through.objects.filter(word_id__in=word_ids).values_list('word_tag_id', 'word_tag__name'):
+            self.tag_names[tag_id] = name
+            tag_ids.add(tag_id)
+        for word_id in word_ids:
+            tag_ids |= self.target_tags.get(word_id, set())
+        tag_ids -= set(self.tag_words)
+        if tag_ids:
+            # 새 태그가 이름으로 가리키는 단어의 제목을 먼저 읽어야 _add_links가 tag_targets를 채운다.
+            names = {normalize_title(self.tag_names[tag_id]) for tag_id in tag_ids} - set(self.titles)
+            self._add_titles((pk, title) for pk, title in _startswith_candidates(Word.objects, 'title', names)
+                             if normalize_title(title) in names)
+            self._add_links(through.objects.filter(word_tag_id__in=tag_ids))
+        self.loaded |= word_ids
+
+    def tag_scores(self, word_id):
+        # 여러 단어에 붙은 흔한 태그일수록 낮은 점수
+        scores = defaultdict(float)
+        for tag_id in self.word_tags.get(word_id, ()):
+            others = self.tag_words[tag_id] - {word_id}
+            for other in others:
+                scores[other] += 1 / math.log2(1 + len(self.tag_words[tag_id]))
+        return scores
+
+    def keyword_links(self, word_id):
+        # 내 태그가 가리키는 단어 + 나를 가리키는 태그가 붙은 단어
+        linked = set()
+        for tag_id in self.word_tags.get(word_id, ()):
+            linked |= self.tag_targets.get(tag_id, set())
+        for tag_id in self.target_tags.get(word_id, ()):
+            linked |= self.tag_words[tag_id]
+        linked.discard(word_id)
+        return linked
+
+
+def _startswith_candidates(queryset, field, keys, batch_size=100):
+    """공백을 뺀 소문자 field가 keys 중 하나로 시작하는 (pk, field) 후보. 정확한 비교는 normalize_title로 한다.
+
+    괄호 설명은 용어 뒤에 붙는다고 보고 앞부분만 DB에서 거른다.
+    """
+    keys = sorted(key for key in keys if key)
+    queryset = queryset.annotate(key=Replace(Lower(field), Value(' '), Value('')))
+    for start in range(0, len(keys), batch_size):
+        condition = Q()
+        for key in keys[start:start + batch_size]:
+            condition |= Q(key__startswith=key)
+        yield from queryset.filter(condition).values_list('pk', field)
+
+
+def neighbors(word_id, graph, k=RELATED_WORDS_K):
+    """word_id의 관련 용어 상위 k개를 [(neighbor_id, score), ...]로 반환한다."""
+    scores = defaultdict(float)
+    for other, score in graph.tag_scores(word_id).items():
+        scores[other] += TAG_WEIGHT * score
+    for other in graph.keyword_links(word_id):
+        scores[other] += KEYWORD_WEIGHT
+    for other, score in search.similar('word', word_id).items():
+        scores[other] += CONTENT_WEIGHT * score
+    ranked = sorted(
+        ((other, score) for other, score in scores.items() if score > 0),
+        key=lambda item: (-item[1], item[0]),
+    )
+    return ranked[:k]
+
+
+def _save(word_ids, graph):
+    from .models import WordNeighbor
+
+    graph.load(word_ids)
+    rows = [
+        WordNeighbor(word_id=word_id, neighbor_id=other, rank=rank, score=score)
+        for word_id in word_ids
+        for rank, (other, score) in enumerate(neighbors(word_id, graph))
+    ]
+    with transaction.atomic():
+        WordNeighbor.objects.filter(word_id__in=word_ids).delete()
+        WordNeighbor.objects.bulk_create(rows, batch_size=1000)
+    page_cache.bump(*[f'word:{word_id}' for word_id in word_ids])
+
+
+def rebuild(batch_size=200):
+    """모든 단어의 관련 용어 목록을 새로 계산한다. 처리한 단어 수를 반환."""
+    graph = TagGraph()
+    word_ids = sorted(graph.word_ids)
+    for start in range(0, len(word_ids), batch_size):
+        _save(word_ids[start:start + batch_size], graph)
+    return len(word_ids)
+
+
+def pointing_to(word_id):
+    from .models import WordNeighbor
+
+    return list(WordNeighbor.objects.filter(neighbor_id=word_id).values_list('word_id', flat=True))
+
+
+def update(word_id, affected=()):
+    """단어 하나가 바뀌었을 때 그 단어와, 그 단어를 목록에 두었거나 새로 이웃이 된 단어만 다시 계산한다.
+
+    두 단어 사이 점수는 대칭이지만 다른 단어의 상위 k개에 새로 들어가는 경우까지 찾지는 않으므로,
+    대량 변경 뒤에는 rebuild_related_words로 전체를 다시 만든다. 삭제된 단어는 삭제 전에 구한
+    affected(그 단어를 목록에 둔 단어들)를 넘긴다.
+    """
+    update_words([word_id], affected)
+
+
+def update_words(word_ids, affected=(), batch_size=200):
+    """update()의 여러 단어 버전. 그래프는 한 번만 만든다. (bulk_create / bulk_update 뒤에 사용)
+
+    다시 계산한 단어 수를 반환한다.
+    """
+    from .models import WordNeighbor
+
+    word_ids = sorted(set(word_ids))
+    graph = TagGraph(word_ids)
+    affected = set(affected)
+    for start in range(0, len(word_ids), batch_size):
+        affected.update(WordNeighbor.objects.filter(neighbor_id__in=word_ids[start:start + batch_size])
+                                            .values_list('word_id', flat=True))
+    for word_id in graph.word_ids.intersection(word_ids):
+        affected.add(word_id)
+        affected |= {other for other, _ in neighbors(word_id, graph)}
+    affected = sorted(affected)
+    for start in range(0, len(affected), batch_size):
+        _save(affected[start:start + batch_size], graph)
+    return len(affected)
+
+
+# 스레드마다 이번 트랜잭션에서 바뀐 단어들. 커밋 콜백이 비우면서 update_words()를 한 번 실행한다.
+_pending = threading.local()
+
+
+def _flush():
+    word_ids = getattr(_pending, 'word_ids', None)
+    if not word_ids:
+        return
+    affected = _pending.affected
+    _pending.word_ids, _pending.affected = set(), set()
+    # 본문 유사도는 검색 색인을 쓰므로 같은 트랜잭션에서 저장된 단어의 색인부터 반영한다.
+    search.flush()
+    update_words(word_ids, affected)
+
+
+def schedule(word_id, affected=()):
+    """커밋된 뒤 update(word_id, affected)를 실행한다.
+
+    단어 저장, 태그 추가/삭제가 한 트랜잭션에서 여러 번 불러도 단어를 모아 두었다가 그래프를 한 번만 만든다.
+    트랜잭션이 롤백되면 콜백이 버려지므로 부를 때마다 콜백을 등록하고, 먼저 실행되는 콜백이 모인 단어를
+    모두 처리한다. 나머지 콜백은 비어 있는 목록을 보고 바로 끝난다.
+    """
+    if not getattr(_pending, 'word_ids', None):
+        _pending.word_ids, _pending.affected = set(), set()
+    _pending.word_ids.add(word_id)
+    _pending.affected.update(affected)
+    transaction.on_commit(_flush)
@@ -0,0 +1,292 @@
+import math
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Sum, Value, When
+
+# BM25 파라미터 (rank_bm25.BM25Okapi 기본값과 같음)
+SEARCH_BM25_K1 = getattr(settings, 'SEARCH_BM25_K1', 1.5)
+SEARCH_BM25_B = getattr(settings, 'SEARCH_BM25_B', 0.75)
+SEARCH_STATS_TIMEOUT = 60 * 60
+# similar()가 문서를 대표하는 질의로 쓸 토큰 수
+SEARCH_SIMILAR_TERMS = 25
+# similar()가 돌려줄 최대 문서 수
+SEARCH_SIMILAR_LIMIT = 100
+
+# 색인에 넣을 형태소 품사: 명사, 동사/형용사 어간, 어근, 외국어, 한자, 숫자
+INDEX_TAGS = ('NNG', 'NNP', 'NR', 'NP', 'VV', 'VA', 'XR', 'SL', 'SH', 'SN')
+TERM_MAX_LENGTH = 50
+
+_kiwi = None
+_kiwi_lock = threading.Lock()
+
+
+def _get_kiwi():
+    # 형태소 분석 모델 로딩이 무거우므로 처음 검색/색인할 때 한 번만 만든다.
+    global _kiwi
+    if _kiwi is None:
+        with _kiwi_lock:
+            if _kiwi is None:
+                from kiwipiepy import Kiwi
+                _kiwi = Kiwi()
+    return _kiwi
+
+
+def tokenize(text):
+    """한국어 형태소 분석으로 색인/검색에 쓸 토큰 목록을 만든다."""
+    if not text:
+        return []
+    return [
+        token.form.lower()[:TERM_MAX_LENGTH]
+        for token in _get_kiwi().tokenize(text)
+        if token.tag.startswith(INDEX_TAGS)
+    ]
+
+
+def _models():
+    from .models import Post, Word, News
+    return {'post': Post, 'word': Word, 'news': News}
+
+
+def kind_of(obj):
+    return obj._meta.model_name
+
+
+def _document_terms(obj):
+    return Counter(tokenize(f'{obj.title}\n{obj.content}'))
+
+
+def _stats_key(kind):
+    return f'search:stats:{kind}'
+
+
+def _invalidate_stats(kind):
+    cache.delete(_stats_key(kind))
+
+
+def index_objects(objects):
+    """같은 종류의 객체 여러 건을 한 번에 다시 색인한다. (bulk_create / bulk_update 뒤에 사용)"""
+    from .models import SearchDocument, SearchPosting
+
+    objects = list(objects)
+    if not objects:
+        return 0
+    kind = kind_of(objects[0])
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objects]).delete()
+        _bulk_index(kind, [(obj.pk, _document_terms(obj)) for obj in objects], SearchDocument, SearchPosting)
+    _invalidate_stats(kind)
+    return len(objects)
+
+
+_pending = threading.local()
+
+
+def flush():
+    """schedule()로 모아 둔 객체를 지금 DB 상태대로 색인한다. 없어진 객체는 색인에서 뺀다."""
+    from .models import SearchDocument
+
+    pending = getattr(_pending, 'keys', None)
+    if not pending:
+        return
+    _pending.keys = set()
+    by_kind = {}
+    for kind, pk in pending:
+        by_kind.setdefault(kind, set()).add(pk)
+    for kind, pks in by_kind.items():
+        objects = list(_models()[kind].objects.filter(pk__in=pks).only('pk', 'title', 'content'))
+        index_objects(objects)
+        missing = pks - {obj.pk for obj in objects}
+        if missing:
+            SearchDocument.objects.filter(kind=kind, object_id__in=missing).delete()
+            _invalidate_stats(kind)
+
+
+def schedule(kind, pk):
+    """커밋된 뒤 kind의 pk 색인을 다시 만든다. (저장/삭제 시그널에서 사용)
+
+    형태소 분석과 색인 쓰기를 저장하는 요청의 트랜잭션 밖으로 뺀다. 한 트랜잭션에서 여러 번 불러도
+    모아 두었다가 종류별로 한 번에 색인한다. 롤백된 트랜잭션에서 남은 키도 DB 상태대로 처리하므로 안전하다.
+    """
+    if not getattr(_pending, 'keys', None):
+        _pending.keys = set()
+    _pending.keys.add((kind, pk))
+    transaction.on_commit(flush)
+
+
+def rebuild(kind, batch_size=500):
+    """kind('post' / 'word' / 'news') 전체 색인을 새로 만든다. 색인한 문서 수를 반환."""
+    from .models import SearchDocument, SearchPosting
+
+    model = _models()[kind]
+    count = 0
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind=kind).delete()
+        batch = []
+        for obj in model.objects.only('pk', 'title', 'content').iterator(chunk_size=batch_size):
+            batch.append((obj.pk, _document_terms(obj)))
+            if len(batch) >= batch_size:
+                _bulk_index(kind, batch, SearchDocument, SearchPosting)
+                count += len(batch)
+                batch = []
+        if batch:
+            _bulk_index(kind, batch, SearchDocument, SearchPosting)
+            count += len(batch)
+    _invalidate_stats(kind)
+    return count
+
+
+def _bulk_index(kind, batch, SearchDocument, SearchPosting):
+    documents = SearchDocument.objects.bulk_create([
+        SearchDocument(kind=kind, object_id=pk, length=sum(terms.values()))
+        for pk, terms in batch
+    ])
+    SearchPosting.objects.bulk_create([
+        SearchPosting(term=term, document=document, frequency=frequency)
+        for document, (_, terms) in zip(documents, batch)
+        for term, frequency in terms.items()
+    ], batch_size=2000)
+
+
+def _corpus_stats(kinds):
+    # 문서 수와 전체 토큰 수는 색인이 바뀔 때만 다시 센다.
+    from .models import SearchDocument
+
+    total_docs = total_length = 0
+    for kind in kinds:
+        stats = cache.get(_stats_key(kind))
+        if stats is None:
+            summary = SearchDocument.objects.filter(kind=kind).aggregate(docs=Count('pk'), length=Sum('length'))
+            stats = (summary['docs'], summary['length'] or 0)
+            cache.set(_stats_key(kind), stats, SEARCH_STATS_TIMEOUT)
+        total_docs += stats[0]
+        total_length += stats[1]
+    return total_docs, total_length
+
+
+def _bm25_query(terms, kinds):
+    """terms의 BM25 점수를 문서별로 합산하는 queryset. 점수 계산과 정렬은 DB에서 한다."""
+    from .models import SearchPosting
+
+    if not terms:
+        return None
+    total_docs, total_length = _corpus_stats(kinds)
+    if not total_docs:
+        return None
+    postings = SearchPosting.objects.filter(term__in=terms, document__kind__in=kinds)
+    # 문서 빈도는 (term, document) 인덱스로 term마다 센다.
+    df = dict(postings.values('term').annotate(df=Count('pk')).values_list('term', 'df'))
+    if not df:
+        return None
+
+    k1, b = SEARCH_BM25_K1, SEARCH_BM25_B
+    avg_length = total_length / total_docs
+    idf = Case(*[
+        When(term=term, then=Value(math.log(1 + (total_docs - n + 0.5) / (n + 0.5)) * (k1 + 1)))
+        for term, n in df.items()
+    ], default=Value(0.0), output_field=FloatField())
+    frequency = F('frequency')
+    score = ExpressionWrapper(
+        idf * frequency / (frequency + Value(k1 * (1 - b)) + Value(k1 * b / avg_length) * F('document__length')),
+        output_field=FloatField(),
+    )
+    return (postings.values('document__kind', 'document__object_id')
+                    .annotate(score=Sum(score))
+                    .order_by('-score', '-document__object_id'))
+
+
+def _bm25_count(terms, kinds):
+    from .models import SearchPosting
+
+    if not terms:
+        return 0
+    return (SearchPosting.objects.filter(term__in=terms, document__kind__in=kinds)
+                                 .values('document').distinct().count())
+
+
+def _bm25_ranked(terms, kinds, offset=0, limit=None):
+    """BM25 점수 순 (kind, object_id, score) 목록 중 [offset, offset + limit) 구간만 가져온다."""
+    query = _bm25_query(terms, kinds)
+    if query is None:
+        return []
+    rows = query.values_list('document__kind', 'document__object_id', 'score')
+    # 점수가 같으면 최신 글(큰 pk)이 먼저
+    return list(rows[offset:] if limit is None else rows[offset:offset + limit])
+
+
+def search(q, kinds=('post', 'word', 'news'), limit=None):
+    """BM25 점수 순으로 정렬된 (kind, object_id, score) 목록을 반환한다. limit개까지만 가져올 수 있다."""
+    return _bm25_ranked(set(tokenize(q)), kinds, limit=limit)
+
+
+def similar(kind, object_id, max_terms=SEARCH_SIMILAR_TERMS, limit=SEARCH_SIMILAR_LIMIT):
+    """색인된 문서 한 건과 본문이 비슷한 같은 종류 문서 상위 limit개의 {object_id: 점수}. 점수는 자기 자신 대비 0~1.
+
+    문서에서 tf-idf가 높은 토큰 max_terms개로 BM25 검색을 한다. 토큰화를 다시 하지 않는다.
+    """
+    from .models import SearchPosting
+
+    terms = dict(SearchPosting.objects.filter(
+        document__kind=kind, document__object_id=object_id,
+    ).values_list('term', 'frequency'))
+    if not terms:
+        return {}
+    df = dict(SearchPosting.objects.filter(term__in=list(terms), document__kind=kind)
+                                   .values('term').annotate(df=Count('pk')).values_list('term', 'df'))
+    top_terms = sorted(terms, key=lambda term: -terms[term] / df.get(term, 1))[:max_terms]
+
+    scores = {pk: score for _, pk, score in _bm25_ranked(top_terms, (kind,), limit=limit + 1)}
+    best = scores.pop(object_id, None) or max(scores.values(), default=0)
+    if not best:
+        return {}
+    return {pk: min(score / best, 1.0) for pk, score in list(scores.items())[:limit]}
+
+
+class SearchResults:
+    """한 종류(kind)의 검색 결과. Paginator가 자르는 페이지의 순위와 객체만 DB에서 가져온다.
+
+    색인에 맞는 문서가 없으면 제목에 검색어가 들어간 글을 최신순으로 보여준다. ('App'으로 'Apple' 찾기)
+    """
+
+    def __init__(self, q, kind, queryset=None):
+        self.model = _models()[kind]
+        # select_related / prefetch_related가 걸린 queryset을 넘기면 페이지 객체에도 적용된다.
+        self.queryset = queryset if queryset is not None else self.model.objects.all()
+        self.q = q
+        self.kind = kind
+        self.fallback = None
+        self._total = None
+
+    def _count(self):
+        self.terms = set(tokenize(self.q))
+        total = _bm25_count(self.terms, (self.kind,))
+        if not total:
+            self.fallback = self.queryset.filter(title__icontains=self.q).order_by('-pk')
+            total = self.fallback.count()
+        return total
+
+    def _ids(self, start, stop):
+        return [object_id for _, object_id, _ in _bm25_ranked(self.terms, (self.kind,), start, stop - start)]
+
+    def count(self):
+        if self._total is None:
+            self._total = self._count()
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(self.count())
+            if start >= stop:
+                return []
+            if self.fallback is not None:
+                return list(self.fallback[start:stop])
+            ids = self._ids(start, stop)
+            objects = self.queryset.in_bulk(ids)
+            return [objects[pk] for pk in ids if pk in objects]
+        return self[index:index + 1][0]
@@ -0,0 +1,219 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.text import slugify
+
+from . import markdown_cache
+
+# 부하 측정용 합성 데이터 표시. seed_data --clear는 이 표시가 있는 사용자와 태그만 지운다.
+# 실제 데이터와 겹치지 않도록 사용자 이름에는 username 검증이 허용하지 않는 ':'를 넣고,
+# 태그 slug는 slugify가 만들지 않는 '_'로 시작하게 한다. ('seed funding' -> 'seed-funding'은 안전)
+SEED_USER_PREFIX = 'seed:'
+SEED_SLUG_PREFIX = '_seed-'
+SEED_BATCH_SIZE = 1000
+# 태그 / 댓글 / 작성자 분포의 치우침 (Zipf 지수). 클수록 소수에 몰린다.
+SEED_SKEW = 1.1
+
+TERMS = [
+    '기준금리', '물가', '환율', '국채', '회사채', '주가지수', '경상수지', '무역수지', '가계부채', '부동산',
+    '전세', '고용', '실업률', '소비', '투자', '수출', '수입', '반도체', '유가', '원자재',
+    '인플레이션', '디플레이션', '경기침체', '성장률', '잠재성장률', '재정적자', '세수', '통화량', '유동성', '신용등급',
+    '금융안정', '은행', '보험', '연금', '배당', '공매도', '환헤지', '외환보유액', '스태그플레이션', '양적완화',
+]
+SUBJECTS = ['한국은행', '연준', '정부', '기획재정부', '금융위원회', '시장', '투자자', '가계', '기업', '수출업체']
+PREDICATES = [
+    '상승했다', '하락했다', '예상보다 크게 움직였다', '당분간 유지될 전망이다', '주목받고 있다',
+    '변동성이 커졌다', '둔화 조짐을 보인다', '회복세를 이어갔다', '부담으로 작용하고 있다', '전환점을 맞았다',
+]
+COMMENT_LINES = [
+    '좋은 정리 감사합니다.', '이 부분은 조금 더 설명이 필요해 보여요.', '최근 뉴스랑 같이 보니 이해가 됩니다.',
+    '출처가 궁금합니다.', '다음 글도 기대할게요!', '금리 얘기는 늘 어렵네요.', '그래프가 있으면 더 좋겠어요.',
+]
+
+
+def _josa(word, with_batchim, without_batchim):
+    # 마지막 글자에 받침이 있으면 '은/이/과', 없으면 '는/가/와'
+    code = ord(word[-1]) - 0xAC00
+    return with_batchim if 0 <= code < 11172 and code % 28 else without_batchim
+
+
+class Generator:
+    """seed가 같으면 같은 데이터를 만든다. 태그 / 댓글 / 작성자는 Zipf 분포로 치우치게 고른다."""
+
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+
+    def zipf_weights(self, n, skew=SEED_SKEW):
+        return list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, n + 1)))
+
+    def skewed(self, items, k, weights=None):
+        return self.rng.choices(items, cum_weights=weights or self.zipf_weights(len(items)), k=k)
+
+    def sentence(self):
+        term, other = self.rng.sample(TERMS, 2)
+        subject = self.rng.choice(SUBJECTS)
+        return self.rng.choice([
+            f'{term}{_josa(term, "이", "가")} {self.rng.choice(PREDICATES)}.',
+            f'{subject}{_josa(subject, "은", "는")} {term}{_josa(term, "과", "와")} {other}의 관계를 다시 살펴보고 있다.',
+            f'{term} 흐름을 보면 {other} 역시 {self.rng.choice(PREDICATES)}.',
+            f'{subject}에 따르면 올해 {term} 전망은 {self.rng.randint(1, 9)}.{self.rng.randint(0, 9)}% 수준이다.',
+        ])
+
+    def markdown(self, paragraphs):
+        # 소제목, 굵은 글씨, 목록이 섞인 본문
+        blocks = []
+        for index in range(paragraphs):
+            if index and self.rng.random() < 0.3:
+                blocks.append(f'## {self.rng.choice(TERMS)} 정리')
+            text = ' '.join(self.sentence() for _ in range(self.rng.randint(2, 5)))
+            term = self.rng.choice(TERMS)
+            blocks.append(text.replace(term, f'**{term}**', 1))
+            if self.rng.random() < 0.2:
+                blocks.append('\n'.join(f'- {self.sentence()}' for _ in range(3)))
+        return '\n\n'.join(blocks)
+
+    def title(self, limit):
+        term = self.rng.choice(TERMS)
+        return f'{term} {self.rng.choice(["동향", "전망", "분석", "이야기", "점검", "해설"])}'[:limit]
+
+    def tag_names(self, count):
+        # 용어와 그 조합으로 태그 이름을 만들고 모자라면 번호를 붙인다.
+        names = TERMS + [f'{a}{b}' for a, b in itertools.permutations(TERMS[:12], 2)]
+        return [names[i] if i < len(names) else f'{names[i % len(names)]}{i // len(names)}' for i in range(count)]
+
+    def dates(self, count, days):
+        now = datetime.now()
+        return sorted(now - timedelta(seconds=self.rng.uniform(0, days * 86400)) for _ in range(count))
+
+
+def _bulk_create(model, objects, batch_size):
+    from .models import news_hash
+
+    for obj in objects:
+        if hasattr(obj, 'content_html'):
+            # bulk_create는 save()를 거치지 않으므로 본문 HTML을 미리 만든다.
+            markdown_cache.refresh(obj)
+        if hasattr(obj, 'content_hash'):
+            obj.content_hash = news_hash(obj.title, obj.content)
+    return model.objects.bulk_create(objects, batch_size=batch_size)
+
+
+def _set_created_at(model, objects, dates, batch_size):
+    # auto_now_add는 bulk_create에서 값을 덮어쓰므로 넣은 뒤에 날짜를 흩어 놓는다.
+    for obj, created_at in zip(objects, dates):
+        obj.created_at = obj.updated_at = created_at
+    model.objects.bulk_update(objects, ['created_at', 'updated_at'], batch_size=batch_size)
+
+
+def _link_tags(gen, objects, tags, max_tags, batch_size):
+    through = type(objects[0]).tags.through
+    field = type(objects[0])._meta.get_field('tags')
+    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+    weights = gen.zipf_weights(len(tags))
+    rows = []
+    for obj in objects:
+        for tag in set(gen.skewed(tags, gen.rng.randint(1, max_tags), weights)):
+            rows.append(through(**{f'{source}_id': obj.pk, f'{target}_id': tag.pk}))
+    through.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    return len(rows)
+
+
+def seed(users=20, posts=1000, comments=5000, tags=200, words=1000, word_tags=200, news=1000,
+         days=365, max_tags=4, seed=42, batch_size=SEED_BATCH_SIZE):
+    """합성 데이터를 bulk insert로 넣고 모델별 건수를 반환한다."""
+    from .models import Comment, News, Post, Tag, Word, Word_Tag
+
+    gen = Generator(seed)
+    counts = {}
+    with transaction.atomic():
+        start = User.objects.filter(username__startswith=SEED_USER_PREFIX).count()
+        user_objects = [User(username=f'{SEED_USER_PREFIX}{start + i}') for i in range(users)]
+        for user in user_objects:
+            user.set_unusable_password()
+        user_objects = User.objects.bulk_create(user_objects, batch_size=batch_size)
+        counts['user'] = len(user_objects)
+        author_weights = gen.zipf_weights(len(user_objects))
+
+        def create_tags(model, count):
+            existing = set(model.objects.filter(slug__startswith=SEED_SLUG_PREFIX).values_list('slug', flat=True))
+            objects = []
+            for name in gen.tag_names(count):
+                slug = f'{SEED_SLUG_PREFIX}{slugify(name, allow_unicode=True)}'
+                if slug not in existing:
+                    existing.add(slug)
+                    objects.append(model(name=name, slug=slug))
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            # 이미 있던 seed 태그도 함께 쓴다. (seed_data를 여러 번 실행한 경우)
+            return list(model.objects.filter(slug__startswith=SEED_SLUG_PREFIX).order_by('pk')[:count])
+
+        tag_objects = create_tags(Tag, tags)
+        word_tag_objects = create_tags(Word_Tag, word_tags)
+        counts['tag'], counts['word_tag'] = len(tag_objects), len(word_tag_objects)
+
+        for key, model, count, title_limit, paragraphs, tag_list in (
+            ('post', Post, posts, 30, (2, 6), tag_objects),
+            ('word', Word, words, 50, (1, 2), word_tag_objects),
+            ('news', News, news, 30, (1, 3), word_tag_objects),
+        ):
+            authors = gen.skewed(user_objects, count, author_weights) if user_objects else [None] * count
+            objects = _bulk_create(model, [
+                model(
+                    # 단어 제목은 load_words처럼 제목으로 찾으므로 겹치지 않게 번호를 붙인다.
+                    title=f'{gen.title(title_limit - 7)} {i}' if key == 'word' else gen.title(title_limit),
+                    content=gen.markdown(gen.rng.randint(*paragraphs)),
+                    author=author,
+                )
+                for i, author in enumerate(authors)
+            ], batch_size)
+            _set_created_at(model, objects, gen.dates(count, days), batch_size)
+            if objects and tag_list:
+                _link_tags(gen, objects, tag_list, max_tags, batch_size)
+            counts[key] = len(objects)
+            if key == 'post':
+                post_objects = objects
+
+        # 댓글은 일부 인기 글에 몰리게 한다.
+        if post_objects and user_objects:
+            popular = post_objects[:]
+            gen.rng.shuffle(popular)
+            Comment.objects.bulk_create([
+                Comment(post=post, author=gen.rng.choice(user_objects), content=gen.rng.choice(COMMENT_LINES))
+                for post in gen.skewed(popular, comments)
+            ], batch_size=batch_size)
+            counts['comment'] = comments
+        else:
+            counts['comment'] = 0
+    return counts
+
+
+def clear():
+    """seed()로 넣은 데이터를 지운다. 작성자가 seed 사용자인 글과 seed 태그만 대상.
+
+    글마다 삭제 시그널(색인 / 태그 집계 / 의미 검색)을 보내지 않도록 딸린 행부터 직접 지운다.
+    끝난 뒤 태그 집계와 검색 색인은 호출한 쪽에서 다시 만든다.
+    """
+    from .models import (Comment, ContentSignature, News, Post, SearchDocument, Tag, Word, Word_Tag, WordNeighbor,
+                         WordSchedule)
+
+    deleted = {}
+    with transaction.atomic():
+        users = User.objects.filter(username__startswith=SEED_USER_PREFIX)
+        Comment.objects.filter(author__in=users)._raw_delete(Comment.objects.db)
+        Comment.objects.filter(post__author__in=users)._raw_delete(Comment.objects.db)
+        WordSchedule.objects.filter(word__author__in=users)._raw_delete(WordSchedule.objects.db)
+        WordNeighbor.objects.filter(word__author__in=users)._raw_delete(WordNeighbor.objects.db)
+        WordNeighbor.objects.filter(neighbor__author__in=users)._raw_delete(WordNeighbor.objects.db)
+        for key, model in (('post', Post), ('word', Word), ('news', News)):
+            objects = model.objects.filter(author__in=users)
+            model.tags.through.objects.filter(**{f'{model._meta.model_name}__in': objects}).delete()
+            SearchDocument.objects.filter(kind=key, object_id__in=objects.values('pk')).delete()
+            ContentSignature.objects.filter(kind=key, object_id__in=objects.values('pk')).delete()
+            deleted[key] = objects._raw_delete(model.objects.db)
+        deleted['tag'] = Tag.objects.filter(slug__startswith=SEED_SLUG_PREFIX).delete()[1].get('blog.Tag', 0)
+        deleted['word_tag'] = (Word_Tag.objects.filter(slug__startswith=SEED_SLUG_PREFIX).delete()[1]
+                               .get('blog.Word_Tag', 0))
+        deleted['user'] = users.delete()[1].get('auth.User', 0)
+    return deleted
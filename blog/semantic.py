@@ -0,0 +1,370 @@
+import hashlib
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import search
+from .file_lock import file_lock
+
+# 임베딩 함수: 텍스트 목록 -> (n, dim) float32 배열. 기본값은 오프라인에서 도는 해싱 임베딩.
+SEMANTIC_EMBEDDER = getattr(settings, 'SEMANTIC_EMBEDDER', 'blog.semantic.hashing_embed')
+SEMANTIC_HASH_DIM = getattr(settings, 'SEMANTIC_HASH_DIM', 512)
+SEMANTIC_BATCH_SIZE = 200
+# 변경 로그가 이 크기(바이트)를 넘으면 인덱스 전체를 새 스냅샷으로 쓰고 로그를 새로 시작한다.
+SEMANTIC_LOG_MAX_BYTES = getattr(settings, 'SEMANTIC_LOG_MAX_BYTES', 8 * 1024 * 1024)
+
+_lock = threading.RLock()
+_states = {}  # (인덱스 폴더, kind) -> _State
+_embedder = None
+
+
+def index_dir():
+    """인덱스 파일 폴더. 기본값은 소스 트리 밖의 사용자 캐시 폴더 (체크아웃 경로별로 따로)."""
+    path = getattr(settings, 'SEMANTIC_INDEX_DIR', None)
+    if path:
+        return str(path)
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    digest = hashlib.sha1(os.path.abspath(settings.BASE_DIR).encode()).hexdigest()[:12]
+    return os.path.join(cache_home, 'final_proj_blog', f'semantic_index-{digest}')
+
+
+def hashing_embed(texts):
+    """형태소 토큰을 부호 있는 해싱으로 고정 차원에 모은 벡터 (로그 tf, L2 정규화)."""
+    vectors = np.zeros((len(texts), SEMANTIC_HASH_DIM), dtype='float32')
+    for row, text in enumerate(texts):
+        for term, frequency in Counter(search.tokenize(text)).items():
+            h = zlib.crc32(term.encode())
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vectors[row, h % SEMANTIC_HASH_DIM] += sign * (1 + math.log(frequency))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def embed(texts):
+    global _embedder
+    if _embedder is None:
+        _embedder = import_string(SEMANTIC_EMBEDDER)
+    return np.ascontiguousarray(_embedder(list(texts)), dtype='float32')
+
+
+def _document_text(obj):
+    return f'{obj.title}\n{obj.content}'
+
+
+def _new_index(dim):
+    import faiss
+    # 정규화된 벡터의 내적 = 코사인 유사도, id는 객체 pk
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+
+def _read_snapshot(path):
+    import faiss
+    # 스냅샷은 고치지 않으므로 읽기 전용으로 매핑해 워커끼리 같은 페이지를 나눠 쓴다.
+    # (faiss 1.10부터 IO_FLAG_MMAP_IFC로 flat 인덱스도 매핑된다. 그 이전 버전은 메모리로 읽는다.)
+    return faiss.read_index(path, getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP))
+
+
+def _vectors(index):
+    """IndexIDMap2의 (ids, 벡터) 전체."""
+    import faiss
+    return faiss.vector_to_array(index.id_map).astype('int64'), index.index.reconstruct_n(0, index.ntotal)
+
+
+class _State:
+    """프로세스에 하나씩 두는 인덱스. generation 스냅샷을 읽고 그 뒤 변경 로그를 offset까지 반영한 상태.
+
+    스냅샷(base)은 디스크에 매핑된 채 그대로 두고, 로그로 바뀐 벡터는 메모리의 overlay에 넣는다.
+    hidden은 base에 있지만 지워졌거나 overlay의 새 벡터로 바뀐 id다.
+    """
+
+    def __init__(self, base, generation):
+        self.base = base
+        self.overlay = None
+        self.hidden = set()
+        self.generation = generation
+        self.offset = 0
+
+    @property
+    def ntotal(self):
+        total = self.base.ntotal - len(self.hidden) if self.base is not None else 0
+        return total + (self.overlay.ntotal if self.overlay is not None else 0)
+
+    def _in_base(self, pk):
+        try:
+            self.base.reconstruct(pk)
+        except RuntimeError:
+            return False
+        return True
+
+    def apply(self, ids, vectors):
+        """ids를 지우고 (벡터가 있으면) 다시 넣는다."""
+        if self.base is not None:
+            self.hidden.update(pk for pk in map(int, ids) if pk not in self.hidden and self._in_base(pk))
+        if self.overlay is not None:
+            self.overlay.remove_ids(ids)
+        if vectors is not None:
+            if self.overlay is None:
+                self.overlay = _new_index(vectors.shape[1])
+            self.overlay.add_with_ids(vectors, ids)
+
+    def search(self, vector, k):
+        hits = []
+        for index, skip in ((self.base, self.hidden), (self.overlay, ())):
+            if index is None or not index.ntotal:
+                continue
+            # base에서는 숨긴 id가 끼어도 k개가 남도록 그만큼 더 가져온다.
+            scores, ids = index.search(vector.reshape(1, -1), min(k + len(skip), index.ntotal))
+            hits.extend((int(pk), float(score)) for pk, score in zip(ids[0], scores[0])
+                        if pk != -1 and int(pk) not in skip)
+        return sorted(hits, key=lambda hit: -hit[1])[:k]
+
+    def reconstruct(self, pk):
+        """pk의 벡터. 인덱스에 없으면 None."""
+        for index in (self.overlay, None if pk in self.hidden else self.base):
+            if index is not None:
+                try:
+                    return index.reconstruct(pk)
+                except RuntimeError:
+                    pass
+        return None
+
+    def merged(self):
+        """base에서 숨긴 id를 빼고 overlay를 더한 새 인덱스. 둘 다 없으면 None."""
+        parts = []
+        if self.base is not None and self.base.ntotal:
+            ids, vectors = _vectors(self.base)
+            keep = ~np.isin(ids, np.fromiter(self.hidden, dtype='int64', count=len(self.hidden)))
+            parts.append((ids[keep], vectors[keep]))
+        if self.overlay is not None and self.overlay.ntotal:
+            parts.append(_vectors(self.overlay))
+        dims = [index.d for index in (self.base, self.overlay) if index is not None]
+        if not dims:
+            return None
+        index = _new_index(dims[0])
+        for ids, vectors in parts:
+            index.add_with_ids(np.ascontiguousarray(vectors, dtype='float32'), ids)
+        return index
+
+
+def _path(kind, suffix):
+    return os.path.join(index_dir(), f'{kind}.{suffix}')
+
+
+def _lock_path(kind):
+    return _path(kind, 'lock')
+
+
+def _read_version(kind):
+    try:
+        with open(_path(kind, 'version')) as f:
+            return int(f.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_version(kind, generation):
+    path = _path(kind, 'version')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(generation))
+    os.replace(tmp_path, path)
+
+
+# 변경 로그 레코드: int64 (n, dim) + int64 id n개 + float32 벡터 n x dim. dim이 0이면 삭제만.
+# 레코드 하나가 "ids를 지우고 (벡터가 있으면) 다시 넣기"이므로 순서대로 적용하면 된다.
+_HEADER = np.dtype('<i8')
+
+
+def _pack(ids, vectors):
+    dim = 0 if vectors is None else vectors.shape[1]
+    data = np.array([len(ids), dim], dtype=_HEADER).tobytes() + ids.astype('<i8').tobytes()
+    if vectors is not None:
+        data += vectors.astype('<f4').tobytes()
+    return data
+
+
+def _replay(state, data):
+    """로그 바이트를 앞에서부터 적용하고 읽은 길이를 반환한다. 덜 쓰인 마지막 레코드는 남겨 둔다."""
+    pos = 0
+    while pos + 16 <= len(data):
+        n, dim = np.frombuffer(data, dtype=_HEADER, count=2, offset=pos)
+        size = 16 + 8 * n + 4 * n * dim
+        if pos + size > len(data):
+            break
+        ids = np.frombuffer(data, dtype='<i8', count=n, offset=pos + 16).astype('int64')
+        vectors = None
+        if dim:
+            vectors = np.frombuffer(data, dtype='<f4', count=n * dim, offset=pos + 16 + 8 * n)
+            vectors = np.ascontiguousarray(vectors.reshape(n, dim), dtype='float32')
+        state.apply(ids, vectors)
+        pos += size
+    return pos
+
+
+def _sync(kind):
+    """이 프로세스의 인덱스를 디스크(스냅샷 + 변경 로그)와 맞춘다. (_lock 안에서 호출)
+
+    다른 프로세스가 그 사이 새 스냅샷을 만들었으면 스냅샷부터 다시 읽고, 아니면 새로 붙은 로그만 읽는다.
+    """
+    key = (index_dir(), kind)
+    while True:
+        generation = _read_version(kind)
+        state = _states.get(key)
+        if state is None or state.generation != generation:
+            snapshot = _path(kind, f'{generation}.faiss')
+            if os.path.exists(snapshot):
+                try:
+                    index = _read_snapshot(snapshot)
+                except RuntimeError:
+                    if generation == _read_version(kind):
+                        raise
+                    continue  # 읽는 사이 새 스냅샷으로 바뀌어 지워졌다.
+            elif generation != _read_version(kind):
+                continue
+            else:
+                index = None
+            state = _states[key] = _State(index, generation)
+        try:
+            with open(_path(kind, f'{generation}.log'), 'rb') as f:
+                f.seek(state.offset)
+                data = f.read()
+        except FileNotFoundError:
+            if generation != _read_version(kind):
+                continue
+            data = b''
+        state.offset += _replay(state, data)
+        return state
+
+
+def _snapshot(kind, state, index):
+    """index를 다음 generation 스냅샷으로 쓰고 빈 로그를 시작한다. 이전 파일은 지운다. (file_lock 안에서 호출)"""
+    import faiss
+
+    old = state.generation
+    generation = old + 1
+    base = None
+    if index is not None:
+        path = _path(kind, f'{generation}.faiss')
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, path)
+        base = _read_snapshot(path)
+    open(_path(kind, f'{generation}.log'), 'wb').close()
+    _write_version(kind, generation)
+    for suffix in (f'{old}.faiss', f'{old}.log'):
+        if os.path.exists(_path(kind, suffix)):
+            os.remove(_path(kind, suffix))
+    state.base, state.overlay, state.hidden = base, None, set()
+    state.generation, state.offset = generation, 0
+
+
+def _load(kind):
+    """이 프로세스의 최신 인덱스 상태(_State). (검색은 _lock 안에서)"""
+    with _lock:
+        return _sync(kind)
+
+
+def update(obj):
+    """저장된 Post / Word / News 한 건의 벡터를 인덱스에 넣거나 바꾼다."""
+    update_objects([obj])
+
+
+def update_objects(objects):
+    """같은 종류의 객체 여러 건을 한 번에 임베딩해 인덱스에 넣는다. (bulk_create 뒤에 사용)"""
+    if objects:
+        _update(search.kind_of(objects[0]), [obj.pk for obj in objects], embed([_document_text(obj) for obj in objects]))
+
+
+def remove(kind, pk):
+    _update(kind, [pk], None)
+
+
+def _update(kind, pks, vectors):
+    """메모리의 인덱스에 벡터를 넣고 빼고, 디스크에는 변경분만 로그로 덧붙인다.
+
+    여러 워커가 함께 쓰므로 파일 잠금 안에서 다른 워커가 덧붙인 로그를 먼저 반영한 뒤 쓴다.
+    로그가 SEMANTIC_LOG_MAX_BYTES를 넘을 때만 인덱스 전체를 스냅샷으로 쓴다.
+    """
+    ids = np.array(pks, dtype='int64')
+    os.makedirs(index_dir(), exist_ok=True)
+    with _lock, file_lock(_lock_path(kind)):
+        state = _sync(kind)
+        if not state.ntotal and vectors is None:
+            return
+        data = _pack(ids, vectors)
+        with open(_path(kind, f'{state.generation}.log'), 'ab') as f:
+            if f.tell() != state.offset:
+                # 이전 쓰기가 중간에 죽어 남긴 덜 쓰인 레코드는 잘라 낸다.
+                f.truncate(state.offset)
+            f.write(data)
+        state.offset += len(data)
+        state.apply(ids, vectors)
+        if state.offset > SEMANTIC_LOG_MAX_BYTES:
+            _snapshot(kind, state, state.merged())
+
+
+def rebuild(kind, batch_size=SEMANTIC_BATCH_SIZE):
+    """kind 전체를 batch_size 단위로 다시 임베딩해서 인덱스를 새로 만든다. 처리한 건수를 반환."""
+    model = search._models()[kind]
+    index = None
+    count = 0
+    batch = []
+
+    def flush():
+        nonlocal index
+        vectors = embed([text for _, text in batch])
+        if index is None:
+            index = _new_index(vectors.shape[1])
+        index.add_with_ids(vectors, np.array([pk for pk, _ in batch], dtype='int64'))
+
+    for obj in model.objects.only('pk', 'title', 'content').iterator(chunk_size=batch_size):
+        batch.append((obj.pk, _document_text(obj)))
+        if len(batch) >= batch_size:
+            flush()
+            count += len(batch)
+            batch = []
+    if batch:
+        flush()
+        count += len(batch)
+
+    os.makedirs(index_dir(), exist_ok=True)
+    with _lock, file_lock(_lock_path(kind)):
+        _snapshot(kind, _sync(kind), index)
+    return count
+
+
+def _search(kind, vector, k):
+    # 같은 프로세스의 다른 스레드가 인덱스를 고치는 중에는 검색하지 않는다.
+    with _lock:
+        hits = _load(kind).search(vector, k)
+    return [(pk, score) for pk, score in hits if score > 0]
+
+
+def similar(kind, pk, k=5):
+    """pk와 비슷한 같은 종류 객체의 [(pk, 코사인 유사도), ...]. 인덱스에 없으면 빈 목록."""
+    with _lock:
+        vector = _load(kind).reconstruct(pk)
+    if vector is None:
+        return []
+    return [(other, score) for other, score in _search(kind, vector, k + 1) if other != pk][:k]
+
+
+def semantic_search(q, kind, k=100):
+    return _search(kind, embed([q])[0], k)
+
+
+class SemanticResults(search.SearchResults):
+    """SearchResults와 같은 인터페이스로 의미 검색 결과(코사인 유사도 순)를 페이지 단위로 가져온다."""
+
+    def _count(self):
+        self.hits = semantic_search(self.q, self.kind)
+        return len(self.hits)
+
+    def _ids(self, start, stop):
+        return [pk for pk, _ in self.hits[start:stop]]
@@ -0,0 +1,174 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import (image_derivatives, near_duplicates, page_cache, perf, related_words, search, semantic, tag_stats,
+               today_news, word_schedule)
+from .models import Comment, News, Post, Tag, Word, Word_Tag, WordSchedule
+
+
+# 요청별 DB 시간 / 쿼리 수 측정 (perf.py)
+connection_created.connect(perf.install_db_wrapper)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_today_news(sender, **kwargs):
+    today_news.invalidate()
+
+
+@receiver(post_save, sender=Word)
+@receiver(post_delete, sender=Word)
+@receiver(post_save, sender=WordSchedule)
+@receiver(post_delete, sender=WordSchedule)
+def invalidate_word_of_the_day(sender, **kwargs):
+    word_schedule.invalidate()
+    if sender is WordSchedule:
+        page_cache.bump('word')
+
+
+# 검색 색인(형태소 분석 + 색인 쓰기)은 커밋된 뒤에 모아서 반영한다.
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Word)
+@receiver(post_save, sender=News)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.schedule(search.kind_of(instance), instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Word)
+@receiver(post_delete, sender=News)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.schedule(search.kind_of(instance), instance.pk)
+
+
+# 근접 중복 확인용 MinHash 서명 (near_duplicates.py). 저장할 때 한 번 계산해 두되, 형태소 분석과
+# 서명 계산이 무거우므로 커밋된 뒤에 한다. 삭제도 저장과 순서가 섞이지 않게 커밋 뒤에 반영한다.
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=News)
+def update_near_duplicates(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: near_duplicates.update(instance))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=News)
+def remove_near_duplicates(sender, instance, **kwargs):
+    kind, pk = search.kind_of(instance), instance.pk
+    transaction.on_commit(lambda: near_duplicates.remove(kind, pk))
+
+
+# 임베딩은 무거우므로 커밋된 뒤에 계산해 의미 검색 인덱스에 반영한다.
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Word)
+@receiver(post_save, sender=News)
+def update_semantic_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: semantic.update(instance))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Word)
+@receiver(post_delete, sender=News)
+def remove_from_semantic_index(sender, instance, **kwargs):
+    kind, pk = search.kind_of(instance), instance.pk
+    transaction.on_commit(lambda: semantic.remove(kind, pk))
+
+
+# 관련 용어는 검색 색인(본문 유사도)과 태그가 모두 반영된 뒤, 커밋 시점에 다시 계산한다.
+@receiver(post_save, sender=Word)
+def update_related_words(sender, instance, raw=False, **kwargs):
+    if not raw:
+        related_words.schedule(instance.pk)
+
+
+@receiver(pre_delete, sender=Word)
+def remember_related_words(sender, instance, **kwargs):
+    # 삭제되면 이 단어를 가리키던 관련 용어 행도 CASCADE로 사라지므로 미리 구해 둔다.
+    instance._related_word_ids = related_words.pointing_to(instance.pk)
+
+
+@receiver(post_delete, sender=Word)
+def remove_related_words(sender, instance, **kwargs):
+    related_words.schedule(instance.pk, getattr(instance, '_related_word_ids', ()))
+
+
+@receiver(m2m_changed, sender=Word.tags.through)
+def update_related_words_for_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('post_'):
+        word_ids = list(pk_set or ()) if reverse else [instance.pk]
+        for pk in word_ids:
+            related_words.schedule(pk)
+
+
+@receiver(post_save, sender=Post)
+def warm_head_image_derivatives(sender, instance, raw=False, **kwargs):
+    # 이미 만들어 둔 크기는 건너뛰므로 이미지가 그대로인 수정에서는 파일 확인만 한다.
+    if not raw and instance.head_image:
+        name = instance.head_image.name
+        transaction.on_commit(lambda: image_derivatives.warm(name))
+
+
+# 페이지 캐시 그룹: 'post' 같은 목록 그룹과 'post:<pk>' 같은 상세 그룹 (page_cache.cached_page 참고)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Word)
+@receiver(post_delete, sender=Word)
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_content_pages(sender, instance, **kwargs):
+    kind = sender._meta.model_name
+    page_cache.bump(kind, f'{kind}:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    page_cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Word_Tag)
+@receiver(post_delete, sender=Word_Tag)
+def invalidate_tag_pages(sender, instance, **kwargs):
+    page_cache.bump(sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Word.tags.through)
+@receiver(m2m_changed, sender=News.tags.through)
+def invalidate_tagged_pages(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        kind = instance._meta.model_name
+        page_cache.bump(kind, f'{kind}:{instance.pk}')
+    else:
+        # 태그 쪽에서 바꾼 경우 instance는 태그, pk_set은 글 pk 목록 (clear면 None)
+        kind = model._meta.model_name
+        page_cache.bump(kind, type(instance)._meta.model_name, *[f'{kind}:{pk}' for pk in pk_set or ()])
+
+
+# 태그 사용 횟수 집계 (blog/tag_stats.py)
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Word.tags.through)
+@receiver(m2m_changed, sender=News.tags.through)
+def update_tag_stats(sender, instance, action, reverse, model, pk_set, **kwargs):
+    kind = model._meta.model_name if reverse else instance._meta.model_name
+    tag_stats.m2m_changed(kind, instance, action, reverse, pk_set)
+
+
+@receiver(pre_delete, sender=Post)
+@receiver(pre_delete, sender=Word)
+@receiver(pre_delete, sender=News)
+def update_tag_stats_for_deleted(sender, instance, **kwargs):
+    tag_stats.object_deleted(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Word_Tag)
+def remove_tag_stats(sender, instance, **kwargs):
+    tag_stats.tag_deleted(instance)
@@ -0,0 +1,153 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from . import page_cache
+
+# 태그 구름에 보여줄 태그 수와 캐시 시간(초). 태그 사용 횟수가 바뀌면 바로 비운다.
+TAG_CLOUD_SIZE = getattr(settings, 'TAG_CLOUD_SIZE', 30)
+TAG_CLOUD_TIMEOUT = 60 * 60
+TAG_CLOUD_WEIGHTS = 5
+
+
+def _models():
+    from .models import Post, Word, News
+    return {'post': Post, 'word': Word, 'news': News}
+
+
+def _through_fields(kind):
+    # Post.tags.through -> ('post', 'tag'), Word.tags.through -> ('word', 'word_tag')
+    field = _models()[kind]._meta.get_field('tags')
+    return field.remote_field.through, field.m2m_field_name(), field.m2m_reverse_field_name()
+
+
+def kinds_for_tag(tag_model):
+    return [kind for kind, model in _models().items() if model._meta.get_field('tags').related_model is tag_model]
+
+
+def _cloud_key(kind):
+    return f'tag_cloud:{kind}'
+
+
+def _invalidate(kinds):
+    # 태그 구름은 base.html에 있어 모든 캐시 페이지에 들어간다. 그 페이지들이 공통으로 쓰는
+    # 태그 그룹('tag' / 'word_tag')을 올려 다른 글 상세 페이지의 구름도 함께 갱신한다.
+    cache.delete_many([_cloud_key(kind) for kind in kinds])
+    page_cache.bump(*{_models()[kind]._meta.get_field('tags').related_model._meta.model_name for kind in kinds})
+
+
+def adjust(kind, deltas):
+    """{tag_id: 증감} 만큼 사용 횟수를 바꾼다. 늘어난 태그는 마지막 사용 시각도 갱신."""
+    from .models import TagStat
+
+    deltas = {tag_id: delta for tag_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    TagStat.objects.bulk_create([TagStat(kind=kind, tag_id=tag_id) for tag_id in deltas], ignore_conflicts=True)
+    by_delta = defaultdict(list)
+    for tag_id, delta in deltas.items():
+        by_delta[delta].append(tag_id)
+    now = timezone.now()
+    for delta, tag_ids in by_delta.items():
+        fields = {'count': F('count') + delta}
+        if delta > 0:
+            fields['last_used_at'] = now
+        TagStat.objects.filter(kind=kind, tag_id__in=tag_ids).update(**fields)
+    _invalidate([kind])
+
+
+def m2m_changed(kind, instance, action, reverse, pk_set):
+    """m2m_changed 수신기에서 호출. reverse면 instance가 태그, pk_set이 글 pk 목록."""
+    through, source, target = _through_fields(kind)
+    pending = f'_tag_stat_pending_{kind}'
+
+    if action in ('pre_remove', 'pre_clear'):
+        # remove에는 연결되지 않은 pk도 올 수 있으므로 실제로 끊길 연결만 미리 구해 둔다.
+        if reverse:
+            source, target = target, source
+        links = through.objects.filter(**{f'{source}_id': instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{f'{target}_id__in': pk_set})
+        setattr(instance, pending, set(links.values_list(f'{target}_id', flat=True)))
+    elif action == 'post_add':
+        if reverse:
+            adjust(kind, {instance.pk: len(pk_set)})
+        else:
+            adjust(kind, dict.fromkeys(pk_set, 1))
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance.__dict__.pop(pending, set())
+        if reverse:
+            adjust(kind, {instance.pk: -len(removed)})
+        else:
+            adjust(kind, dict.fromkeys(removed, -1))
+
+
+def object_deleted(instance):
+    # 글이 지워지면 연결 행은 m2m_changed 없이 CASCADE로 사라진다.
+    kind = instance._meta.model_name
+    through, source, target = _through_fields(kind)
+    tag_ids = through.objects.filter(**{f'{source}_id': instance.pk}).values_list(f'{target}_id', flat=True)
+    adjust(kind, dict.fromkeys(tag_ids, -1))
+
+
+def tag_deleted(tag):
+    from .models import TagStat
+
+    kinds = kinds_for_tag(type(tag))
+    TagStat.objects.filter(kind__in=kinds, tag_id=tag.pk).delete()
+    _invalidate(kinds)
+
+
+def rebuild(kind):
+    """연결 테이블에서 kind의 태그 집계를 다시 만든다. (bulk_create로 넣은 연결 반영) 태그 수를 반환."""
+    from .models import TagStat
+
+    through, source, target = _through_fields(kind)
+    rows = through.objects.values(f'{target}_id').annotate(count=Count('pk'), last=Max(f'{source}__created_at'))
+    with transaction.atomic():
+        TagStat.objects.filter(kind=kind).delete()
+        stats = TagStat.objects.bulk_create([
+            TagStat(kind=kind, tag_id=row[f'{target}_id'], count=row['count'], last_used_at=row['last'])
+            for row in rows
+        ])
+    _invalidate([kind])
+    return len(stats)
+
+
+def count(kind, tag_id):
+    from .models import TagStat
+
+    return TagStat.objects.filter(kind=kind, tag_id=tag_id).values_list('count', flat=True).first() or 0
+
+
+def cloud(kind, size=TAG_CLOUD_SIZE):
+    """많이 쓰인 태그 size개를 이름순으로. weight는 사용 횟수의 로그 비례 1~5."""
+    from .models import TagStat
+
+    key = _cloud_key(kind)
+    tags = cache.get(key)
+    if tags is None:
+        counts = dict(
+            TagStat.objects.filter(kind=kind, count__gt=0).order_by('-count', 'tag_id')
+                           .values_list('tag_id', 'count')[:size]
+        )
+        tag_model = _models()[kind]._meta.get_field('tags').related_model
+        objects = tag_model.objects.in_bulk(list(counts))
+        low, high = math.log(min(counts.values(), default=1)), math.log(max(counts.values(), default=1))
+        tags = sorted((
+            {
+                'name': tag.name,
+                'url': tag.get_absolute_url(),
+                'count': counts[pk],
+                'weight': 1 + round((TAG_CLOUD_WEIGHTS - 1) * (math.log(counts[pk]) - low) / (high - low))
+                if high > low else (TAG_CLOUD_WEIGHTS + 1) // 2,
+            }
+            for pk, tag in objects.items()
+        ), key=lambda tag: tag['name'])
+        cache.set(key, tags, TAG_CLOUD_TIMEOUT)
+    return tags
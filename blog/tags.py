@@ -0,0 +1,65 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+from . import page_cache
+
+# 이름을 slugify하면 빈 문자열이 되는 태그(문장 부호만 있는 이름 등)에 쓸 슬러그
+EMPTY_SLUG = 'tag'
+
+
+def parse_tag_names(tags_str):
+    """'a; b, c' 형식의 입력을 순서를 유지한 중복 없는 태그 이름 목록으로 바꾼다."""
+    if not tags_str:
+        return []
+    names = []
+    for name in tags_str.replace(',', ';').split(';'):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _unique_slugs(tag_model, names):
+    # 후보 슬러그 자체와 '후보-'로 시작하는 기존 슬러그만 한 번에 가져와서 메모리에서 번호를 붙인다.
+    bases = {name: slugify(name, allow_unicode=True) or EMPTY_SLUG for name in names}
+    taken = set(
+        tag_model.objects.filter(reduce(or_, (
+            Q(slug=base) | Q(slug__startswith=f'{base}-') for base in sorted(set(bases.values()))
+        ))).values_list('slug', flat=True)
+    )
+    slugs = {}
+    for name, base in bases.items():
+        slug = base
+        number = 1
+        while slug in taken:
+            slug = f'{base}-{number}'
+            number += 1
+        taken.add(slug)
+        slugs[name] = slug
+    return slugs
+
+
+def resolve_tags(tag_model, names):
+    """이름 목록에 해당하는 태그(Tag / Word_Tag)를 찾고, 없는 것은 한꺼번에 만든다."""
+    if not names:
+        return []
+    existing = {tag.name: tag for tag in tag_model.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in existing]
+    if missing:
+        slugs = _unique_slugs(tag_model, missing)
+        for tag in tag_model.objects.bulk_create([tag_model(name=name, slug=slugs[name]) for name in missing]):
+            existing[tag.name] = tag
+        # bulk_create는 post_save를 보내지 않으므로 태그 목록 페이지 캐시를 직접 무효화한다.
+        page_cache.bump(tag_model._meta.model_name)
+    return [existing[name] for name in names]
+
+
+def add_tags(obj, tags_str):
+    """tags_str의 태그를 obj.tags에 한 번에 추가한다. 태그 모델은 M2M 필드에서 알아낸다."""
+    tags = resolve_tags(obj.tags.model, parse_tag_names(tags_str))
+    if tags:
+        obj.tags.add(*tags)
+    return tags
@@ -0,0 +1,13 @@
+from django import template
+
+from blog import image_derivatives
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_srcset(image, fmt='jpeg'):
+    # {% image_srcset post.head_image 'webp' %} -> "/media/derivatives/..._320w.webp 320w, ..."
+    if not image:
+        return ''
+    return image_derivatives.srcset(image, fmt)
@@ -0,0 +1,11 @@
+from django import template
+
+from blog import tag_stats
+
+register = template.Library()
+
+
+@register.inclusion_tag('blog/tag_cloud.html')
+def tag_cloud(kind):
+    # {% tag_cloud 'post' %} -> 많이 쓰인 태그를 사용 횟수에 따라 크기를 달리해 보여준다. (캐시됨)
+    return {'tags': tag_stats.cloud(kind)}
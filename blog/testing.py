@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+
+from allauth.socialaccount.models import SocialApp
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.test import TestCase, override_settings
+
+
+# 여러 앱의 tests.py가 함께 쓰는 테스트 데이터와 설정
+
+
+def create_google_app():
+    # navbar의 구글 로그인 링크가 SocialApp을 필요로 함
+    google_app = SocialApp.objects.create(provider='google', name='google', client_id='test', secret='test')
+    google_app.sites.add(Site.objects.get_current())
+
+
+def use_temp_semantic_index(test):
+    """test가 끝날 때까지 의미 검색 인덱스(semantic.py)를 임시 폴더에 둔다. 폴더 경로를 반환."""
+    path = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, path, ignore_errors=True)
+    settings_override = override_settings(SEMANTIC_INDEX_DIR=path)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+    return path
+
+
+class SiteTestCase(TestCase):
+    """페이지를 그리는 테스트의 공통 데이터. 구글 SocialApp과 사용자 trump를 클래스마다 한 번 만든다.
+
+    커밋 훅이 쓰는 의미 검색 인덱스는 클래스마다 임시 폴더에 둔다.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        index_dir = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, index_dir)
+        cls.enterClassContext(override_settings(SEMANTIC_INDEX_DIR=index_dir))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        create_google_app()
+        cls.user_trump = User.objects.create_user(username='trump', password='somepassword')
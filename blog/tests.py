@@ -0,0 +1,1387 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.test import TestCase, TransactionTestCase, AsyncClient, Client, RequestFactory, override_settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.urls import resolve
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+from PIL import Image
+from openai import BadRequestError
+import base64
+import hashlib
+import json
+import httpx
+import mmh3
+import numpy as np
+import os
+import re
+import shutil
+import tempfile
+from .models import Post, Comment, Word, News, ContentSignature, SearchDocument, ImageJob, Tag, Word_Tag, WordNeighbor, TagStat
+from . import async_reads, image_cache, image_derivatives, image_jobs, load_bench, markdown_cache, near_duplicates, news_feeds, page_cache, perf, related_words, search, seed, semantic, tag_stats, tags, today_news, view_counter
+from .management.commands import benchmark_queries
+from .dalle import save_gen_img
+from .testing import SiteTestCase, create_google_app, use_temp_semantic_index
+from .views import COMMENTS_PAGE_SIZE, AsyncPostList
+
+
+class TestMarkdownCache(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user_trump = User.objects.create_user(username='trump', password='somepassword')
+
+    def test_rendered_on_save(self):
+        post_001 = Post.objects.create(
+            title='첫 번째 포스트',
+            content='**첫 번째** 포스트입니다.',
+            author=self.user_trump
+        )
+        post_001.refresh_from_db()
+        self.assertIn('<strong>첫 번째</strong>', post_001.content_html)
+        self.assertEqual(post_001.get_content_markdown(), post_001.content_html)
+
+        post_001.content = '*수정된* 포스트입니다.'
+        post_001.save()
+        post_001.refresh_from_db()
+        self.assertIn('<em>수정된</em>', post_001.get_content_markdown())
+
+    def test_update_fields_without_content_skips_render(self):
+        post = Post.objects.create(title='포스트', content='**본문**', author=self.user_trump)
+        with mock.patch('blog.markdown_cache.render', wraps=markdown_cache.render) as render:
+            post.title = '제목만 수정'
+            post.save(update_fields=['title'])
+            self.assertFalse(render.called)
+
+            post.content = '*수정된* 본문'
+            post.save(update_fields=['content'])
+            self.assertEqual(render.call_count, 1)
+        post.refresh_from_db()
+        self.assertIn('<em>수정된</em>', post.content_html)
+
+    def test_update_fields_in_cache_mode(self):
+        cache.clear()
+        with mock.patch.object(markdown_cache, 'MARKDOWN_CACHE_STORE', 'cache'):
+            post = Post.objects.create(title='포스트', content='**본문**', author=self.user_trump)
+            post.content = '*수정된* 본문'
+            post.save(update_fields=['content'])
+            # DB에서 읽은 updated_at으로 만든 키가 새 렌더링 결과를 가리켜야 한다.
+            self.assertIn('<em>수정된</em>', Post.objects.get(pk=post.pk).get_content_markdown())
+
+    def test_empty_render_is_not_a_miss(self):
+        post = Post.objects.create(title='빈 글', content=' \n', author=self.user_trump)
+        post.refresh_from_db()
+        with mock.patch('blog.markdown_cache.render') as render, self.assertNumQueries(0):
+            self.assertEqual(post.get_content_markdown(), '')
+        self.assertFalse(render.called)
+
+    def test_warm_markdown(self):
+        Post.objects.bulk_create([
+            Post(title=f'포스트 {i}', content=f'포스트 {i} ' + '단어 ' * 100, author=self.user_trump)
+            for i in range(3)
+        ])
+        self.assertFalse(Post.objects.exclude(content_html='').exists())
+
+        out = StringIO()
+        call_command('warm_markdown', stdout=out)
+        self.assertIn('post: 3', out.getvalue())
+        for p in Post.objects.all():
+            self.assertTrue(p.content_html)
+            self.assertTrue(p.content_excerpt.endswith('…</p>'))
+
+
+class TestViewCounter(TestCase):
+    def setUp(self):
+        self.user_trump = User.objects.create_user(username='trump', password='somepassword')
+        self.post_001 = Post.objects.create(title='첫 번째 포스트', content='첫 번째 포스트입니다.', author=self.user_trump)
+        self.post_002 = Post.objects.create(title='두 번째 포스트', content='두 번째 포스트입니다.', author=self.user_trump)
+        view_counter.flush()
+
+    def test_buffered_increment(self):
+        updated_at = self.post_001.updated_at
+        for _ in range(3):
+            self.post_001.update_count
+        self.post_002.update_count
+
+        self.post_001.refresh_from_db()
+        self.assertEqual(self.post_001.view_count, 0)
+        self.assertEqual(self.post_001.total_view_count, 3)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(view_counter.flush(), 4)
+
+        self.post_001.refresh_from_db()
+        self.post_002.refresh_from_db()
+        self.assertEqual(self.post_001.view_count, 3)
+        self.assertEqual(self.post_002.view_count, 1)
+        self.assertEqual(self.post_001.total_view_count, 3)
+        self.assertEqual(self.post_001.updated_at, updated_at)
+
+
+    def test_failed_flush_requeues(self):
+        for _ in range(2):
+            self.post_001.update_count
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                view_counter.flush()
+        self.assertEqual(view_counter.pending(self.post_001.pk), 2)
+        self.assertEqual(view_counter.flush(), 2)
+
+
+@mock.patch.object(view_counter, 'VIEW_COUNT_BUFFER', 'cache')
+class TestCachedViewCounter(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='trump', password='somepassword')
+        self.post = Post.objects.create(title='포스트', content='본문', author=user)
+        self.other = Post.objects.create(title='다른 포스트', content='본문', author=user)
+
+    def view_count(self, post):
+        post.refresh_from_db()
+        return post.view_count
+
+    def test_flush(self):
+        for _ in range(3):
+            view_counter.increment(self.post.pk)
+        view_counter.increment(self.other.pk)
+        self.assertEqual(view_counter.pending(self.post.pk), 3)
+        self.assertEqual(view_counter.flush(), 4)
+        self.assertEqual((self.view_count(self.post), self.view_count(self.other)), (3, 1))
+
+        # 반영된 글은 다시 늘기 시작하면 새로 등록된다.
+        view_counter.increment(self.post.pk)
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(self.view_count(self.post), 4)
+
+    def test_increment_during_flush_is_kept(self):
+        view_counter.increment(self.post.pk)
+        real_cache = view_counter.cache
+
+        class RacingCache:
+            # flush가 값을 읽고 빼기 직전에 다른 워커가 조회수를 올린 상황
+            def __getattr__(self, name):
+                return getattr(real_cache, name)
+
+            def decr(self, key, delta):
+                real_cache.incr(key, 1)
+                return real_cache.decr(key, delta)
+
+        with mock.patch.object(view_counter, 'cache', RacingCache()):
+            self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(view_counter.pending(self.post.pk), 1)
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(self.view_count(self.post), 2)
+
+    def test_threshold(self):
+        with mock.patch.object(view_counter, 'VIEW_COUNT_FLUSH_THRESHOLD', 3):
+            view_counter.increment(self.post.pk)
+            view_counter.increment(self.other.pk)
+            self.assertEqual(self.view_count(self.post), 0)
+            view_counter.increment(self.post.pk)
+        self.assertEqual((self.view_count(self.post), self.view_count(self.other)), (2, 1))
+
+    def test_failed_flush_requeues(self):
+        view_counter.increment(self.post.pk, 2)
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                view_counter.flush()
+            # 조회 중 반영이 실패해도 요청은 계속된다.
+            with mock.patch.object(view_counter, 'VIEW_COUNT_FLUSH_THRESHOLD', 1), \
+                    self.assertLogs('blog.view_counter', 'ERROR'):
+                view_counter.increment(self.post.pk)
+        self.assertEqual(view_counter.pending(self.post.pk), 3)
+        self.assertEqual(view_counter.flush(), 3)
+        self.assertEqual(self.view_count(self.post), 3)
+
+class TestTodayNews(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user_trump = User.objects.create_user(username='trump', password='somepassword')
+
+    def test_cached_and_invalidated(self):
+        news_001 = News.objects.create(title='첫 번째 뉴스', content='첫 번째 뉴스입니다.', author=self.user_trump)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(today_news.get_today_news()[0]['url'], news_001.get_absolute_url())
+        with self.assertNumQueries(0):
+            self.assertEqual(len(today_news.get_today_news()), 1)
+
+        News.objects.create(title='두 번째 뉴스', content='두 번째 뉴스입니다.', author=self.user_trump)
+        titles = [n['title'] for n in today_news.get_today_news()]
+        self.assertEqual(titles, ['첫 번째 뉴스', '두 번째 뉴스'])
+
+
+class TestSearch(SiteTestCase):
+    def setUp(self):
+        self.client = Client()
+        # 색인은 커밋된 뒤에 반영된다.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_001 = Post.objects.create(title='금리 인상', content='한국은행이 기준금리를 올렸습니다.', author=self.user_trump)
+            self.post_002 = Post.objects.create(title='주식 시장', content='금리가 오르자 주식 시장이 흔들렸다.', author=self.user_trump)
+            self.post_003 = Post.objects.create(title='여행 후기', content='제주도 여행을 다녀왔습니다.', author=self.user_trump)
+
+    def test_ranked_and_incremental(self):
+        hits = search.search('금리', kinds=('post',))
+        self.assertEqual([object_id for _, object_id, _ in hits], [self.post_001.pk, self.post_002.pk])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post_003.content = '여행 중에도 금리 뉴스를 봤다.'
+            self.post_003.save()
+        # 저장하는 트랜잭션 안에서는 형태소 분석과 색인 쓰기를 하지 않는다.
+        self.assertEqual(len(search.search('금리', kinds=('post',))), 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(search.search('금리', kinds=('post',))), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_001.delete()
+        hits = search.search('금리', kinds=('post',))
+        self.assertNotIn(self.post_001.pk, [object_id for _, object_id, _ in hits])
+
+    def test_search_view_paginated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(6):
+                Post.objects.create(title=f'금리 포스트 {i}', content='금리 이야기', author=self.user_trump)
+
+        response = self.client.get('/blog/search/금리/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_paginated'])
+        self.assertEqual(len(response.context['post_list']), 5)
+        self.assertContains(response, 'id="post-', count=5)
+        self.assertNotContains(response, self.post_003.title)
+
+        response = self.client.get('/blog/search/금리/', {'page': 2})
+        self.assertEqual(len(response.context['post_list']), 3)
+
+    def test_title_fallback_when_no_term_matches(self):
+        apple = Post.objects.create(title='Apple 실적 발표', content='아이폰 판매가 늘었다.', author=self.user_trump)
+        self.assertEqual(search.search('App'), [])
+
+        response = self.client.get('/blog/search/App/')
+        self.assertEqual(list(response.context['post_list']), [apple])
+
+    def test_search_limit(self):
+        hits = search.search('금리', kinds=('post',), limit=1)
+        self.assertEqual([object_id for _, object_id, _ in hits], [self.post_001.pk])
+
+    def test_rebuild_search_index(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(search.search('제주도'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('post: 3', out.getvalue())
+        self.assertEqual(search.search('제주도')[0][:2], ('post', self.post_003.pk))
+
+
+class FakeImages:
+    def __init__(self, fail_prompts=()):
+        self.prompts = []
+        self.fail_prompts = fail_prompts
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if any(p in prompt for p in self.fail_prompts):
+            raise BadRequestError('rejected', response=httpx.Response(400, request=httpx.Request('POST', 'http://test')), body=None)
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64)).save(buffer, format='PNG')
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(buffer.getvalue()).decode())])
+
+
+class TestImageJobs(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.fake_client = SimpleNamespace(images=FakeImages(fail_prompts=['금지된']))
+
+    def run_jobs(self, callbacks):
+        # 워커 스레드 대신 커밋 콜백으로 넘어온 작업을 그 자리에서 실행
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch.object(image_jobs, 'get_client', return_value=self.fake_client), \
+                mock.patch.object(image_jobs, '_get_executor', return_value=SimpleNamespace(submit=lambda fn, pk: fn(pk))):
+            for callback in callbacks:
+                callback()
+
+    def test_job_lifecycle(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/blog/generate_image/', {'txt_response': '  시장   풍경 '}, content_type='application/json')
+            duplicate = self.client.post('/blog/generate_image/', {'txt_response': '시장 풍경'}, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(duplicate.json()['job_id'], job_id)
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertEqual(self.client.get(f'/blog/generate_image/{job_id}/').json()['status'], 'pending')
+        self.run_jobs(callbacks)
+
+        data = self.client.get(f'/blog/generate_image/{job_id}/').json()
+        self.assertEqual(data['status'], 'done')
+        self.assertTrue(data['file_url'].endswith(f"/media/generated_images/{data['filename']}"))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, 'generated_images', data['filename'])))
+        self.assertEqual(len(self.fake_client.images.prompts), 1)
+
+    def test_fallback_prompt(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = image_jobs.submit('금지된 그림')
+        self.run_jobs(callbacks)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertIn(image_jobs.IMAGE_JOB_FALLBACK_PROMPT, self.fake_client.images.prompts[-1])
+
+    def test_client_error_marks_job_failed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = image_jobs.submit('시장 풍경')
+        with mock.patch.object(image_jobs, 'get_client', side_effect=RuntimeError('OPENAI_KEY가 없습니다')), \
+                mock.patch.object(image_jobs, '_get_executor', return_value=SimpleNamespace(submit=lambda fn, pk: fn(pk))):
+            for callback in callbacks:
+                callback()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.error, 'OPENAI_KEY가 없습니다')
+
+    def test_stale_running_job_is_requeued(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = image_jobs.submit('시장 풍경')
+        # 워커가 작업을 가져간 뒤 프로세스가 죽은 상황
+        long_ago = job.updated_at - timedelta(seconds=image_jobs.IMAGE_JOB_STALE_TIMEOUT + 1)
+        ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.RUNNING, updated_at=long_ago)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            again = image_jobs.submit('시장 풍경')
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(len(callbacks), 1)
+        self.run_jobs(callbacks)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+
+        # 아직 시간이 지나지 않은 RUNNING 작업은 그대로 돌려준다.
+        running = ImageJob.objects.create(prompt='바쁜 시장', prompt_hash=image_jobs.prompt_hash('바쁜 시장'),
+                                          status=ImageJob.RUNNING)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(image_jobs.submit('바쁜 시장').pk, running.pk)
+        self.assertEqual(callbacks, [])
+
+    def test_startup_requeues_stale_jobs(self):
+        stale = ImageJob.objects.create(prompt='멈춘 작업', prompt_hash='a' * 64, status=ImageJob.RUNNING)
+        ImageJob.objects.filter(pk=stale.pk).update(updated_at=stale.updated_at - timedelta(days=1))
+        running = ImageJob.objects.create(prompt='진행 중', prompt_hash='b' * 64, status=ImageJob.RUNNING)
+        pending = ImageJob.objects.create(prompt='대기', prompt_hash='c' * 64)
+
+        executor = mock.Mock()
+        with mock.patch.object(image_jobs, '_executor', None), \
+                mock.patch.object(image_jobs, 'ThreadPoolExecutor', return_value=executor):
+            image_jobs._get_executor()
+        self.assertEqual(sorted(call.args[1] for call in executor.submit.call_args_list), [stale.pk, pending.pk])
+        running.refresh_from_db()
+        self.assertEqual(running.status, ImageJob.RUNNING)
+
+class TestImageCache(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.fake_client = SimpleNamespace(images=FakeImages())
+
+    def test_repeat_prompt_hits_cache(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            before = image_cache.stats()
+            filename = save_gen_img(self.fake_client, '시장 풍경')
+            self.assertEqual(save_gen_img(self.fake_client, ' 시장  풍경'), filename)
+            stats = image_cache.stats()
+        self.assertEqual(len(self.fake_client.images.prompts), 1)
+        # hits / misses는 프로세스 누적값이므로 차이로 본다.
+        self.assertEqual((stats['hits'] - before['hits'], stats['misses'] - before['misses'], stats['entries']),
+                         (1, 1, 1))
+
+    def test_lru_eviction(self):
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch.object(image_cache, 'IMAGE_CACHE_MAX_BYTES', 25):
+            image_cache.put('a', b'a' * 10)
+            image_cache.put('b', b'b' * 10)
+            self.assertIsNotNone(image_cache.get('a'))
+            image_cache.put('c', b'c' * 10)
+
+            self.assertIsNotNone(image_cache.get('a'))
+            self.assertIsNone(image_cache.get('b'))
+            self.assertEqual(image_cache.stats()['entries'], 2)
+            # 같은 이미지를 가리키는 프롬프트는 크기를 한 번만 센다.
+            image_cache.put('d', b'c' * 10)
+            self.assertEqual((image_cache.stats()['entries'], image_cache.stats()['bytes']), (3, 20))
+            # 색인은 DB에 있으므로 공개 폴더에는 이미지 파일만 남는다.
+            self.assertEqual(len(os.listdir(image_cache.cache_dir())), 2)  # a, c
+            self.assertIsNone(image_cache.path('index.json'))
+
+
+class TestImageDerivatives(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.user_trump = User.objects.create_user(username='trump', password='somepassword')
+
+    def test_lazy_derivative(self):
+        buffer = BytesIO()
+        Image.new('RGBA', (1200, 600)).save(buffer, format='PNG')
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch.object(image_derivatives, 'warm'):
+            post_001 = Post.objects.create(
+                title='첫 번째 포스트', content='첫 번째 포스트입니다.', author=self.user_trump,
+                head_image=SimpleUploadedFile('head.png', buffer.getvalue(), content_type='image/png'),
+            )
+            name = post_001.head_image.name
+
+            srcset = image_derivatives.srcset(post_001.head_image, 'webp')
+            self.assertIn(f'/blog/derivative/640/webp/{name} 640w', srcset)
+            # 아직 없는 파생 이미지도 잠시 캐시하므로 다시 그릴 때 저장소에 묻지 않는다.
+            with mock.patch.object(image_derivatives.default_storage, 'exists') as exists:
+                self.assertEqual(image_derivatives.srcset(post_001.head_image, 'webp'), srcset)
+            self.assertFalse(exists.called)
+
+            response = self.client.get(f'/blog/derivative/640/webp/{name}')
+            target = image_derivatives.derivative_name(name, 640, 'webp')
+            self.assertRedirects(response, f'/media/{target}', fetch_redirect_response=False)
+            with Image.open(os.path.join(self.media_root, target)) as img:
+                self.assertEqual((img.format, img.size), ('WEBP', (640, 320)))
+
+            self.assertIn(f'/media/{target} 640w', image_derivatives.srcset(post_001.head_image, 'webp'))
+            self.assertEqual(self.client.get(f'/blog/derivative/500/webp/{name}').status_code, 404)
+
+            # 있는 파생 이미지는 캐시해 두므로 다시 그릴 때 저장소에 묻지 않는다.
+            image_derivatives.ensure(name, 320, 'webp')
+            image_derivatives.ensure(name, 960, 'webp')
+            with mock.patch.object(image_derivatives.default_storage, 'exists') as exists:
+                image_derivatives.srcset(post_001.head_image, 'webp')
+            self.assertFalse(exists.called)
+
+    def test_small_source_not_upscaled(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            name = 'blog/images/small.png'
+            os.makedirs(os.path.join(self.media_root, 'blog/images'))
+            Image.new('RGB', (400, 200)).save(os.path.join(self.media_root, name))
+
+            # 원본보다 넓은 크기는 실제로 그려지는 원본 크기 하나로 합친다.
+            srcset = image_derivatives.srcset(SimpleNamespace(name=name), 'jpeg')
+            self.assertEqual([entry.split()[1] for entry in srcset.split(', ')], ['320w', '400w'])
+            self.assertIn(f'/blog/derivative/640/jpeg/{name} 400w', srcset)
+
+            # 다른 워커가 먼저 저장했으면 저장소가 붙인 새 이름의 사본을 남기지 않는다.
+            target = image_derivatives.derivative_name(name, 640, 'jpeg')
+            duplicate = target.replace('_640w.', '_640w_AbCdEf1.')
+            default_storage.save(duplicate, ContentFile(b'copy'))
+            with mock.patch.object(image_derivatives.default_storage, 'save', return_value=duplicate):
+                self.assertEqual(image_derivatives._render(name, 640, 'jpeg'), target)
+            self.assertFalse(default_storage.exists(duplicate))
+
+    def test_invalid_sources(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            default_storage.save('generated_images/index.json', ContentFile(b'{}'))
+            default_storage.save('blog/images/broken.png', ContentFile(b'not an image'))
+            self.assertEqual(self.client.get('/blog/derivative/320/webp/generated_images/index.json').status_code, 404)
+            self.assertEqual(self.client.get('/blog/derivative/320/webp/blog/images/broken.png').status_code, 404)
+
+            Image.new('RGB', (400, 200)).save(os.path.join(self.media_root, 'blog/images/slow.png'))
+            with mock.patch.object(image_derivatives, 'ensure', side_effect=TimeoutError):
+                response = self.client.get('/blog/derivative/320/webp/blog/images/slow.png')
+            self.assertEqual(response.status_code, 503)
+
+
+class TestGeneratedHeadImage(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.user_obama = User.objects.create_user(username='obama', password='somepassword', is_staff=True)
+
+    def test_generated_image_attached_without_download(self):
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch.object(image_derivatives, 'warm'):
+            filename = save_gen_img(SimpleNamespace(images=FakeImages()), '시장 풍경')
+            with open(image_cache.path(filename), 'rb') as f, Image.open(f) as img:
+                self.assertEqual(img.size, (64, 32))
+
+            self.client.login(username='obama', password='somepassword')
+            self.client.post('/blog/create_post/', {
+                'title': '생성 이미지 포스트',
+                'content': '생성 이미지 포스트입니다.',
+                'generated_image_url': f'http://testserver/media/generated_images/{filename}',
+            })
+            post = Post.objects.get(title='생성 이미지 포스트')
+            with post.head_image.open('rb') as f:
+                self.assertEqual(hashlib.sha256(f.read()).hexdigest() + '.png', filename)
+            self.assertIsNone(image_cache.path('../' + filename))
+
+
+class TestTags(TestCase):
+    def setUp(self):
+        self.user_trump = User.objects.create_user(username='trump', password='somepassword')
+        self.post_001 = Post.objects.create(title='첫 번째 포스트', content='첫 번째 포스트입니다.', author=self.user_trump)
+        Tag.objects.create(name='파이썬', slug='파이썬')
+        Tag.objects.create(name='Python!', slug='python')
+
+    def test_parse_tag_names(self):
+        self.assertEqual(tags.parse_tag_names(' 파이썬; 장고, 파이썬 ;; '), ['파이썬', '장고'])
+
+    def test_add_tags_in_bulk(self):
+        names = '; '.join(['파이썬', 'python'] + [f'태그{i}' for i in range(10)])
+        # 조회 2 + 태그 INSERT 1 + M2M 2 (m2m_changed 수신기가 있으면 기존 연결을 먼저 조회) + 태그 집계 2
+        with self.assertNumQueries(7):
+            added = tags.add_tags(self.post_001, names)
+        self.assertEqual(len(added), 12)
+        self.assertEqual(self.post_001.tags.count(), 12)
+        self.assertEqual(Tag.objects.get(name='python').slug, 'python-1')
+
+    def test_word_tag_model_from_field(self):
+        news_001 = News.objects.create(title='첫 번째 뉴스', content='첫 번째 뉴스입니다.', author=self.user_trump)
+        tags.add_tags(news_001, '경제; 금리')
+        self.assertEqual(sorted(news_001.tags.values_list('name', flat=True)), ['경제', '금리'])
+        self.assertEqual(Word_Tag.objects.count(), 2)
+
+    def test_empty_slug_and_prefix_lookup(self):
+        Tag.objects.create(name='파이썬웹', slug='파이썬웹')
+        with CaptureQueriesContext(connection) as queries:
+            added = tags.add_tags(self.post_001, '파이썬!; ???; !!!')
+        self.assertEqual([tag.slug for tag in added[1:]], ['tag', 'tag-1'])
+        # '파이썬'으로 시작하는 다른 슬러그(파이썬웹)는 후보 조회에 걸리지 않는다.
+        lookup = next(q['sql'] for q in queries if 'LIKE' in q['sql'])
+        self.assertNotIn("LIKE '%'", lookup)
+        self.assertEqual(Tag.objects.get(name='파이썬!').slug, '파이썬-1')
+
+    def test_new_tags_invalidate_tag_pages(self):
+        # bulk_create는 post_save를 보내지 않으므로 새 태그가 생기면 'tag' 그룹을 직접 올린다.
+        with mock.patch.object(tags, 'page_cache') as page_cache_mock:
+            tags.add_tags(self.post_001, '파이썬')
+            page_cache_mock.bump.assert_not_called()
+            tags.add_tags(self.post_001, '새 태그')
+        page_cache_mock.bump.assert_called_once_with('tag')
+
+
+class TestQueryBudget(SiteTestCase):
+    # 페이지당 쿼리 수는 보여 주는 행 수와 관계없이 고정되어야 한다.
+    def setUp(self):
+        self.client = Client()
+        self.user_obama = User.objects.create_user(username='obama', password='somepassword')
+        self.post_001 = self.create_post(0)
+        self.word_001 = self.create_word(0)
+        cache.clear()
+        view_counter.flush()
+        # PostDetail이 남긴 조회수를 테스트 DB가 지워지기 전에 반영
+        self.addCleanup(view_counter.flush)
+
+    def create_post(self, i):
+        post = Post.objects.create(title=f'금리 포스트 {i}', content=f'금리 포스트 {i}입니다.', author=self.user_trump)
+        tags.add_tags(post, f'금리; 태그{i}')
+        # 검색 색인은 커밋 때 반영되므로 검색 페이지가 실제 결과를 그리도록 바로 반영한다.
+        search.flush()
+        for j in range(3):
+            Comment.objects.create(post=self.post_001 if i else post, author=self.user_obama, content=f'댓글 {i}-{j}')
+        return post
+
+    def create_word(self, i):
+        word = Word.objects.create(title=f'금리 단어 {i}', content=f'금리 단어 {i}입니다.', author=self.user_trump)
+        tags.add_tags(word, f'금리; 태그{i}')
+        search.flush()
+        return word
+
+    def assertQueryBudget(self, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), budget, '\n'.join(q['sql'] for q in queries.captured_queries))
+        return len(queries)
+
+    def test_budget_independent_of_rows(self):
+        pages = {
+            '/blog/': 7,
+            f'/blog/{self.post_001.pk}/': 6,
+            '/blog/search/금리/': 7,
+            '/today_word/': 6,
+            f'/today_word/{self.word_001.pk}/': 6,
+            '/today_word/search/금리/': 7,
+        }
+        few = {url: self.assertQueryBudget(url, budget) for url, budget in pages.items()}
+
+        for i in range(1, 8):
+            self.create_post(i)
+            self.create_word(i)
+        cache.clear()
+        view_counter.flush()
+
+        many = {url: self.assertQueryBudget(url, budget) for url, budget in pages.items()}
+        self.assertEqual(few, many)
+
+
+class TestCursorPagination(SiteTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.posts = [
+            Post.objects.create(title=f'포스트 {i}', content=f'포스트 {i}입니다.', author=self.user_trump)
+            for i in range(12)
+        ]
+        cache.clear()
+
+    def page_pks(self, params=None):
+        response = self.client.get('/blog/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return [p.pk for p in response.context['post_list']], response.context['page_obj']
+
+    def test_next_and_previous(self):
+        pks = [p.pk for p in reversed(self.posts)]
+
+        first, page = self.page_pks()
+        self.assertEqual(first, pks[:5])
+        self.assertFalse(page.has_previous())
+
+        second, page = self.page_pks({'after': page.next_cursor})
+        self.assertEqual(second, pks[5:10])
+        self.assertTrue(page.has_previous())
+
+        third, page = self.page_pks({'after': page.next_cursor})
+        self.assertEqual(third, pks[10:])
+        self.assertFalse(page.has_next())
+
+        back, page = self.page_pks({'before': page.previous_cursor})
+        self.assertEqual(back, second)
+
+        oldest, page = self.page_pks({'before': 0})
+        self.assertEqual(oldest, pks[-5:])
+        self.assertFalse(page.has_next())
+
+        self.assertEqual(self.client.get('/blog/', {'after': 'x'}).status_code, 404)
+        # SQLite 정수 범위를 벗어난 커서는 OverflowError(500) 대신 404
+        self.assertEqual(self.client.get('/blog/', {'after': 10 ** 20}).status_code, 404)
+        self.assertEqual(self.client.get('/blog/', {'before': -10 ** 20}).status_code, 404)
+        self.assertEqual(self.client.get('/blog/', {'after': 2 ** 63 - 1}).status_code, 200)
+
+    @mock.patch.object(page_cache, 'PAGE_CACHE_ENABLED', False)
+    def test_constant_queries_at_depth(self):
+        self.client.get('/blog/')
+        with CaptureQueriesContext(connection) as first:
+            self.client.get('/blog/')
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get('/blog/', {'after': self.posts[6].pk})
+        self.assertFalse(any('COUNT' in q['sql'] or 'OFFSET' in q['sql'] for q in deep.captured_queries))
+        self.assertLessEqual(len(deep), len(first) + 1)
+
+
+class TestCommentThread(SiteTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.post_001 = Post.objects.create(title='첫 번째 포스트', content='첫 번째 포스트입니다.', author=self.user_trump)
+        self.comments = Comment.objects.bulk_create([
+            Comment(post=self.post_001, author=self.user_trump, content=f'댓글 {i}')
+            for i in range(COMMENTS_PAGE_SIZE + 5)
+        ])
+        self.addCleanup(view_counter.flush)
+
+    def test_first_page_and_more(self):
+        self.client.login(username='trump', password='somepassword')
+        response = self.client.get(self.post_001.get_absolute_url())
+        self.assertEqual(len(response.context['comments']), COMMENTS_PAGE_SIZE)
+        self.assertContains(response, 'id="deleteCommentModal"', count=1)
+        last_pk = response.context['comments'][-1].pk
+        self.assertContains(response, f'/blog/{self.post_001.pk}/comments/?after={last_pk}')
+
+        response = self.client.get(f'/blog/{self.post_001.pk}/comments/', {'after': last_pk})
+        self.assertContains(response, 'class="media mb-4"', count=5)
+        self.assertNotContains(response, 'comment-more')
+
+        response = self.client.get(f'/blog/{self.post_001.pk}/comments/', {'after': 10 ** 20})
+        self.assertEqual(response.status_code, 404)
+
+    def test_ajax_new_and_delete(self):
+        self.client.login(username='trump', password='somepassword')
+        response = self.client.post(
+            f'/blog/{self.post_001.pk}/new_comment/', {'content': '새 댓글'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 201)
+        comment = Comment.objects.latest('pk')
+        self.assertContains(response, f'id="comment-{comment.pk}"', status_code=201)
+        self.assertNotContains(response, '<html', status_code=201)
+
+        response = self.client.post(f'/blog/delete_comment/{comment.pk}/', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Comment.objects.filter(pk=comment.pk).exists())
+
+        response = self.client.post(f'/blog/{self.post_001.pk}/new_comment/', {'content': '일반 댓글'})
+        self.assertEqual(response.status_code, 302)
+
+
+class TestPageCache(SiteTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.post_001 = Post.objects.create(title='첫 번째 포스트', content='첫 번째 포스트입니다.', author=self.user_trump)
+        self.post_002 = Post.objects.create(title='두 번째 포스트', content='두 번째 포스트입니다.', author=self.user_trump)
+        cache.clear()
+        view_counter.flush()
+        self.addCleanup(view_counter.flush)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_hit_and_invalidation(self):
+        url_001 = self.post_001.get_absolute_url()
+        self.assertNotIn('X-Page-Cache', self.get('/blog/'))
+        self.assertNotIn('X-Page-Cache', self.get(url_001))
+        self.get(self.post_002.get_absolute_url())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/blog/')['X-Page-Cache'], 'hit')
+        self.assertEqual(self.post_001.total_view_count, 1)
+        self.assertEqual(self.get(url_001)['X-Page-Cache'], 'hit')
+        self.assertEqual(self.post_001.total_view_count, 2)
+
+        # 댓글은 해당 글 상세 페이지만, 글 수정은 목록과 해당 글만 무효화
+        Comment.objects.create(post=self.post_001, author=self.user_trump, content='새 댓글')
+        self.assertContains(self.get(url_001), '새 댓글')
+        self.assertEqual(self.get('/blog/')['X-Page-Cache'], 'hit')
+
+        # 새 태그는 모든 페이지의 태그 구름에 보이므로 다른 글 상세 페이지도 무효화
+        tags.add_tags(self.post_002, '새태그')
+        self.assertContains(self.get('/blog/'), '새태그')
+        response = self.get(url_001)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, '새태그')
+
+    def test_stale_while_revalidate(self):
+        self.get('/blog/')
+        self.post_001.content = '수정된 포스트입니다.'
+        self.post_001.save()
+
+        # 다른 요청이 다시 그리는 중이면 이전 응답을 받는다.
+        key = page_cache._page_key(RequestFactory().get('/blog/'))
+        cache.add(f'{key}:lock', 1)
+        self.assertNotContains(self.get('/blog/'), '수정된 포스트')
+        cache.delete(f'{key}:lock')
+        self.assertContains(self.get('/blog/'), '수정된 포스트')
+        self.assertEqual(self.get('/blog/')['X-Page-Cache'], 'hit')
+
+    def test_hit_keeps_view_headers(self):
+        @page_cache.cached_page()
+        def view(request):
+            response = HttpResponse('본문', content_type='text/plain; charset=utf-8')
+            response['Vary'] = 'Accept-Language'
+            response['Content-Language'] = 'ko'
+            response.set_cookie('visited', '1')
+            return response
+
+        request = RequestFactory().get('/headers/')
+        request.user = AnonymousUser()
+        miss = view(request)
+        hit = view(request)
+        self.assertEqual(hit['X-Page-Cache'], 'hit')
+        for header in ('Content-Type', 'Vary', 'Content-Language'):
+            self.assertEqual(hit[header], miss[header])
+        self.assertNotIn('visited', hit.cookies)
+
+    def test_logged_in_not_cached(self):
+        self.get('/blog/')
+        self.client.login(username='trump', password='somepassword')
+        self.assertNotIn('X-Page-Cache', self.get('/blog/'))
+
+
+class TestLoadWords(TestCase):
+    def setUp(self):
+        self.tmp = use_temp_semantic_index(self)
+        self.path = os.path.join(self.tmp, 'words.csv')
+        self.write_csv([
+            ('기준금리', '중앙은행이 정하는 **정책금리**', '금리, 통화정책'),
+            ('통화정책 운영체제(monetary policy regime)', '통화정책을 운영하는 틀', '통화정책'),
+            ('환율', '두 나라 통화의 교환 비율', ''),
+        ])
+
+    def write_csv(self, rows):
+        with open(self.path, 'w', encoding='utf-8-sig', newline='') as f:
+            f.write('title,content,related_keyword\n')
+            for row in rows:
+                f.write(','.join(f'"{value}"' for value in row) + '\n')
+
+    def test_load_and_reload(self):
+        out = StringIO()
+        call_command('load_words', self.path, '--batch-size', '2', stdout=out)
+        self.assertIn('추가 3건', out.getvalue())
+        self.assertEqual(Word.objects.count(), 3)
+        word = Word.objects.get(title='기준금리')
+        self.assertEqual(sorted(word.tags.values_list('name', flat=True)), ['금리', '통화정책'])
+        self.assertIn('<strong>정책금리</strong>', word.content_html)
+        self.assertEqual(Word_Tag.objects.count(), 2)
+        self.assertEqual([hit[1] for hit in search.search('환율', kinds=('word',))],
+                         [Word.objects.get(title='환율').pk])
+        # bulk_create는 시그널이 없으므로 의미 검색 색인과 관련 용어도 명령이 직접 반영한다.
+        self.assertEqual(semantic._load('word').ntotal, 3)
+        self.assertIn('통화정책 운영체제(monetary policy regime)',
+                      WordNeighbor.objects.filter(word=word).values_list('neighbor__title', flat=True))
+
+        # 같은 제목은 갱신하고 태그는 없는 것만 추가
+        self.write_csv([
+            ('기준금리', '한국은행이 정하는 정책금리', '금리, 한국은행'),
+            ('환율', '두 나라 통화의 교환 비율', ''),
+        ])
+        out = StringIO()
+        with mock.patch.object(related_words, 'update_words', wraps=related_words.update_words) as update_words:
+            call_command('load_words', self.path, stdout=out)
+        self.assertIn('추가 0건, 갱신 1건', out.getvalue())
+        update_words.assert_called_once_with([word.pk])
+        self.assertEqual(Word.objects.count(), 3)
+        word = Word.objects.get(title='기준금리')
+        self.assertIn('한국은행', word.content_html)
+        self.assertEqual(sorted(word.tags.values_list('name', flat=True)), ['금리', '통화정책', '한국은행'])
+        self.assertEqual(Word.tags.through.objects.count(), 4)
+
+
+class TestSemanticIndex(SiteTestCase):
+    def setUp(self):
+        cache.clear()
+        self.index_dir = use_temp_semantic_index(self)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rate = Post.objects.create(title='기준금리 인상', content='한국은행이 기준금리를 올려 대출 금리가 상승했다.', author=self.user_trump)
+            self.loan = Post.objects.create(title='대출 금리', content='은행 대출 금리 상승으로 가계 이자 부담이 커졌다.', author=self.user_trump)
+            self.food = Post.objects.create(title='김치찌개 요리법', content='돼지고기와 김치를 볶은 뒤 물을 붓고 끓인다.', author=self.user_trump)
+
+    def test_hashing_embed_normalized(self):
+        vectors = semantic.hashing_embed(['기준금리 인상', ''])
+        self.assertEqual(vectors.shape, (2, semantic.SEMANTIC_HASH_DIM))
+        self.assertAlmostEqual(float((vectors[0] ** 2).sum()), 1.0, places=5)
+        self.assertEqual(float(abs(vectors[1]).sum()), 0.0)
+
+    def test_incremental_update(self):
+        # 저장은 변경 로그에만 덧붙이고 스냅샷은 쓰지 않는다.
+        self.assertTrue(os.path.exists(os.path.join(self.index_dir, 'post.0.log')))
+        self.assertFalse(os.path.exists(os.path.join(self.index_dir, 'post.1.faiss')))
+        self.assertEqual(semantic.similar('post', self.rate.pk, k=1)[0][0], self.loan.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.loan.delete()
+        self.assertNotIn(self.loan.pk, [pk for pk, _ in semantic.similar('post', self.rate.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.content = '기준금리 인상에 따른 대출 금리 전망'
+            self.food.save()
+        self.assertEqual(semantic.similar('post', self.rate.pk, k=1)[0][0], self.food.pk)
+
+    def test_update_does_not_rewrite_index(self):
+        import faiss
+
+        with mock.patch.object(faiss, 'read_index') as read_index, \
+             mock.patch.object(faiss, 'write_index') as write_index:
+            semantic.remove('post', self.food.pk)
+        read_index.assert_not_called()
+        write_index.assert_not_called()
+        self.assertEqual(semantic._load('post').ntotal, 2)
+
+    def test_other_workers_see_log_and_snapshots(self):
+        key = (self.index_dir, 'post')
+        state = semantic._states[key]
+        stale = semantic._State(state.base, state.generation)
+        with open(os.path.join(self.index_dir, f'post.{state.generation}.log'), 'rb') as f:
+            stale.offset = semantic._replay(stale, f.read())
+        semantic.remove('post', self.food.pk)
+        # 다른 워커: 앞선 삭제를 모르는 인덱스에서 이어서 쓴다.
+        semantic._states[key] = stale
+        semantic.remove('post', self.loan.pk)
+        self.assertEqual(semantic._load('post').ntotal, 1)
+
+        # 로그가 커지면 스냅샷을 새로 쓰고, 새로 뜬 프로세스는 스냅샷 + 로그로 같은 상태를 만든다.
+        with mock.patch.object(semantic, 'SEMANTIC_LOG_MAX_BYTES', 0):
+            semantic.update(self.food)
+        self.assertEqual(semantic._read_version('post'), 1)
+        self.assertEqual(sorted(os.listdir(self.index_dir)), ['post.1.faiss', 'post.1.log', 'post.lock', 'post.version'])
+        # 스냅샷은 매핑한 채 두고 그 뒤의 변경은 overlay와 hidden으로만 반영한다.
+        self.assertIsNone(semantic._states[key].overlay)
+        semantic.remove('post', self.food.pk)
+        self.assertEqual(semantic._states[key].hidden, {self.food.pk})
+        semantic._states.clear()
+        self.assertEqual(semantic._load('post').ntotal, 1)
+        self.assertEqual(semantic.similar('post', self.food.pk), [])
+        with mock.patch.object(semantic, 'SEMANTIC_LOG_MAX_BYTES', 0):
+            semantic.update(self.food)
+        self.assertEqual(semantic._load('post').ntotal, 2)
+        self.assertIsNotNone(semantic._load('post').reconstruct(self.food.pk))
+
+    def test_rebuild_command(self):
+        shutil.rmtree(self.index_dir)
+        out = StringIO()
+        call_command('rebuild_semantic_index', '--model', 'post', '--batch-size', '2', stdout=out)
+        self.assertIn('post: 3건 임베딩', out.getvalue())
+        hits = [pk for pk, _ in semantic.semantic_search('금리 상승', 'post')]
+        self.assertEqual(set(hits[:2]), {self.rate.pk, self.loan.pk})
+
+    def test_views(self):
+        self.addCleanup(view_counter.flush)
+
+        response = self.client.get(self.rate.get_absolute_url())
+        self.assertContains(response, '비슷한 글')
+        self.assertContains(response, f'href="{self.loan.get_absolute_url()}"')
+
+        response = self.client.get('/blog/semantic_search/금리 상승/')
+        self.assertContains(response, f'id="post-{self.loan.pk}"')
+        self.assertNotContains(response, f'id="post-{self.food.pk}"')
+        self.assertContains(response, '키워드 검색')
+
+
+class TestTagStats(SiteTestCase):
+    def setUp(self):
+        cache.clear()
+        self.posts = [
+            Post.objects.create(title=f'포스트 {i}', content=f'포스트 {i}입니다.', author=self.user_trump)
+            for i in range(3)
+        ]
+        for post in self.posts:
+            tags.add_tags(post, '금리')
+        tags.add_tags(self.posts[0], '환율; 물가')
+        self.rate = Tag.objects.get(name='금리')
+        self.fx = Tag.objects.get(name='환율')
+
+    def counts(self, kind='post'):
+        return dict(TagStat.objects.filter(kind=kind).values_list('tag_id', 'count'))
+
+    def test_counts_follow_m2m_changes(self):
+        self.assertEqual(self.counts()[self.rate.pk], 3)
+        self.assertIsNotNone(TagStat.objects.get(kind='post', tag_id=self.rate.pk).last_used_at)
+
+        # 이미 연결된 태그를 다시 넣거나 연결되지 않은 태그를 빼도 그대로
+        self.posts[1].tags.add(self.rate)
+        self.posts[1].tags.remove(self.fx)
+        self.assertEqual(self.counts()[self.rate.pk], 3)
+        self.assertEqual(self.counts()[self.fx.pk], 1)
+
+        self.posts[0].tags.clear()
+        self.assertEqual(self.counts()[self.rate.pk], 2)
+        self.assertEqual(self.counts()[self.fx.pk], 0)
+
+        self.fx.post_set.add(*self.posts)
+        self.rate.post_set.remove(self.posts[1])
+        self.posts[2].delete()
+        self.assertEqual(self.counts()[self.fx.pk], 2)
+        self.assertEqual(self.counts()[self.rate.pk], 0)
+
+        before = self.counts()
+        self.assertEqual(tag_stats.rebuild('post'), 1)
+        self.assertEqual({pk: n for pk, n in before.items() if n}, self.counts())
+
+        self.fx.delete()
+        self.assertNotIn(self.fx.pk, self.counts())
+
+    def test_word_tags_counted_per_kind(self):
+        word = Word.objects.create(title='기준금리', content='정책금리')
+        news = News.objects.create(title='금리 뉴스', content='금리 인상', author=self.user_trump)
+        tags.add_tags(word, '통화정책')
+        tags.add_tags(news, '통화정책')
+        tag = Word_Tag.objects.get(name='통화정책')
+        self.assertEqual(self.counts('word'), {tag.pk: 1})
+        self.assertEqual(self.counts('news'), {tag.pk: 1})
+
+    def test_cloud(self):
+        cloud = tag_stats.cloud('post')
+        self.assertEqual([tag['name'] for tag in cloud], ['금리', '물가', '환율'])
+        self.assertEqual({tag['name']: tag['weight'] for tag in cloud}, {'금리': 5, '물가': 1, '환율': 1})
+        with self.assertNumQueries(0):
+            tag_stats.cloud('post')
+
+        tags.add_tags(self.posts[1], '환율')
+        self.assertEqual({tag['name']: tag['count'] for tag in tag_stats.cloud('post')}['환율'], 2)
+        self.assertContains(self.client.get('/blog/'), 'id="tag-cloud"')
+
+    def test_cloud_refreshes_cached_pages(self):
+        self.addCleanup(view_counter.flush)
+        url = self.posts[2].get_absolute_url()
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+        # 다른 글에서 기존 태그를 붙여도 사용 횟수가 바뀌므로 이 글 페이지의 태그 구름도 새로 그린다.
+        self.posts[1].tags.add(self.fx)
+        response = self.client.get(url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual({tag['name']: tag['count'] for tag in response.context['tags']}['환율'], 2)
+
+    def test_tag_archive(self):
+        response = self.client.get(self.fx.get_absolute_url())
+        self.assertContains(response, f'id="post-{self.posts[0].pk}"')
+        self.assertNotContains(response, f'id="post-{self.posts[1].pk}"')
+        self.assertEqual(response.context['total_count'], 1)
+        self.assertEqual(self.client.get('/blog/tag/없는-태그/').status_code, 404)
+
+        word = Word.objects.create(title='기준금리', content='정책금리')
+        tags.add_tags(word, '통화정책')
+        response = self.client.get(Word_Tag.objects.get(name='통화정책').get_absolute_url())
+        self.assertContains(response, '기준금리')
+
+
+class TestBenchmarkQueries(TestCase):
+    def test_compares_plans_and_rolls_back(self):
+        # 같은 이름의 실제 사용자 / 태그가 있어도 겹치지 않는다.
+        User.objects.create_user(username='benchmark-queries')
+        Tag.objects.create(name='bench-1', slug='bench-1')
+        out = StringIO()
+        call_command('benchmark_queries', '--rows', '30', '--repeat', '1', stdout=out)
+        output = out.getvalue()
+        self.assertIn('[before] word upsert', output)
+        self.assertIn('[after] word upsert', output)
+        self.assertIn('blog_word_title_idx', output.split('[after] word upsert')[1])
+        # 0003의 created_at 필드 인덱스도 before에서는 지운다.
+        today_before = output.split('[before] today news')[1].split('[after]')[0]
+        today_after = output.split('[after] today news')[1].split('== summary')[0]
+        self.assertNotIn('INDEX', today_before)
+        self.assertRegex(today_after, r'INDEX \S*created_at')
+        self.assertIn('== summary (ms) ==', output)
+        self.assertEqual(Post.objects.count(), 0)
+        self.assertFalse(User.objects.filter(username=benchmark_queries.BENCH_USERNAME).exists())
+
+
+@override_settings(ASYNC_READ_VIEWS=True)
+class TestAsyncReadViews(SiteTestCase):
+    def setUp(self):
+        async_reads.reload_urlconfs()
+        self.addCleanup(async_reads.reload_urlconfs)
+        self.client = AsyncClient()
+        self.post_001 = Post.objects.create(title='첫 번째 포스트', content='첫 번째 포스트입니다.', author=self.user_trump)
+        Comment.objects.create(post=self.post_001, author=self.user_trump, content='첫 번째 댓글')
+        self.word_001 = Word.objects.create(title='금리', content='돈의 가격', author=self.user_trump)
+        self.news_001 = News.objects.create(title='오늘의 뉴스', content='뉴스 본문', author=self.user_trump)
+        cache.clear()
+        view_counter.flush()
+        self.addCleanup(view_counter.flush)
+
+    def get(self, url, status=200):
+        response = async_to_sync(self.client.get)(url)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_async_views_are_routed(self):
+        match = resolve('/blog/')
+        self.assertTrue(iscoroutinefunction(match.func))
+        self.assertIs(match.func.view_class, AsyncPostList)
+
+    def test_pages(self):
+        self.assertContains(self.get('/'), '첫 번째 포스트')
+        self.assertContains(self.get('/'), '금리')
+        self.assertContains(self.get('/blog/'), '첫 번째 포스트')
+        response = self.get(self.post_001.get_absolute_url())
+        self.assertContains(response, '첫 번째 댓글')
+        self.assertContains(response, '오늘의 뉴스')
+        self.assertEqual(self.post_001.total_view_count, 1)
+        self.assertContains(self.get('/today_word/'), '금리')
+        self.assertContains(self.get(f'/today_word/{self.word_001.pk}/'), '돈의 가격')
+        self.assertContains(self.get('/news/'), '오늘의 뉴스')
+        self.assertContains(self.get(f'/news/{self.news_001.pk}/'), '뉴스 본문')
+
+    def test_news_list_not_loaded(self):
+        # 뉴스 목록 페이지는 달력 API를 쓰므로 async에서도 뉴스 전체를 읽지 않는다.
+        response = self.get('/news/')
+        self.assertIsNone(response.context['news_list']._result_cache)
+
+    def test_missing_object(self):
+        self.get('/blog/999/', status=404)
+        self.get('/today_word/999/', status=404)
+        self.assertEqual(view_counter.pending(999), 0)
+
+    def test_page_cache(self):
+        url = self.post_001.get_absolute_url()
+        self.assertNotIn('X-Page-Cache', self.get(url))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(url)['X-Page-Cache'], 'hit')
+        self.assertEqual(self.post_001.total_view_count, 2)
+
+    def test_same_html_as_sync_view(self):
+        async_html = self.get('/blog/').content
+        with override_settings(ASYNC_READ_VIEWS=False):
+            async_reads.reload_urlconfs()
+            cache.clear()
+            sync_html = Client().get('/blog/').content
+        self.assertEqual(self._strip_csrf(async_html), self._strip_csrf(sync_html))
+
+    def _strip_csrf(self, html):
+        return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b'', html)
+
+
+class TestPerf(SiteTestCase):
+    def setUp(self):
+        self.client = Client()
+        self.post_001 = Post.objects.create(title='첫 번째 포스트', content='**굵게**', author=self.user_trump)
+        cache.clear()
+        perf.metrics.clear()
+        view_counter.flush()
+        self.addCleanup(view_counter.flush)
+
+    def timings(self, response):
+        return {part.split(';')[0]: part for part in response['Server-Timing'].split(', ')}
+
+    def test_server_timing(self):
+        response = self.client.get(self.post_001.get_absolute_url())
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'markdown', 'template', 'total'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/blog/999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(f'desc="{len(queries)}"', self.timings(response)['db'])
+        self.assertNotIn('X-Perf-Budget', response)
+
+    def test_budget(self):
+        with mock.patch.object(perf, 'PERF_QUERY_BUDGET', 0), self.assertLogs('blog.perf', 'WARNING'):
+            response = self.client.get('/blog/')
+        self.assertEqual(response['X-Perf-Budget'], 'queries')
+
+    def test_openai_span(self):
+        client = mock.Mock()
+        client.images.generate.return_value.data = [SimpleNamespace(b64_json=base64.b64encode(self._png()).decode())]
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            save_gen_img(client, '금리 인상')
+        self.assertIn('blog_span_duration_ms_count{span="openai"} 1', perf.metrics.render())
+
+    def _png(self):
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_metrics(self):
+        self.client.get('/blog/')
+        self.client.get('/blog/')
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+
+        self.user_trump.is_staff = True
+        self.user_trump.save()
+        self.client.login(username='trump', password='somepassword')
+        body = self.client.get('/metrics/').content.decode()
+        self.assertIn('blog_route_duration_ms_count{route="/blog/"} 2', body)
+        self.assertIn('blog_route_duration_ms_bucket{route="/blog/",le="+Inf"} 2', body)
+        self.assertIn('blog_route_over_budget_total{route="/blog/"} 0', body)
+        self.assertIn('blog_span_duration_ms_count{span="template"}', body)
+        self.assertIn('# TYPE blog_image_cache_hits_total counter', body)
+        self.assertIn('blog_image_cache_evictions_total ', body)
+
+    def test_rolling_window(self):
+        histogram = perf.Histogram()
+        histogram.observe(7, queries=3, now=1000)
+        histogram.observe(700, queries=1, over_budget=True, now=1000 + perf.PERF_WINDOW - 1)
+        snapshot = histogram.snapshot(now=1000 + perf.PERF_WINDOW - 1)
+        self.assertEqual((snapshot['count'], snapshot['queries'], snapshot['over_budget']), (2, 4, 1))
+        self.assertEqual(snapshot['buckets'][1], 1)
+        self.assertEqual(histogram.snapshot(now=1000 + perf.PERF_WINDOW + perf.PERF_SLOT)['count'], 1)
+
+    def test_async_view(self):
+        with override_settings(ASYNC_READ_VIEWS=True):
+            async_reads.reload_urlconfs()
+            self.addCleanup(async_reads.reload_urlconfs)
+            response = async_to_sync(AsyncClient().get)(self.post_001.get_absolute_url())
+        self.assertEqual(set(self.timings(response)), {'db', 'markdown', 'template', 'total'})
+
+
+class TestSeedData(TestCase):
+    def test_seed_and_clear(self):
+        out = StringIO()
+        call_command('seed_data', users=5, posts=60, comments=300, tags=20, words=30, word_tags=10, news=40,
+                     days=30, skip_index=True, stdout=out)
+        self.assertIn('post 60', out.getvalue())
+        self.assertEqual(User.objects.filter(username__startswith=seed.SEED_USER_PREFIX).count(), 5)
+        self.assertEqual((Post.objects.count(), Word.objects.count(), News.objects.count()), (60, 30, 40))
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Word.objects.values('title').distinct().count(), 30)
+
+        # 본문 HTML은 넣을 때 렌더링하고, 작성일은 기간 안에 흩어 놓는다.
+        self.assertFalse(Post.objects.filter(content_html='').exists())
+        dates = News.objects.dates('created_at', 'day')
+        self.assertGreater(len(dates), 10)
+
+        # 태그와 댓글은 일부에 몰린다.
+        counts = sorted(TagStat.objects.filter(kind='post').values_list('count', flat=True), reverse=True)
+        self.assertEqual(sum(counts), Post.tags.through.objects.count())
+        self.assertGreater(counts[0], counts[-1] * 3)
+        per_post = Comment.objects.values('post').annotate(n=Count('pk')).order_by('-n')
+        self.assertGreater(per_post[0]['n'], 300 / 60 * 3)
+
+        # 이름이 seed로 시작하는 실제 사용자와 태그는 seed 데이터로 보지 않는다.
+        user = User.objects.create_user(username='seed-investor', password='somepassword')
+        post = Post.objects.create(title='직접 쓴 글', content='본문', author=user)
+        real_tag = tags.add_tags(post, 'seed funding')[0]
+        self.assertEqual(real_tag.slug, 'seed-funding')
+        call_command('seed_data', users=1, posts=5, comments=0, tags=3, words=0, word_tags=0, news=0,
+                     skip_index=True, stdout=StringIO())
+        self.assertFalse(Post.tags.through.objects.filter(tag=real_tag).exclude(post=post).exists())
+
+        call_command('seed_data', clear=True, skip_index=True, stdout=StringIO())
+        self.assertEqual(list(Post.objects.values_list('title', flat=True)), ['직접 쓴 글'])
+        self.assertEqual((Word.objects.count(), News.objects.count(), Comment.objects.count()), (0, 0, 0))
+        self.assertEqual(list(Tag.objects.values_list('slug', flat=True)), ['seed-funding'])
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['seed-investor'])
+        self.assertEqual(list(TagStat.objects.filter(count__gt=0).values_list('tag_id', flat=True)), [real_tag.pk])
+
+    def test_same_seed_same_data(self):
+        first = [seed.Generator(7).markdown(3) for _ in range(2)]
+        self.assertEqual(first, [seed.Generator(7).markdown(3)] * 2)
+        self.assertEqual(seed._josa('환율', '이', '가'), '이')
+        self.assertEqual(seed._josa('물가', '이', '가'), '가')
+
+
+class TestLoadBenchmark(TransactionTestCase):
+    def setUp(self):
+        self.tmp = use_temp_semantic_index(self)
+        create_google_app()
+        call_command('seed_data', users=3, posts=20, comments=50, tags=10, words=10, word_tags=5, news=10,
+                     days=60, stdout=StringIO())
+        cache.clear()
+        self.addCleanup(view_counter.flush)
+
+    def test_run_and_diff(self):
+        baseline = os.path.join(self.tmp, 'baseline.json')
+        out = StringIO()
+        call_command('load_benchmark', requests=6, concurrency=2, output=baseline, stdout=out)
+        with open(baseline, encoding='utf-8') as f:
+            result = json.load(f)
+        self.assertEqual(result['meta']['rows']['post'], 20)
+        self.assertEqual(set(result['endpoints']), {
+            'landing', 'post_list', 'post_detail', 'post_tag', 'post_search', 'word_list', 'word_detail',
+            'news_list', 'news_detail', 'news_calendar',
+        })
+        for summary in result['endpoints'].values():
+            self.assertEqual((summary['requests'], summary['errors']), (6, 0))
+            self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+
+        # 지연이 두 배가 된 결과와 비교하면 회귀로 실패한다.
+        slower = {**result, 'endpoints': {
+            name: {**summary, 'p99_ms': summary['p99_ms'] * 2} for name, summary in result['endpoints'].items()
+        }}
+        current = os.path.join(self.tmp, 'current.json')
+        with open(current, 'w', encoding='utf-8') as f:
+            json.dump(slower, f)
+        with self.assertRaises(CommandError):
+            call_command('load_benchmark', diff=[baseline, current], stdout=StringIO())
+        out = StringIO()
+        call_command('load_benchmark', diff=[current, baseline], stdout=out)
+        self.assertNotIn('REGRESSION', out.getvalue())
+
+    def test_compare(self):
+        base = {'endpoints': {'a': {'p50_ms': 10, 'p90_ms': 20, 'p99_ms': 30, 'mean_ms': 12, 'rps': 100, 'errors': 0}}}
+        current = {'endpoints': {'a': {'p50_ms': 10.5, 'p90_ms': 20, 'p99_ms': 30, 'mean_ms': 12, 'rps': 80, 'errors': 1}}}
+        worse = {(name, metric) for name, metric, *_, regressed in load_bench.compare(base, current) if regressed}
+        self.assertEqual(worse, {('a', 'rps'), ('a', 'errors')})
+        self.assertEqual(load_bench.percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(load_bench.percentile([1, 2, 3, 4], 99), 4)
+
+
+class TestNearDuplicates(TestCase):
+    ORIGINAL = '한국은행이 기준금리를 연 3.5%로 동결했다.\n\n물가 흐름을 더 지켜보겠다는 입장이다.'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(username='trump', password='somepassword')
+        # 커밋 훅이 의미 검색 인덱스도 갱신하므로 임시 폴더에 둔다.
+        use_temp_semantic_index(self)
+
+    def entry(self, title, content):
+        return {'title': title, 'content': content, 'link': 'http://example.com/1', 'published': None}
+
+    def test_signature(self):
+        a = near_duplicates.signature(f'한국은행, 기준금리 동결\n{self.ORIGINAL}')
+        b = near_duplicates.signature(f'한은 기준금리 3.5% 동결 결정\n{self.ORIGINAL}')
+        c = near_duplicates.signature('반도체 수출 석 달 연속 증가\n반도체 수출이 석 달 연속 늘었다.')
+        self.assertGreaterEqual(near_duplicates.similarity(a, b), near_duplicates.NEAR_DUP_THRESHOLD)
+        self.assertLess(near_duplicates.similarity(a, c), 0.1)
+        self.assertTrue(set(near_duplicates.band_keys(a)) & set(near_duplicates.band_keys(b)))
+        # 서명은 NEAR_DUP_NUM_PERM * 4바이트로 저장된다.
+        self.assertEqual(len(near_duplicates.pack(a)), near_duplicates.NEAR_DUP_NUM_PERM * 4)
+        self.assertTrue((near_duplicates.unpack(near_duplicates.pack(a)) == a).all())
+
+    def test_signature_chunks_and_cap(self):
+        text = seed.Generator(3).markdown(10)
+        values = np.fromiter((mmh3.hash(s, signed=False) for s in near_duplicates.shingles(text)), dtype=np.uint64)
+        # 청크로 나눠 계산해도 한 번에 계산한 최솟값과 같다.
+        expected = ((np.outer(values, near_duplicates._A) + near_duplicates._B)
+                    % near_duplicates._MERSENNE_PRIME & near_duplicates._MAX_HASH).min(axis=0).astype(np.uint32)
+        with mock.patch.object(near_duplicates, 'NEAR_DUP_CHUNK', 7):
+            self.assertTrue((near_duplicates.signature(text) == expected).all())
+
+        # 앞 NEAR_DUP_MAX_CHARS자 뒤에 붙은 내용은 서명에 영향을 주지 않는다.
+        with mock.patch.object(near_duplicates, 'NEAR_DUP_MAX_CHARS', 500):
+            self.assertTrue((near_duplicates.signature(text) == near_duplicates.signature(text + '덧붙인 본문')).all())
+
+    def test_clusters_on_save(self):
+        # 서명은 커밋된 뒤에 만든다.
+        with self.captureOnCommitCallbacks(execute=True):
+            first = News.objects.create(title='한국은행, 기준금리 동결', content=self.ORIGINAL, author=self.user)
+            copy = News.objects.create(title='한은 기준금리 3.5% 동결 결정', content=self.ORIGINAL, author=self.user)
+            other = News.objects.create(title='반도체 수출 석 달 연속 증가', content='반도체 수출이 석 달 연속 늘었다.')
+            self.assertFalse(ContentSignature.objects.exists())
+
+        signatures = {s.object_id: s for s in ContentSignature.objects.filter(kind='news')}
+        self.assertEqual(signatures[copy.pk].cluster, first.pk)
+        self.assertTrue(signatures[copy.pk].is_duplicate)
+        self.assertEqual(signatures[other.pk].cluster, other.pk)
+        self.assertEqual(near_duplicates.clusters('news'), [(first.pk, [first.pk, copy.pk])])
+
+        # 오늘의 뉴스와 뉴스 달력에는 대표 기사만 보인다.
+        self.assertEqual([n['title'] for n in today_news.get_today_news()], [first.title, other.title])
+        response = self.client.get(f'/news/calendar/?month={date.today():%Y-%m}')
+        titles = [n['title'] for day in response.json().values() for n in day]
+        self.assertEqual(titles, [first.title, other.title])
+
+        # 후보 조회는 LSH 버킷 인덱스로 한 번에 한다.
+        with CaptureQueriesContext(connection) as queries:
+            near_duplicates.check([News(title='한국은행 기준금리 동결', content=self.ORIGINAL)])
+        self.assertEqual(len(queries), 1)
+
+        # 대표가 지워지면 남은 글이 대표가 된다.
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(ContentSignature.objects.get(kind='news', object_id=copy.pk).cluster, copy.pk)
+        self.assertEqual(near_duplicates.clusters('news'), [])
+
+    def test_ingest_rejects_near_duplicates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title='한국은행, 기준금리 동결', content=self.ORIGINAL, author=self.user)
+        created = news_feeds.save_entries([
+            (None, self.entry('한은 기준금리 3.5% 동결 결정', self.ORIGINAL)),
+            (None, self.entry('반도체 수출 석 달 연속 증가', '반도체 수출이 석 달 연속 늘었다.')),
+            (None, self.entry('반도체 수출 석 달째 증가', '반도체 수출이 석 달 연속 늘었다.')),
+        ])
+        self.assertEqual([news.title for news in created], ['반도체 수출 석 달 연속 증가'])
+        self.assertEqual(News.objects.count(), 2)
+        self.assertEqual(ContentSignature.objects.get(kind='news', object_id=created[0].pk).cluster, created[0].pk)
+
+    def test_ingest_clusters_near_duplicates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = News.objects.create(title='한국은행, 기준금리 동결', content=self.ORIGINAL, author=self.user)
+        created = news_feeds.save_entries([
+            (None, self.entry('반도체 수출 석 달 연속 증가', '반도체 수출이 석 달 연속 늘었다.')),
+            (None, self.entry('한은 기준금리 3.5% 동결 결정', self.ORIGINAL)),
+            (None, self.entry('반도체 수출 석 달째 증가', '반도체 수출이 석 달 연속 늘었다.')),
+        ], on_near_duplicate='cluster')
+        self.assertEqual(len(created), 3)
+        chip, copy, chip_copy = created
+        self.assertEqual(near_duplicates.clusters('news'), [
+            (first.pk, [first.pk, copy.pk]), (chip.pk, [chip.pk, chip_copy.pk]),
+        ])
+
+    def test_rebuild_and_admin(self):
+        # bulk_create는 시그널을 보내지 않으므로 rebuild_near_duplicates로 서명을 만든다.
+        posts = Post.objects.bulk_create([
+            Post(title='환율 전망', content=self.ORIGINAL, author=self.user),
+            Post(title='환율 전망 (수정)', content=self.ORIGINAL, author=self.user),
+            Post(title='반도체', content='반도체 수출이 석 달 연속 늘었다.', author=self.user),
+        ])
+        self.assertFalse(ContentSignature.objects.exists())
+        out = StringIO()
+        call_command('rebuild_near_duplicates', model=['post'], stdout=out)
+        self.assertIn('post: 3건', out.getvalue())
+        self.assertEqual(near_duplicates.clusters('post'), [(posts[0].pk, [posts[0].pk, posts[1].pk])])
+
+        self.client.login(username='trump', password='somepassword')
+        response = self.client.get('/admin/blog/contentsignature/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '환율 전망 (수정)')
+        self.assertNotContains(response, '>반도체<')
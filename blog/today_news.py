@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+
+SEOUL = ZoneInfo('Asia/Seoul')
+
+
+def _db_datetime(value):
+    # USE_TZ=False 이면 DB에는 TIME_ZONE(Asia/Seoul) 기준 naive 시각이 저장된다.
+    return value if settings.USE_TZ else value.replace(tzinfo=None)
+
+
+def today_range():
+    """오늘(한국 시간) 하루를 [시작, 다음날 시작) 반열린 구간으로 반환한다."""
+    start = datetime.now(SEOUL).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=1)
+    return _db_datetime(start), _db_datetime(end)
+
+
+def seconds_until_tomorrow():
+    """다음 자정(한국 시간)까지 남은 초. 하루 단위 캐시의 만료 시간으로 쓴다."""
+    _, end = today_range()
+    return max(int((end - _db_datetime(datetime.now(SEOUL))).total_seconds()), 1)
+
+
+def _cache_key(start):
+    return f'today_news:{start:%Y-%m-%d}'
+
+
+def get_today_news():
+    """오늘의 뉴스 제목/URL 목록. 자정(한국 시간)까지 캐시된다."""
+    from .models import News
+    from .near_duplicates import duplicate_ids
+
+    start, end = today_range()
+    key = _cache_key(start)
+    today_news = cache.get(key)
+    if today_news is None:
+        # created_at__date=today 대신 범위 조건을 써야 created_at 인덱스를 탄다.
+        # 근접 중복으로 묶인 기사는 대표 기사만 보인다.
+        today_news = [
+            {'title': n.title, 'url': n.get_absolute_url(), 'created_at': n.created_at}
+            for n in News.objects.filter(created_at__gte=start, created_at__lt=end)
+                                 .exclude(pk__in=duplicate_ids('news'))
+                                 .only('pk', 'title', 'created_at').order_by('created_at')
+        ]
+        cache.set(key, today_news, seconds_until_tomorrow())
+    return today_news
+
+
+def invalidate():
+    start, _ = today_range()
+    cache.delete(_cache_key(start))
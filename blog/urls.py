@@ -1,20 +1,26 @@
 from django.urls import path, include
 
 from . import views
+from .async_reads import read_view
 from django.conf import settings
 from django.conf.urls.static import static
 
 
 urlpatterns = [
     path('search/<str:q>/', views.PostSearch.as_view(), name='post_search'),
+    path('tag/<str:slug>/', views.PostListByTag.as_view(), name='post_tag'),
+    path('semantic_search/<str:q>/', views.PostSemanticSearch.as_view(), name='post_semantic_search'),
     path('delete_comment/<int:pk>/', views.delete_comment),
     path('update_comment/<int:pk>/', views.CommentUpdate.as_view()),
     path('update_post/<int:pk>/', views.PostUpdate.as_view()),
     path('create_post/', views.PostCreate.as_view(), name='post_create'),
     path('<int:pk>/new_comment/', views.new_comment),
-    path('<int:pk>/', views.PostDetail.as_view()),
+    path('<int:pk>/comments/', views.post_comments, name='post_comments'),
+    path('<int:pk>/', read_view(views.PostDetail.as_view(), views.AsyncPostDetail.as_view())),
     path('accounts/', include('allauth.urls')),
-    path('', views.PostList.as_view()),
+    path('', read_view(views.PostList.as_view(), views.AsyncPostList.as_view())),
     path('generate_image/', views.generate_image, name='generate_image'),
+    path('generate_image/<int:pk>/', views.image_job_status, name='image_job_status'),
+    path('derivative/<int:width>/<str:fmt>/<path:name>', views.image_derivative, name='image_derivative'),
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
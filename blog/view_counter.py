@@ -0,0 +1,165 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import Case, F, PositiveIntegerField, When
+
+# 'memory' : 프로세스 메모리에 증가분을 모았다가 반영 (기본값)
+# 'cache'  : 여러 워커가 공유하는 캐시 백엔드(redis/memcached 등)에 모았다가 반영
+VIEW_COUNT_BUFFER = getattr(settings, 'VIEW_COUNT_BUFFER', 'memory')
+# 쌓인 조회수가 이 값 이상이거나, 마지막 반영 후 이 시간(초)이 지나면 DB에 반영
+VIEW_COUNT_FLUSH_THRESHOLD = getattr(settings, 'VIEW_COUNT_FLUSH_THRESHOLD', 100)
+VIEW_COUNT_FLUSH_INTERVAL = getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 30)
+VIEW_COUNT_FLUSH_BATCH_SIZE = 500
+
+# 캐시 모드에서 여러 워커가 함께 쓰는 키. 조회 경로는 원자적 연산(add / incr)만 쓰고, done / seen은 flush 잠금 안에서만 바꾼다.
+# 조회수가 0에서 늘기 시작한 글은 순번(seq)을 받아 slot:<순번>에 pk를 적어 두고, flush는 순번 범위를 읽는다.
+_SEQ_KEY = 'view_count:seq'
+_DONE_KEY = 'view_count:done'
+_SEEN_KEY = 'view_count:seen'
+_TOTAL_KEY = 'view_count:total'
+_LOCK_KEY = 'view_count:flush_lock'
+VIEW_COUNT_FLUSH_LOCK_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def _key(pk):
+    return f'view_count:{pk}'
+
+
+def _slot_key(number):
+    return f'view_count:slot:{number}'
+
+
+def _incr(key, amount):
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key, amount)
+
+
+def _register(pk):
+    cache.set(_slot_key(_incr(_SEQ_KEY, 1)), pk, None)
+
+
+def _add(pk, amount):
+    """증가분을 버퍼에 더하고 버퍼에 쌓인 전체 조회수를 반환한다."""
+    if VIEW_COUNT_BUFFER == 'cache':
+        # 0에서 늘어난 경우만 등록한다. 이미 등록된 글은 flush가 한꺼번에 가져간다.
+        if _incr(_key(pk), amount) == amount:
+            _register(pk)
+        return _incr(_TOTAL_KEY, amount)
+    with _lock:
+        _pending[pk] = _pending.get(pk, 0) + amount
+        return sum(_pending.values())
+
+
+def increment(pk, amount=1):
+    total = _add(pk, amount)
+    if total >= VIEW_COUNT_FLUSH_THRESHOLD or time.monotonic() - _last_flush >= VIEW_COUNT_FLUSH_INTERVAL:
+        try:
+            flush()
+        except DatabaseError:
+            # 증가분은 flush가 버퍼에 되돌려 놓았으므로 다음 반영 때 다시 시도한다.
+            logger.exception('조회수 반영 실패')
+
+
+def pending(pk):
+    if VIEW_COUNT_BUFFER == 'cache':
+        return cache.get(_key(pk), 0)
+    with _lock:
+        return _pending.get(pk, 0)
+
+
+def _take_cached():
+    seq, done, seen = (cache.get(key, 0) for key in (_SEQ_KEY, _DONE_KEY, _SEEN_KEY))
+    slots = cache.get_many([_slot_key(n) for n in range(done + 1, seq + 1)])
+    start, pks = done, set()
+    for number in range(done + 1, seq + 1):
+        slot = slots.get(_slot_key(number))
+        if slot is None and number > seen:
+            # 순번만 받고 아직 pk를 적지 못한 등록. 다음 반영 때 다시 본다.
+            break
+        if slot is not None:
+            pks.add(slot)
+        done = number
+    cache.delete_many([_slot_key(n) for n in range(start + 1, done + 1)])
+    cache.set_many({_DONE_KEY: done, _SEEN_KEY: seq}, None)
+    cache.set(_TOTAL_KEY, 0, None)
+
+    deltas = {}
+    for pk in pks:
+        value = cache.get(_key(pk), 0)
+        if value:
+            # 읽고 빼는 사이에 들어온 증가분은 남는다. 이 글은 등록이 빠졌으므로 다시 등록한다.
+            if cache.decr(_key(pk), value) > 0:
+                _register(pk)
+            deltas[pk] = value
+    return deltas
+
+
+def _take_pending():
+    if VIEW_COUNT_BUFFER == 'cache':
+        return _take_cached()
+    with _lock:
+        deltas = dict(_pending)
+        _pending.clear()
+    return deltas
+
+
+def flush():
+    """쌓인 증가분을 배치당 UPDATE 한 번으로 반영한다. 반영한 조회수 합계를 반환.
+
+    UPDATE가 실패하면 반영하지 못한 증가분을 버퍼에 되돌려 놓고 예외를 다시 던진다.
+    캐시 모드에서는 워커 하나만 반영하도록 캐시 키로 잠근다.
+    """
+    global _last_flush
+    _last_flush = time.monotonic()
+
+    if VIEW_COUNT_BUFFER == 'cache':
+        if not cache.add(_LOCK_KEY, 1, VIEW_COUNT_FLUSH_LOCK_TIMEOUT):
+            return 0
+        try:
+            return _flush(_take_pending())
+        finally:
+            cache.delete(_LOCK_KEY)
+    return _flush(_take_pending())
+
+
+def _flush(deltas):
+    if not deltas:
+        return 0
+
+    from .models import Post
+
+    items = list(deltas.items())
+    for i in range(0, len(items), VIEW_COUNT_FLUSH_BATCH_SIZE):
+        batch = items[i:i + VIEW_COUNT_FLUSH_BATCH_SIZE]
+        try:
+            # view_count = view_count + CASE WHEN id=1 THEN 3 WHEN id=2 THEN 1 ... END
+            # update()는 save()를 거치지 않으므로 updated_at도 바뀌지 않는다.
+            Post.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                view_count=F('view_count') + Case(
+                    *[When(pk=pk, then=delta) for pk, delta in batch],
+                    default=0,
+                    output_field=PositiveIntegerField(),
+                )
+            )
+        except DatabaseError:
+            for pk, delta in items[i:]:
+                _add(pk, delta)
+            raise
+    return sum(deltas.values())
+
+
+atexit.register(flush)
@@ -2,55 +2,156 @@ from django.shortcuts import render, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.shortcuts import get_object_or_404
-from .models import Post, Tag, Comment, News
+from .models import Post, Tag, Comment, ImageJob
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q
 from .forms import CommentForm
-from django.utils import timezone
-from django.utils.text import slugify
+from .page_cache import cached_page
+from .pagination import CursorPaginationMixin, cursor_param
+from .search import SearchResults
+from .tags import add_tags
 
 from django.conf import settings
-from django.http import JsonResponse
-from .dalle import save_gen_img, OpenAI, BadRequestError
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from asgiref.sync import sync_to_async
+from .async_reads import AsyncDetailMixin, AsyncListMixin
+from . import image_cache, image_derivatives, image_jobs, perf, semantic, tag_stats, view_counter
 import json
 import os
 from dotenv import load_dotenv
 from django.core.files import File
-from urllib.request import urlopen
-from tempfile import NamedTemporaryFile
+from PIL import UnidentifiedImageError
 
 load_dotenv()
 
-class PostList(ListView):
+@method_decorator(cached_page('post', 'tag'), name='dispatch')
+class PostList(CursorPaginationMixin, ListView):
     model = Post
+    # 카드마다 태그/작성자를 따로 조회하지 않도록 한 번에 가져온다.
+    queryset = Post.objects.select_related('author').prefetch_related('tags')
     ordering = '-pk'
     paginate_by = 5
 
     def get_context_data(self, **kwargs):
         context = super(PostList, self).get_context_data(**kwargs)
-        # 오늘 날짜의 뉴스 필터링
-        today = timezone.now().date()
-        today_news = News.objects.filter(created_at__date=today)
-
-        # 템플릿에 전달
-        context['today_news'] = today_news
         context['comment_form'] = CommentForm
         return context
 
+# 상세 페이지에서 한 번에 보여 주는 댓글 수 (나머지는 스크롤하면 post_comments로 불러온다)
+COMMENTS_PAGE_SIZE = 20
+
+
+def _is_ajax(request):
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def comment_page(post, after=None):
+    """post의 댓글을 pk 순으로 after 다음부터 한 페이지. (댓글 목록, 다음 페이지 여부)"""
+    comments = Comment.objects.filter(post=post).select_related('author').order_by('pk')
+    if after is not None:
+        comments = comments.filter(pk__gt=after)
+    comments = list(comments[:COMMENTS_PAGE_SIZE + 1])
+    return comments[:COMMENTS_PAGE_SIZE], len(comments) > COMMENTS_PAGE_SIZE
+
+
+def _count_cached_view(request, pk):
+    # 캐시된 상세 페이지로 응답해도 조회수는 올린다.
+    view_counter.increment(pk)
+
+
+class PostListByTag(PostList):
+    # 태그 아카이브: 연결 테이블의 tag_id 인덱스로 조인하고, 전체 개수는 태그 집계에서 읽는다.
+
+    def get_queryset(self):
+        self.tag = get_object_or_404(Tag, slug=self.kwargs['slug'])
+        return super().get_queryset().filter(tags=self.tag)
+
+    def get_total_count(self):
+        return tag_stats.count('post', self.tag.pk)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['tag'] = self.tag
+        return context
+
+
+# 상세 페이지 하단에 보여줄 비슷한 글 수
+SIMILAR_POSTS_COUNT = 5
+
+
+@method_decorator(cached_page('post:{pk}', 'tag', on_hit=_count_cached_view), name='dispatch')
 class PostDetail(DetailView):
     model = Post
+    queryset = Post.objects.select_related('author').prefetch_related('tags')
+
+    def get_object(self, queryset=None):
+        post = super(PostDetail, self).get_object(queryset)
+        post.update_count  # 조회수 +1 (view_counter에 버퍼링)
+        return post
 
     def get_context_data(self, **kwargs):
         context = super(PostDetail, self).get_context_data()
-        # 오늘 날짜의 뉴스 필터링
-        today = timezone.now().date()
-        today_news = News.objects.filter(created_at__date=today)
-
-        # 템플릿에 전달
-        context['today_news'] = today_news
         context['comment_form'] = CommentForm
+        context['comments'], context['comments_has_next'] = self.get_comment_page()
+        context['similar_posts'] = self.get_similar_posts()
         return context
 
+    # async 뷰는 아래 두 메서드만 바꿔 미리 기다린 결과를 쓴다.
+    def get_comment_page(self):
+        return comment_page(self.object)
+
+    def get_similar_posts(self):
+        return similar_posts(self.object)
+
+
+def similar_posts(post, k=SIMILAR_POSTS_COUNT):
+    # 의미 검색 인덱스(semantic.py)에서 가까운 글을 찾고, 글은 한 번에 가져온다.
+    ids = [pk for pk, _ in semantic.similar('post', post.pk, k)]
+    if not ids:
+        return []
+    posts = Post.objects.only('pk', 'title').in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+@method_decorator(cached_page('post', 'tag'), name='dispatch')
+class AsyncPostList(AsyncListMixin, PostList):
+    sidebar_kind = 'post'
+
+
+@method_decorator(cached_page('post:{pk}', 'tag', on_hit=_count_cached_view), name='dispatch')
+class AsyncPostDetail(AsyncDetailMixin, PostDetail):
+    sidebar_kind = 'post'
+
+    def get_async_queries(self):
+        # 글 본문과 독립적인 댓글 / 비슷한 글은 pk만으로 조회할 수 있으므로 함께 기다린다.
+        post = Post(pk=self.kwargs['pk'])
+        return {
+            **super().get_async_queries(),
+            'comments': sync_to_async(comment_page)(post),
+            'similar_posts': sync_to_async(similar_posts)(post),
+        }
+
+    def get_object(self, queryset=None):
+        post = super().get_object(queryset)
+        post.update_count  # 글이 있을 때만 조회수 +1
+        return post
+
+    def get_comment_page(self):
+        return self.prefetched['comments']
+
+    def get_similar_posts(self):
+        return self.prefetched['similar_posts']
+
+
+def post_comments(request, pk):
+    post = get_object_or_404(Post.objects.only('pk'), pk=pk)
+    after = cursor_param(request, 'after')
+    comments, has_next = comment_page(post, after)
+    return render(request, 'blog/comment_list.html', {
+        'post': post, 'comments': comments, 'comments_has_next': has_next,
+    })
+
 class PostUpdate(LoginRequiredMixin, UpdateView):
     model = Post
     fields = ['title', 'content', 'head_image']
@@ -75,18 +176,7 @@ class PostUpdate(LoginRequiredMixin, UpdateView):
     def form_valid(self, form):
         response = super(PostUpdate, self).form_valid(form)
         self.object.tags.clear()
-        tags_str = self.request.POST.get('tags_str')
-        if tags_str:
-            tags_str = tags_str.strip()
-            tags_str = tags_str.replace(',', ';')
-            tags_list = tags_str.split(';')
-            for t in tags_list:
-                t = t.strip()
-                tag, is_tag_created = Tag.objects.get_or_create(name=t)
-                if is_tag_created:
-                    tag.slug = slugify(t, allow_unicode=True)
-                    tag.save()
-                self.object.tags.add(tag)
+        add_tags(self.object, self.request.POST.get('tags_str'))
         return response
 
 def new_comment(request, pk):
@@ -100,9 +190,13 @@ def new_comment(request, pk):
                 comment.post = post
                 comment.author = request.user
                 comment.save()
+                if _is_ajax(request):
+                    # 상세 페이지 전체 대신 새 댓글 조각만 돌려준다.
+                    return render(request, 'blog/comment_item.html', {'comment': comment}, status=201)
                 return redirect(comment.get_absolute_url())
-        else:
-            return redirect(post.get_absolute_url())
+            if _is_ajax(request):
+                return JsonResponse({'errors': comment_form.errors}, status=400)
+        return redirect(post.get_absolute_url())
     else:
         raise PermissionDenied
 
@@ -121,32 +215,35 @@ def delete_comment(request, pk):
     post = comment.post
     if request.user.is_authenticated and request.user == comment.author:
         comment.delete()
+        if _is_ajax(request):
+            return HttpResponse(status=204)
         return redirect(post.get_absolute_url())
     else:
         raise PermissionDenied
 
 class PostSearch(PostList):
-    paginate_by = None
+    # 검색 결과는 BM25 점수 순이라 pk 커서를 쓸 수 없다.
+    pagination_mode = 'offset'
+    search_mode = 'keyword'
+
     def get_queryset(self):
-        q = self.kwargs['q']
-        post_list = Post.objects.filter(
-            Q(title__contains=q)
-        ).distinct()
-        return post_list
+        # 제목/본문 역색인에서 BM25 순으로 찾고, 현재 페이지의 글만 가져온다.
+        return SearchResults(self.kwargs['q'], 'post', queryset=self.queryset)
     def get_context_data(self, **kwargs):
         context = super(PostSearch, self).get_context_data()
         q = self.kwargs['q']
         context['search_info'] = f'Search: {q}'
+        context['search_q'] = q
+        context['search_mode'] = self.search_mode
         return context
 
-def generate_unique_slug(name):
-    slug = slugify(name, allow_unicode=True)
-    unique_slug = slug
-    number = 1
-    while Tag.objects.filter(slug=unique_slug).exists():
-        unique_slug = f"{slug}-{number}"
-        number += 1
-    return unique_slug
+
+class PostSemanticSearch(PostSearch):
+    search_mode = 'semantic'
+
+    def get_queryset(self):
+        # 형태소가 겹치지 않아도 본문이 비슷한 글을 임베딩 유사도 순으로 찾는다.
+        return semantic.SemanticResults(self.kwargs['q'], 'post', queryset=self.queryset)
 
 
 class PostCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
@@ -165,48 +262,61 @@ class PostCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
             # hidden input에서 이미지 URL 가져오기
             generated_image_url = self.request.POST.get('generated_image_url')
             if generated_image_url:
-                # URL에서 이미지를 열어 임시 파일로 저장한 후 head_image에 첨부
-                img_temp = NamedTemporaryFile(delete=True)
-                img_temp.write(urlopen(generated_image_url).read())
-                img_temp.flush()
-
-                # 파일 이름을 지정하여 저장 (경로를 제거하고 파일명만 사용)
+                # 이미 generated_images/ 에 저장된 파일을 HTTP로 다시 받지 않고 바로 head_image 저장소에 복사
                 file_name = os.path.basename(generated_image_url)
-                form.instance.head_image.save(file_name, File(img_temp), save=False)
+                file_path = image_cache.path(file_name)
+                if file_path:
+                    with open(file_path, 'rb') as img_file:
+                        form.instance.head_image.save(file_name, File(img_file), save=False)
 
             response = super(PostCreate, self).form_valid(form)
 
-            # 태그 추가
-            tags_str = self.request.POST.get('tags_str')
-            if tags_str:
-                tags_str = tags_str.strip().replace(',', ';')
-                tags_list = tags_str.split(';')
-                for t in tags_list:
-                    t = t.strip()
-                    existing_tag = Tag.objects.filter(name=t).first()
-                    if existing_tag:
-                        tag = existing_tag
-                    else:
-                        tag = Tag(name=t)
-                        tag.slug = generate_unique_slug(t)  # 고유 슬러그 생성 함수 사용
-                        tag.save()
-                    self.object.tags.add(tag)
+            # 태그 추가 (기존 태그 조회, 새 태그 생성, 연결을 각각 한 번에)
+            add_tags(self.object, self.request.POST.get('tags_str'))
 
             return response
         else:
             return redirect('/blog/')
 
+def _image_job_json(request, job):
+    data = {"job_id": job.pk, "status": job.status, "status_url": f"/blog/generate_image/{job.pk}/"}
+    if job.status == ImageJob.DONE:
+        data["filename"] = job.filename
+        data["file_url"] = request.build_absolute_uri(os.path.join(settings.MEDIA_URL, 'generated_images', job.filename))
+    elif job.status == ImageJob.FAILED:
+        data["error"] = job.error
+    return data
+
 def generate_image(request):
+    # 요청 안에서 바로 그리지 않고 작업만 등록한 뒤, 클라이언트가 status_url을 폴링한다.
     if request.method == "POST":
         data = json.loads(request.body)
         txt_response = data.get("txt_response", "")
-        client = OpenAI(api_key=os.getenv("OPENAI_KEY"))
-
-        try:
-            filename = save_gen_img(client, txt_response)
-            file_url = request.build_absolute_uri(os.path.join(settings.MEDIA_URL, 'generated_images', filename))
-        except BadRequestError:
-            filename = save_gen_img(client, "시장 경제 활동")
-            file_url = request.build_absolute_uri(os.path.join(settings.MEDIA_URL, 'generated_images', filename))
-
-        return JsonResponse({"filename": filename, "file_url": file_url})
+        job = image_jobs.submit(txt_response)
+        return JsonResponse(_image_job_json(request, job), status=200 if job.is_finished else 202)
+
+def image_job_status(request, pk):
+    job = get_object_or_404(ImageJob, pk=pk)
+    return JsonResponse(_image_job_json(request, job))
+
+def image_derivative(request, width, fmt, name):
+    # srcset이 가리키는 파생 이미지를 처음 요청받았을 때 만들고 저장된 파일로 보낸다.
+    if width not in image_derivatives.IMAGE_DERIVATIVE_WIDTHS or fmt not in image_derivatives.IMAGE_DERIVATIVE_FORMATS:
+        raise Http404
+    if not image_derivatives.is_source(name) or not default_storage.exists(name):
+        raise Http404
+    try:
+        target = image_derivatives.ensure(name, width, fmt)
+    except UnidentifiedImageError:
+        raise Http404
+    except TimeoutError:
+        # 만드는 중인 작업은 계속 돌고, 다음 요청에서 결과를 쓴다.
+        return HttpResponse('파생 이미지를 만드는 중입니다.', status=503, headers={'Retry-After': '5'})
+    return redirect(default_storage.url(target))
+
+
+def metrics(request):
+    # 최근 PERF_WINDOW초의 경로별 / 구간별 히스토그램 (Prometheus 텍스트 형식). 스태프나 INTERNAL_IPS만.
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS):
+        raise Http404
+    return HttpResponse(perf.metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,85 @@
+import csv
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import markdown_cache
+from .models import Word, Word_Tag
+from .tags import parse_tag_names, resolve_tags
+
+WORD_LOAD_BATCH_SIZE = 200
+
+
+def read_csv(path):
+    """title,content,related_keyword 형식의 CSV를 한 줄씩 읽는다. (BOM 허용)"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            title = (row.get('title') or '').strip()
+            if title:
+                yield title, (row.get('content') or '').strip(), parse_tag_names(row.get('related_keyword'))
+
+
+def _batches(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def load_words(rows, batch_size=WORD_LOAD_BATCH_SIZE):
+    """(title, content, tag_names) 행을 Word / Word_Tag에 넣는다.
+
+    같은 제목의 Word가 있으면 본문을 갱신하고 태그는 없는 것만 추가하므로 여러 번 실행해도 된다.
+    배치마다 트랜잭션 하나로 처리한다. bulk_create는 시그널을 보내지 않으므로 추가/갱신된 Word 목록과
+    (추가 건수, 갱신 건수, 읽은 행 수)를 반환한다.
+    """
+    created = updated = total = 0
+    words = []
+    for batch in _batches(rows, batch_size):
+        # 한 배치 안에서 제목이 겹치면 뒤의 행을 쓴다.
+        total += len(batch)
+        batch = {title: (content, names) for title, content, names in batch}
+        with transaction.atomic():
+            batch_words, batch_created = _load_batch(batch)
+        words.extend(batch_words)
+        created += batch_created
+        updated += len(batch_words) - batch_created
+    return words, created, updated, total
+
+
+def _load_batch(batch):
+    existing = {word.title: word for word in Word.objects.filter(title__in=list(batch))}
+    now = timezone.now()
+    new_words = []
+    changed = []
+    for title, (content, _) in batch.items():
+        word = existing.get(title)
+        if word is None:
+            word = Word(title=title, content=content)
+            markdown_cache.refresh(word)
+            new_words.append(word)
+        elif word.content != content:
+            word.content = content
+            word.updated_at = now
+            markdown_cache.refresh(word)
+            changed.append(word)
+
+    if new_words:
+        Word.objects.bulk_create(new_words)
+    if changed:
+        # bulk_update는 auto_now를 적용하지 않으므로 updated_at은 위에서 직접 넣는다.
+        Word.objects.bulk_update(changed, ['content', 'content_html', 'content_excerpt', 'updated_at'])
+
+    names = list(dict.fromkeys(name for _, tag_names in batch.values() for name in tag_names))
+    tags = {tag.name: tag for tag in resolve_tags(Word_Tag, names)}
+    words = {word.title: word for word in [*existing.values(), *new_words]}
+    Through = Word.tags.through
+    Through.objects.bulk_create([
+        Through(word_id=words[title].pk, word_tag_id=tags[name].pk)
+        for title, (_, tag_names) in batch.items()
+        for name in tag_names
+    ], ignore_conflicts=True)
+
+    for word in [*new_words, *changed]:
+        markdown_cache.store(word)
+    return [*new_words, *changed], len(new_words)
@@ -0,0 +1,75 @@
+import heapq
+import random
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from .today_news import seconds_until_tomorrow, today_range
+
+# schedule_words 명령이 오늘부터 미리 채워 둘 날짜 수
+WORD_SCHEDULE_DAYS = getattr(settings, 'WORD_SCHEDULE_DAYS', 30)
+
+
+def today():
+    start, _ = today_range()
+    return start.date()
+
+
+def schedule(start=None, days=WORD_SCHEDULE_DAYS):
+    """start부터 days일 중 비어 있는 날짜에 단어를 배정한다. 새로 배정한 날짜 수를 반환.
+
+    가장 오래전에 나온(또는 한 번도 안 나온) 단어부터 고르므로 전체 단어 수만큼의 기간 안에서는
+    같은 단어가 다시 나오지 않는다. 같은 순위끼리는 날짜로 시드를 정한 무작위 순서.
+    """
+    from .models import Word, WordSchedule
+
+    start = start or today()
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    with transaction.atomic():
+        taken = set(WordSchedule.objects.filter(date__in=dates).values_list('date', flat=True))
+        dates = [day for day in dates if day not in taken]
+        if not dates:
+            return 0
+
+        last_used = dict(WordSchedule.objects.values('word').annotate(last=Max('date')).values_list('word', 'last'))
+        rng = random.Random(start.toordinal())
+        heap = [(last_used.get(pk, date.min), rng.random(), pk) for pk in Word.objects.values_list('pk', flat=True)]
+        if not heap:
+            return 0
+        heapq.heapify(heap)
+
+        rows = []
+        for day in dates:
+            _, _, pk = heapq.heappop(heap)
+            rows.append(WordSchedule(date=day, word_id=pk))
+            heapq.heappush(heap, (day, rng.random(), pk))
+        WordSchedule.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def _cache_key(day):
+    return f'word_of_the_day:{day:%Y-%m-%d}'
+
+
+def get_word_of_the_day():
+    """오늘의 단어 (없으면 None). 자정(한국 시간)까지 캐시된다."""
+    from .models import WordSchedule
+
+    day = today()
+    key = _cache_key(day)
+    word = cache.get(key)
+    if word is None:
+        entry = WordSchedule.objects.select_related('word').filter(date=day).first()
+        if entry is None and schedule(day, days=1):
+            # 스케줄을 미리 채우지 않았으면 오늘 하루만 배정한다.
+            entry = WordSchedule.objects.select_related('word').filter(date=day).first()
+        word = entry.word if entry is not None else False
+        cache.set(key, word, seconds_until_tomorrow())
+    return word or None
+
+
+def invalidate():
+    cache.delete(_cache_key(today()))
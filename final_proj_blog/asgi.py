@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'final_proj_blog.settings')
+# ASGI 서버에서는 landing / 목록 / 상세 페이지를 async 뷰로 연결한다. (blog/async_reads.py)
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
@@ -20,6 +20,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from blog.views import metrics
+
 urlpatterns = [
     path('common/', include('common.urls')),
     path('today_word/', include('today_word.urls')),
@@ -29,6 +31,7 @@ urlpatterns = [
     path('accounts/', include('allauth.urls')),
     path('', include('single_pages.urls')),
     path('news/', include('news.urls')),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,3 +1,202 @@
-from django.test import TestCase
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from blog import markdown_cache, news_feeds, search, semantic
+from blog.models import News, NewsFeed, news_hash
+from blog.testing import create_google_app, use_temp_semantic_index
+import hashlib
+import os
+import threading
 
-# Create your tests here.
+
+class TestNewsCalendar(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user_trump = User.objects.create_user(username='trump', password='somepassword')
+        self.news_001 = News.objects.create(title='10월 뉴스', content='10월 뉴스입니다.', author=self.user_trump)
+        self.news_002 = News.objects.create(title='11월 뉴스', content='11월 뉴스입니다.', author=self.user_trump)
+        News.objects.filter(pk=self.news_001.pk).update(created_at=datetime(2024, 10, 31, 23, 59))
+        News.objects.filter(pk=self.news_002.pk).update(created_at=datetime(2024, 11, 1, 0, 0))
+
+    def test_month(self):
+        response = self.client.get('/news/calendar/', {'month': '2024-11'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            '2024-11-01': [{'title': '11월 뉴스', 'url': self.news_002.get_absolute_url()}],
+        })
+
+        etag = response['ETag']
+        response = self.client.get('/news/calendar/', {'month': '2024-11'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.news_002.refresh_from_db()
+        self.news_002.title = '수정된 뉴스'
+        self.news_002.save()
+        response = self.client.get('/news/calendar/', {'month': '2024-11'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_range(self):
+        response = self.client.get('/news/calendar/', {'start': '2024-10-31', 'end': '2024-11-01'})
+        self.assertEqual(len(response.json()), 2)
+
+        response = self.client.get('/news/calendar/', {'start': '2024-01-01', 'end': '2024-12-31'})
+        self.assertEqual(response.status_code, 400)
+
+        # 마지막 달 / 마지막 날은 다음 달 / 다음 날 계산이 넘친다.
+        for params in ({'month': '9999-12'}, {'start': '9999-12-01', 'end': '9999-12-31'}):
+            response = self.client.get('/news/calendar/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+FEED_DIR = os.path.join(os.path.dirname(__file__), 'testdata', 'feeds')
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    # 테스트용 피드 서버: testdata/feeds의 파일을 ETag / Last-Modified와 함께 내려주고 조건부 요청에 304로 답한다.
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')))
+        path = os.path.join(FEED_DIR, os.path.basename(self.path))
+        if not os.path.exists(path):
+            self.send_error(500)
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Mon, 12 Oct 2026 09:00:00 GMT')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestNewsFeeds(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        FeedHandler.requests = []
+        self.index_dir = use_temp_semantic_index(self)
+        self.economy = NewsFeed.objects.create(name='경제', url=f'{self.base_url}/economy.xml')
+        self.markets = NewsFeed.objects.create(name='시장', url=f'{self.base_url}/markets.atom')
+
+    def test_ingest(self):
+        results = news_feeds.ingest(parse_workers=2)
+        self.assertEqual([(feed.name, status, created) for feed, status, created, _ in results],
+                         [('경제', 200, 2), ('시장', 200, 1)])
+
+        # 두 피드에 실린 같은 기사는 한 번만 들어간다.
+        self.assertEqual(News.objects.count(), 3)
+        news = News.objects.get(source_url=f'{self.base_url}/economy/1')
+        self.assertEqual(news.title, '한국은행, 기준금리 동결')
+        self.assertEqual(news.content, '한국은행이 기준금리를 연 3.5%로 동결했다.\n\n물가 흐름을 더 지켜보겠다는 입장이다.')
+        self.assertEqual(news.created_at.date(), date(2026, 10, 12))
+        self.assertIn('<p>한국은행이', news.content_html)
+        self.assertEqual(news.content_hash, News.objects.get(pk=news.pk).content_hash)
+        self.assertEqual(len(News.objects.get(source_url__endswith='/economy/2').title), 30)
+
+        # 새 뉴스는 검색 / 의미 검색 색인에 들어간다.
+        self.assertEqual(search.search('반도체', kinds=('news',))[0][1], News.objects.get(title__startswith='반도체').pk)
+        self.assertEqual(semantic._load('news').ntotal, 3)
+        self.assertEqual(semantic.semantic_search('기준금리 동결', 'news')[0][0], news.pk)
+
+        self.economy.refresh_from_db()
+        self.assertEqual(self.economy.last_status, 200)
+        self.assertTrue(self.economy.etag)
+
+        # 바뀌지 않은 피드는 304로 건너뛴다.
+        results = news_feeds.ingest(parse_workers=0)
+        self.assertEqual([(status, created) for _, status, created, _ in results], [(304, 0), (304, 0)])
+        self.markets.refresh_from_db()
+        self.assertIn((self.markets.url[len(self.base_url):], self.markets.etag, 'Mon, 12 Oct 2026 09:00:00 GMT'),
+                      FeedHandler.requests[-2:])
+        self.assertEqual(News.objects.count(), 3)
+
+    def test_existing_news_is_not_duplicated(self):
+        user = User.objects.create_user(username='trump', password='somepassword')
+        News.objects.create(title='반도체 수출 석 달 연속 증가', content='반도체  수출이 석 달 연속 늘었다.', author=user)
+        news_feeds.ingest([self.markets], parse_workers=0)
+        self.assertEqual(News.objects.filter(title__startswith='반도체').count(), 1)
+
+    def test_errors_are_recorded(self):
+        broken = NewsFeed.objects.create(name='없음', url=f'{self.base_url}/missing.xml')
+        out = StringIO()
+        call_command('ingest_news', feed=[broken.pk, self.economy.pk], parse_workers=0, stdout=out)
+        broken.refresh_from_db()
+        self.assertEqual((broken.last_status, broken.last_error), (500, 'HTTP 500'))
+        self.assertIn('새 뉴스 2건', out.getvalue())
+
+    def test_parse_error_keeps_old_validators(self):
+        with mock.patch.object(news_feeds, 'parse_feed', side_effect=ValueError('깨진 피드')):
+            results = news_feeds.ingest([self.economy], parse_workers=0)
+        self.assertEqual([(status, created, error) for _, status, created, error in results], [(200, 0, '깨진 피드')])
+        self.economy.refresh_from_db()
+        self.assertEqual((self.economy.etag, self.economy.last_modified), ('', ''))
+
+        # 다음 실행은 조건부 요청 없이 다시 받아 항목을 넣는다.
+        results = news_feeds.ingest([self.economy], parse_workers=0)
+        self.assertEqual([(status, created) for _, status, created, _ in results], [(200, 2)])
+        self.assertEqual(FeedHandler.requests[-1], ('/economy.xml', None, None))
+
+    def test_content_hash_follows_update_fields(self):
+        user = User.objects.create_user(username='trump', password='somepassword')
+        news = News.objects.create(title='원래 제목', content='원래 본문', author=user)
+        news.title = '바뀐 제목'
+        news.save(update_fields=['title'])
+        self.assertEqual(News.objects.get(pk=news.pk).content_hash, news_hash('바뀐 제목', '원래 본문'))
+        news.content = '바뀐 본문'
+        news.save(update_fields=['content'])
+        self.assertEqual(News.objects.get(pk=news.pk).content_hash, news_hash('바뀐 제목', '바뀐 본문'))
+
+    def test_parse_feed(self):
+        with open(os.path.join(FEED_DIR, 'markets.atom'), 'rb') as f:
+            entries = news_feeds.parse_feed(f.read(), 'http://example.com/')
+        self.assertEqual([entry['link'] for entry in entries],
+                         ['http://example.com/markets/1', 'http://example.com/markets/2'])
+        with self.assertRaises(ValueError):
+            news_feeds.parse_feed(b'not a feed <', 'http://example.com/')
+
+    def test_feed_content_is_escaped(self):
+        body = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>t</title>
+<item><title>&lt;img src=x onerror=alert(1)&gt;</title><link>javascript:alert(1)</link>
+<description>&lt;p&gt;&amp;lt;script&amp;gt;alert(1)&amp;lt;/script&amp;gt; [\xeb\xa7\x81\xed\x81\xac](javascript:alert(1)) a_b_c&lt;/p&gt;</description>
+</item></channel></rss>"""
+        (entry,) = news_feeds.parse_feed(body, 'http://example.com/')
+        self.assertEqual(entry['link'], '')
+        html, _ = markdown_cache.render(entry['content'])
+        self.assertNotIn('<script', html)
+        self.assertNotIn('href', html)
+        self.assertIn('&lt;script&gt;alert(1)&lt;/script&gt;', html)
+        self.assertIn('[링크](javascript:alert(1)) a_b_c', html)
+
+        news = news_feeds.save_entries([(self.economy, entry)])[0]
+        create_google_app()
+        response = self.client.get(f'/news/{news.pk}/')
+        self.assertNotContains(response, '<img src=x')
+        self.assertNotContains(response, '<script>alert')
@@ -1,9 +1,11 @@
 from django.urls import path, include
+from blog.async_reads import read_view
 from . import views
 
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='news_list'),
-    path('<int:pk>/', views.NewsDetail.as_view(), name='news_detail'),
+    path('', read_view(views.NewsList.as_view(), views.AsyncNewsList.as_view()), name='news_list'),
+    path('calendar/', views.news_calendar, name='news_calendar'),
+    path('<int:pk>/', read_view(views.NewsDetail.as_view(), views.AsyncNewsDetail.as_view()), name='news_detail'),
     path('update_post/<int:pk>/', views.NewsUpdate.as_view(), name='news_update'),
     path('search/<str:q>/', views.NewsSearch.as_view(), name='news_search'),
     path('create_post/', views.NewsCreate.as_view(), name='news_create'),
@@ -3,58 +3,58 @@ from lib2to3.fixes.fix_input import context
 from django.shortcuts import redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.utils.text import slugify
-from blog.models import Tag, News
+from blog.async_reads import AsyncDetailMixin, AsyncListMixin
+from blog.models import News
+from blog.near_duplicates import duplicate_ids
+from blog.page_cache import cached_page
+from blog.search import SearchResults
+from django.utils.decorators import method_decorator
+from blog.tags import add_tags
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q
 from blog.forms import CommentForm
 from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from django.db.models import Count, Max
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.utils.cache import get_conditional_response
 from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+import hashlib
 
+# 달력 API 한 번에 조회할 수 있는 최대 기간
+NEWS_CALENDAR_MAX_DAYS = 62
 
+
+@method_decorator(cached_page(), name='dispatch')
 class NewsList(ListView):
     model = News
     template_name = 'news/news_list.html'
     context_object_name = 'news_list'
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-
-        # 날짜별 뉴스 데이터를 딕셔너리로 그룹화
-        news_dict = defaultdict(list)
-        for news in News.objects.all():
-            date_key = news.created_at.strftime('%Y-%m-%d')
-            news_dict[date_key].append({'title': news.title, 'url': news.get_absolute_url()})
-
-        # JSON 형식으로 템플릿에 전달
-        context['news_dict'] = news_dict
-
-        # 오늘 날짜의 뉴스 필터링
-        today = timezone.now().date()
-        today_news = News.objects.filter(created_at__date=today)
-
-        # 템플릿에 전달
-        context['today_news'] = today_news
-
-        return context
-
+    # 달력 데이터는 news_calendar API로 월 단위로 가져온다.
 
 
+@method_decorator(cached_page('news:{pk}', 'word_tag'), name='dispatch')
 class NewsDetail(DetailView):
     model = News
     template_name = 'news/news_detail.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # 오늘 날짜의 뉴스 필터링
-        today = timezone.now().date()
-        today_news = News.objects.filter(created_at__date=today)
-
-        # 템플릿에 전달
-        context['today_news'] = today_news
         context['comment_form'] = CommentForm
         return context
 
+
+@method_decorator(cached_page(), name='dispatch')
+class AsyncNewsList(AsyncListMixin, NewsList):
+    # 달력은 news_calendar API로 채우므로 뉴스 전체를 읽지 않는다. (동기 NewsList와 같음)
+    prefetch_rows = False
+
+
+@method_decorator(cached_page('news:{pk}', 'word_tag'), name='dispatch')
+class AsyncNewsDetail(AsyncDetailMixin, NewsDetail):
+    pass
+
 class NewsUpdate(LoginRequiredMixin, UpdateView):
     model = News
     fields = ['title', 'content']
@@ -79,28 +79,13 @@ class NewsUpdate(LoginRequiredMixin, UpdateView):
     def form_valid(self, form):
         response = super(NewsUpdate, self).form_valid(form)
         self.object.tags.clear()
-        tags_str = self.request.POST.get('tags_str')
-        if tags_str:
-            tags_str = tags_str.strip()
-            tags_str = tags_str.replace(',', ';')
-            tags_list = tags_str.split(';')
-            for t in tags_list:
-                t = t.strip()
-                tag, is_tag_created = Tag.objects.get_or_create(name=t)
-                if is_tag_created:
-                    tag.slug = slugify(t, allow_unicode=True)
-                    tag.save()
-                self.object.tags.add(tag)
+        add_tags(self.object, self.request.POST.get('tags_str'))
         return response
 
 class NewsSearch(NewsList):
-    paginate_by = None
+    paginate_by = 5
     def get_queryset(self):
-        q = self.kwargs['q']
-        post_list = News.objects.filter(
-            Q(title__contains=q)
-        ).distinct()
-        return post_list
+        return SearchResults(self.kwargs['q'], 'news')
     def get_context_data(self, **kwargs):
         context = super(NewsSearch, self).get_context_data()
         q = self.kwargs['q']
@@ -127,3 +112,54 @@ class NewsCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
         else:
             return redirect('/news/')
 
+
+def _calendar_range(request):
+    # ?month=2024-11  또는  ?start=2024-11-01&end=2024-11-30 (end 포함)
+    month = request.GET.get('month')
+    if month:
+        start = datetime.strptime(month, '%Y-%m').date()
+        end = (start + timedelta(days=32)).replace(day=1)
+    else:
+        start = date.fromisoformat(request.GET['start'])
+        end = date.fromisoformat(request.GET['end']) + timedelta(days=1)
+    if not start < end <= start + timedelta(days=NEWS_CALENDAR_MAX_DAYS):
+        raise ValueError('invalid range')
+    return start, end
+
+
+@require_GET
+def news_calendar(request):
+    try:
+        start, end = _calendar_range(request)
+    except (KeyError, ValueError, OverflowError):
+        return HttpResponseBadRequest('month=YYYY-MM 또는 start/end=YYYY-MM-DD 형식으로 요청하세요.')
+
+    # created_at 인덱스를 타는 반열린 구간 조건. 근접 중복으로 묶인 기사는 대표 기사만 보인다.
+    news_qs = News.objects.filter(
+        created_at__gte=datetime.combine(start, time.min),
+        created_at__lt=datetime.combine(end, time.min),
+    ).exclude(pk__in=duplicate_ids('news'))
+
+    # 구간의 건수/최종 수정 시각만으로 ETag를 만들어 본문 조회 없이 304 응답
+    summary = news_qs.aggregate(count=Count('pk'), last_modified=Max('updated_at'), max_pk=Max('pk'))
+    etag = quote_etag(hashlib.md5(
+        f"{start}:{end}:{summary['count']}:{summary['max_pk']}:{summary['last_modified']}".encode()
+    ).hexdigest())
+    last_modified = summary['last_modified']
+    if last_modified:
+        if timezone.is_naive(last_modified):
+            last_modified = timezone.make_aware(last_modified)
+        last_modified = int(last_modified.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        news_dict = defaultdict(list)
+        for pk, title, created_at in news_qs.order_by('created_at').values_list('pk', 'title', 'created_at'):
+            news_dict[created_at.strftime('%Y-%m-%d')].append({'title': title, 'url': f'/news/{pk}/'})
+        response = JsonResponse(news_dict, json_dumps_params={'ensure_ascii': False})
+
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'no-cache'
+    return response
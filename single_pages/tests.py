@@ -1,5 +1,7 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from allauth.socialaccount.models import SocialApp
 from bs4 import BeautifulSoup
 from blog.models import Post
 
@@ -7,6 +9,9 @@ class TestView(TestCase):
     def setUp(self):
         self.client = Client()
         self.user_trump = User.objects.create_user(username='trump', password='somepassword')
+        # navbar의 구글 로그인 링크가 SocialApp을 필요로 함
+        google_app = SocialApp.objects.create(provider='google', name='google', client_id='test', secret='test')
+        google_app.sites.add(Site.objects.get_current())
     def test_landing(self):
         post_001 = Post.objects.create(
             title='첫 번째 포스트',
@@ -1,8 +1,9 @@
 from django.urls import path
+from blog.async_reads import read_view
 from . import views
 
 
 urlpatterns = [
     path('about_me/', views.about_me),
-    path('', views.landing),
+    path('', read_view(views.landing, views.async_landing)),
 ]
\ No newline at end of file
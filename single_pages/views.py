@@ -1,13 +1,16 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from blog.models import Post, Word, News
-from django.utils import timezone
+from blog.async_reads import alist, gather, sidebar_queries
+from blog.models import Post
+from blog.page_cache import cached_page
+from blog.word_schedule import get_word_of_the_day
 
+@cached_page('post', 'word')
 def landing(request):
     recent_posts = Post.objects.order_by('-pk')[:3]
-    recent_word = Word.objects.order_by('-pk')[:1]
-
-    today = timezone.now().date()
-    today_news = News.objects.filter(created_at__date=today)
+    # 날짜별로 미리 배정된 오늘의 단어 (blog/word_schedule.py)
+    word = get_word_of_the_day()
+    recent_word = [word] if word else []
 
     return render(
         request,
@@ -15,7 +18,24 @@ def landing(request):
         {
             'recent_posts': recent_posts,
             'recent_word': recent_word,
-            'today_news' : today_news,
+        }
+    )
+
+@cached_page('post', 'word')
+async def async_landing(request):
+    # 최근 글 / 오늘의 단어 / 오늘의 뉴스는 서로 독립적이므로 함께 기다린 뒤 동기 스레드에서 렌더링한다.
+    results = await gather(
+        recent_posts=alist(Post.objects.order_by('-pk')[:3]),
+        word=sync_to_async(get_word_of_the_day)(),
+        **sidebar_queries(),
+    )
+    word = results['word']
+    return await sync_to_async(render)(
+        request,
+        'single_pages/landing.html',
+        {
+            'recent_posts': results['recent_posts'],
+            'recent_word': [word] if word else [],
         }
     )
 
@@ -1,3 +1,128 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from blog import related_words, tags, word_schedule
+from blog.models import Word, WordNeighbor, WordSchedule
+from blog.testing import SiteTestCase
 
-# Create your tests here.
+
+class TestWordSchedule(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.words = [Word.objects.create(title=f'단어{i}', content=f'단어{i} 설명') for i in range(5)]
+
+    def test_rotation_without_repeats(self):
+        start = word_schedule.today()
+        self.assertEqual(word_schedule.schedule(start, days=12), 12)
+        word_ids = list(WordSchedule.objects.values_list('word_id', flat=True))
+        # 단어 수(5)만큼의 구간 안에서는 겹치지 않는다.
+        for i in range(len(word_ids) - 4):
+            self.assertEqual(len(set(word_ids[i:i + 5])), 5)
+
+        # 이미 배정된 날짜는 그대로 두고 뒤쪽만 채운다.
+        self.assertEqual(word_schedule.schedule(start, days=14), 2)
+        self.assertEqual(list(WordSchedule.objects.values_list('word_id', flat=True))[:12], word_ids)
+
+    def test_word_of_the_day_cached(self):
+        word_schedule.schedule(days=3)
+        expected = WordSchedule.objects.get(date=word_schedule.today()).word
+        with self.assertNumQueries(1):
+            self.assertEqual(word_schedule.get_word_of_the_day(), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(word_schedule.get_word_of_the_day(), expected)
+
+        # 단어가 바뀌면 캐시를 비운다.
+        expected.title = '바뀐 단어'
+        expected.save()
+        self.assertEqual(word_schedule.get_word_of_the_day().title, '바뀐 단어')
+
+    def test_schedules_today_on_demand(self):
+        word = word_schedule.get_word_of_the_day()
+        self.assertIn(word, self.words)
+        self.assertTrue(WordSchedule.objects.filter(date=word_schedule.today(), word=word).exists())
+
+    def test_schedule_words_command(self):
+        out = StringIO()
+        call_command('schedule_words', '--days', '7', stdout=out)
+        self.assertIn('7일 배정', out.getvalue())
+        self.assertEqual(WordSchedule.objects.count(), 7)
+
+
+class TestRelatedWords(SiteTestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rate = Word.objects.create(title='기준금리', content='한국은행이 정하는 정책금리로 시장금리에 영향을 준다.')
+            self.bond = Word.objects.create(title='국채금리', content='정부가 발행한 채권의 금리. 시장금리의 기준이 된다.')
+            self.dsr = Word.objects.create(title='총부채원리금상환비율(DSR)', content='연간 소득 대비 원리금 상환액 비율.')
+            self.gdp = Word.objects.create(title='국내총생산', content='일정 기간 생산된 최종 재화와 서비스의 가치.')
+            tags.add_tags(self.rate, '통화정책')
+            tags.add_tags(self.bond, '통화정책')
+            # related_keyword가 다른 단어의 제목(괄호 설명 제외)과 같으면 직접 연결
+            tags.add_tags(self.gdp, '총부채원리금상환비율')
+
+    def related(self, word):
+        return list(WordNeighbor.objects.filter(word=word).values_list('neighbor__title', flat=True))
+
+    def test_rebuild(self):
+        self.assertEqual(related_words.rebuild(), 4)
+        self.assertEqual(self.related(self.rate)[0], '국채금리')
+        self.assertEqual(self.related(self.dsr), ['국내총생산'])
+        self.assertEqual(self.related(self.gdp)[0], '총부채원리금상환비율(DSR)')
+
+    def test_incremental_update(self):
+        related_words.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            tags.add_tags(self.dsr, '통화정책')
+        self.assertIn('총부채원리금상환비율(DSR)', self.related(self.rate))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bond.delete()
+        self.assertNotIn('국채금리', self.related(self.rate))
+
+    def test_one_update_per_transaction(self):
+        # 저장 + 태그 추가로 시그널이 여러 번 와도 커밋 때 그래프는 한 번만 만든다.
+        with mock.patch.object(related_words, 'TagGraph', wraps=related_words.TagGraph) as graph:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.dsr.content = '연간 소득 대비 모든 대출의 원리금 상환액 비율.'
+                self.dsr.save()
+                tags.add_tags(self.dsr, '통화정책; 대출규제')
+                tags.add_tags(self.gdp, '통화정책')
+        graph.assert_called_once_with(sorted([self.dsr.pk, self.gdp.pk]))
+        self.assertIn('총부채원리금상환비율(DSR)', self.related(self.rate))
+
+    def test_update_after_rolled_back_transaction(self):
+        # 롤백으로 콜백이 버려져도 다음 트랜잭션의 커밋 때 모인 단어를 처리한다.
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            related_words.schedule(self.dsr.pk)
+            raise IntegrityError
+        with mock.patch.object(related_words, 'update_words') as update_words:
+            with self.captureOnCommitCallbacks(execute=True):
+                related_words.schedule(self.gdp.pk)
+        update_words.assert_called_once_with({self.dsr.pk, self.gdp.pk}, set())
+
+    def test_graph_reads_only_linked_words(self):
+        Word.objects.create(title='환율', content='두 나라 통화의 교환 비율.')
+        graph = related_words.TagGraph([self.rate.pk])
+        self.assertEqual(graph.loaded, {self.rate.pk})
+        self.assertEqual(set(graph.word_tags), {self.rate.pk, self.bond.pk})
+        self.assertEqual(graph.word_ids, {self.rate.pk})
+
+        full = related_words.TagGraph()
+        self.assertEqual(related_words.neighbors(self.rate.pk, graph), related_words.neighbors(self.rate.pk, full))
+
+        # 태그 이름이 가리키는 단어는 그 제목만 읽는다.
+        graph = related_words.TagGraph([self.gdp.pk])
+        self.assertEqual(graph.keyword_links(self.gdp.pk), {self.dsr.pk})
+        self.assertEqual(graph.word_ids, {self.gdp.pk, self.dsr.pk})
+        graph.load([self.dsr.pk])
+        self.assertEqual(graph.keyword_links(self.dsr.pk), {self.gdp.pk})
+
+    def test_word_detail_shows_related(self):
+        related_words.rebuild()
+        response = self.client.get(self.rate.get_absolute_url())
+        self.assertContains(response, '관련 용어')
+        self.assertContains(response, f'href="{self.bond.get_absolute_url()}"')
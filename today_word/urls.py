@@ -1,11 +1,13 @@
 from django.urls import path
+from blog.async_reads import read_view
 from . import views
 
 urlpatterns=[
     path('search/<str:q>/', views.WordSearch.as_view(), name='word_search'),
+    path('tag/<str:slug>/', views.WordListByTag.as_view(), name='word_tag'),
     path('update_post/<int:pk>/', views.WordUpdate.as_view()),
     path('create_post/', views.WordCreate.as_view(), name='word_create'),
-    path('<int:pk>/', views.WordDetail.as_view()),
-    path('', views.WordList.as_view()),
+    path('<int:pk>/', read_view(views.WordDetail.as_view(), views.AsyncWordDetail.as_view())),
+    path('', read_view(views.WordList.as_view(), views.AsyncWordList.as_view())),
 
 ]
\ No newline at end of file
@@ -1,51 +1,73 @@
 from django.shortcuts import render, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.utils.text import slugify
-from blog.models import Word, Word_Tag, News
+from blog.async_reads import AsyncDetailMixin, AsyncListMixin, alist
+from blog.models import Word, Word_Tag, WordNeighbor
+from blog.page_cache import cached_page
+from blog.pagination import CursorPaginationMixin
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from blog import tag_stats
+from blog.search import SearchResults
+from blog.tags import add_tags
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q
-from django.utils import timezone
 
 
-class WordList(ListView):
+@method_decorator(cached_page('word', 'word_tag'), name='dispatch')
+class WordList(CursorPaginationMixin, ListView):
     model = Word
+    queryset = Word.objects.select_related('author').prefetch_related('tags')
     ordering = '-pk'
     paginate_by = 5
 
+
+class WordListByTag(WordList):
+    def get_queryset(self):
+        self.tag = get_object_or_404(Word_Tag, slug=self.kwargs['slug'])
+        return super().get_queryset().filter(tags=self.tag)
+
+    def get_total_count(self):
+        return tag_stats.count('word', self.tag.pk)
+
     def get_context_data(self, **kwargs):
-        context = super(WordList, self).get_context_data(**kwargs)
-        context['tags'] = Word_Tag.objects.all()
-        # 오늘 날짜의 뉴스 필터링
-        today = timezone.now().date()
-        today_news = News.objects.filter(created_at__date=today)
-
-        # 템플릿에 전달
-        context['today_news'] = today_news
+        context = super().get_context_data(**kwargs)
+        context['tag'] = self.tag
         return context
 
+@method_decorator(cached_page('word:{pk}', 'word_tag'), name='dispatch')
 class WordDetail(DetailView):
     model = Word
+    queryset = Word.objects.select_related('author').prefetch_related('tags')
 
     def get_context_data(self, **kwargs):
         context = super(WordDetail, self).get_context_data()
-        context['tags'] = Word_Tag.objects.all()
-        # 오늘 날짜의 뉴스 필터링
-        today = timezone.now().date()
-        today_news = News.objects.filter(created_at__date=today)
-
-        # 템플릿에 전달
-        context['today_news'] = today_news
+        context['related_words'] = [row.neighbor for row in self.get_related_word_rows()]
         return context
 
-def generate_unique_slug(name):
-    slug = slugify(name, allow_unicode=True)
-    unique_slug = slug
-    number = 1
-    while Word_Tag.objects.filter(slug=unique_slug).exists():
-        unique_slug = f"{slug}-{number}"
-        number += 1
-    return unique_slug
+    def get_related_word_rows(self):
+        return related_word_rows(self.object.pk)
+
+
+def related_word_rows(word_id):
+    # 미리 계산해 둔 관련 용어 (blog/related_words.py), (word, rank) 인덱스로 한 번에 조회
+    return WordNeighbor.objects.filter(word_id=word_id).select_related('neighbor').only('neighbor__id', 'neighbor__title')
+
+
+@method_decorator(cached_page('word', 'word_tag'), name='dispatch')
+class AsyncWordList(AsyncListMixin, WordList):
+    sidebar_kind = 'word'
+
+
+@method_decorator(cached_page('word:{pk}', 'word_tag'), name='dispatch')
+class AsyncWordDetail(AsyncDetailMixin, WordDetail):
+    sidebar_kind = 'word'
+
+    def get_async_queries(self):
+        return {**super().get_async_queries(), 'related_words': alist(related_word_rows(self.kwargs['pk']))}
+
+    def get_related_word_rows(self):
+        return self.prefetched['related_words']
+
 
 class WordCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = Word
@@ -63,21 +85,8 @@ class WordCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
             # Save the form to create self.object
             response = super(WordCreate, self).form_valid(form)
 
-            # 태그 추가
-            tags_str = self.request.POST.get('tags_str')
-            if tags_str:
-                tags_str = tags_str.strip().replace(',', ';')
-                tags_list = tags_str.split(';')
-                for t in tags_list:
-                    t = t.strip()
-                    existing_tag = Word_Tag.objects.filter(name=t).first()
-                    if existing_tag:
-                        tag = existing_tag
-                    else:
-                        tag = Word_Tag(name=t)
-                        tag.slug = generate_unique_slug(t)  # 고유 슬러그 생성 함수 사용
-                        tag.save()
-                    self.object.tags.add(tag)
+            # 태그 추가 (기존 태그 조회, 새 태그 생성, 연결을 각각 한 번에)
+            add_tags(self.object, self.request.POST.get('tags_str'))
 
             return response
         else:
@@ -108,28 +117,14 @@ class WordUpdate(LoginRequiredMixin, UpdateView):
     def form_valid(self, form):
         response = super(WordUpdate, self).form_valid(form)
         self.object.tags.clear()
-        tags_str = self.request.POST.get('tags_str')
-        if tags_str:
-            tags_str = tags_str.strip()
-            tags_str = tags_str.replace(',', ';')
-            tags_list = tags_str.split(';')
-            for t in tags_list:
-                t = t.strip()
-                tag, is_tag_created = Word_Tag.objects.get_or_create(name=t)
-                if is_tag_created:
-                    tag.slug = slugify(t, allow_unicode=True)
-                    tag.save()
-                self.object.tags.add(tag)
+        add_tags(self.object, self.request.POST.get('tags_str'))
         return response
 
 class WordSearch(WordList):
-    paginate_by = None
+    pagination_mode = 'offset'
+
     def get_queryset(self):
-        q = self.kwargs['q']
-        post_list = Word.objects.filter(
-            Q(title__contains=q)
-        ).distinct()
-        return post_list
+        return SearchResults(self.kwargs['q'], 'word', queryset=self.queryset)
     def get_context_data(self, **kwargs):
         context = super(WordSearch, self).get_context_data()
         q = self.kwargs['q']